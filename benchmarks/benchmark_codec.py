@@ -0,0 +1,82 @@
+"""
+Compares the JSON and binary formats feature settings can be stored in (see
+feature_ramp.Codec): encoded size, and encode and decode latency, across
+whitelist sizes and identifier types. Writes a JSON report like
+benchmark_feature.py:
+
+$ python benchmarks/benchmark_codec.py --output codec.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmark_feature import int_list, make_identifiers, measure, summarize
+from feature_ramp import Codec
+
+
+def benchmark_codec(version, whitelist_size, identifier_type, min_time):
+    """ Benchmarks one format for a feature with a whitelist of the given size and type. """
+
+    codec = Codec.CODECS[version]
+    redis_data = {'percentage': 5, 'whitelist': make_identifiers(identifier_type, whitelist_size),
+                  'blacklist': []}
+    encoded = codec.encode(redis_data)
+    if not isinstance(encoded, bytes):
+        encoded = encoded.encode('utf-8')  # as redis-py sends and returns it
+
+    params = {'redis_version': version, 'format': type(codec).__name__,
+              'whitelist_size': whitelist_size, 'identifier_type': identifier_type,
+              'encoded_bytes': len(encoded)}
+    return [
+        summarize('encode', params, measure(lambda: codec.encode(redis_data), min_time)),
+        summarize('decode', params, measure(lambda: Codec.decode(encoded), min_time)),
+    ]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compares the formats feature settings are stored in.")
+    parser.add_argument('--whitelist-sizes', type=int_list, default=[0, 100, 10000, 1000000],
+                        help="comma separated whitelist sizes")
+    parser.add_argument('--identifier-types', type=lambda value: value.split(','), default=['int', 'str', 'unicode'],
+                        help="comma separated identifier types: int, str, unicode")
+    parser.add_argument('--min-time', type=float, default=1.0,
+                        help="seconds to run each benchmark for")
+    parser.add_argument('--output', help="write the JSON report to this file instead of stdout")
+    args = parser.parse_args(argv)
+
+    results = []
+    for whitelist_size in args.whitelist_sizes:
+        for identifier_type in args.identifier_types:
+            for version in sorted(Codec.CODECS):
+                for result in benchmark_codec(version, whitelist_size, identifier_type, args.min_time):
+                    results.append(result)
+                    sys.stderr.write('{0:<7} {1:<11} {2:>8} {3:<8} {4:>10} bytes  p50 {5:>12.1f}us\n'.format(
+                        result['benchmark'], result['params']['format'], whitelist_size, identifier_type,
+                        result['params']['encoded_bytes'], result['p50_us']))
+
+    report = json.dumps({
+        'meta': {
+            'timestamp': time.time(),
+            'python': platform.python_version(),
+            'implementation': platform.python_implementation(),
+            'platform': platform.platform(),
+            'min_time': args.min_time,
+        },
+        'results': results,
+    }, indent=2, sort_keys=True)
+
+    if args.output:
+        with open(args.output, 'w') as output:
+            output.write(report + '\n')
+    else:
+        sys.stdout.write(report + '\n')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,270 @@
+"""
+Benchmarks the feature evaluation and storage hot paths.
+
+Runs against a local Redis server, or an in-process InMemoryBackend, and
+reports ops/sec and latency percentiles as JSON so runs can be compared,
+e.g. before and after an upgrade:
+
+$ python benchmarks/benchmark_feature.py --output before.json
+$ python benchmarks/benchmark_feature.py --backend memory --quick
+
+Features are written under a separate Redis namespace and deleted
+afterwards, so the benchmark can be pointed at a server holding real
+features.
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import time
+import timeit
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import feature_ramp
+from feature_ramp.Backend import InMemoryBackend, RedisBackend
+from feature_ramp.Feature import Feature
+
+BENCHMARK_NAMESPACE = 'feature_benchmark'
+BATCH_SIZE = 1000
+
+
+def make_identifiers(identifier_type, count, seed=0):
+    """ Returns ``count`` distinct identifiers of the given type. """
+
+    numbers = random.Random(seed).sample(range(10 * count), count)
+    if identifier_type == 'int':
+        return numbers
+    if identifier_type == 'str':
+        return ['user{0}@example.com'.format(number) for number in numbers]
+    return [u'\u00fcser{0}@\u00e9xample.com'.format(number) for number in numbers]
+
+
+def measure(function, min_time, min_iterations=5, max_iterations=100000):
+    """ Calls ``function`` repeatedly, timing every call, until ``min_time`` seconds
+    and ``min_iterations`` calls have passed. Returns the call latencies in seconds.
+    """
+
+    timer = timeit.default_timer
+    latencies = []
+    deadline = timer() + min_time
+    while len(latencies) < max_iterations:
+        start = timer()
+        function()
+        end = timer()
+        latencies.append(end - start)
+        if end >= deadline and len(latencies) >= min_iterations:
+            break
+    return latencies
+
+
+def summarize(name, params, latencies, operations_per_call=1):
+    """ Returns the result record for one benchmark. Latencies are per call, in
+    microseconds; ops/sec counts ``operations_per_call`` per call, for bulk calls.
+    """
+
+    ordered = sorted(latencies)
+
+    def percentile(fraction):
+        return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))] * 1e6
+
+    total = sum(ordered)
+    return {
+        'benchmark': name,
+        'params': params,
+        'iterations': len(ordered),
+        'ops_per_sec': len(ordered) * operations_per_call / total if total else None,
+        'mean_us': total / len(ordered) * 1e6,
+        'p50_us': percentile(0.5),
+        'p90_us': percentile(0.9),
+        'p99_us': percentile(0.99),
+        'max_us': ordered[-1] * 1e6,
+    }
+
+
+def cycle(values):
+    """ Returns a function returning the next value of ``values`` on every call. """
+
+    state = {'index': 0}
+
+    def next_value():
+        index = state['index']
+        state['index'] = (index + 1) % len(values)
+        return values[index]
+    return next_value
+
+
+def benchmark_whitelist(whitelist_size, identifier_types, min_time):
+    """ Benchmarks loading, saving and evaluating one feature with a whitelist of
+    ``whitelist_size`` ids.
+    """
+
+    results = []
+    feature = Feature('benchmark')
+    feature.percentage = 50
+    feature.whitelist = make_identifiers('int', whitelist_size)
+    feature._save()
+
+    params = {'whitelist_size': whitelist_size}
+    results.append(summarize('init', params, measure(lambda: Feature('benchmark'), min_time)))
+    results.append(summarize('save', params, measure(feature._save, min_time)))
+
+    for identifier_type in identifier_types:
+        params = {'whitelist_size': whitelist_size, 'identifier_type': identifier_type}
+        identifiers = make_identifiers(identifier_type, BATCH_SIZE, seed=1)
+        next_identifier = cycle(identifiers)
+
+        results.append(summarize('is_visible', params,
+                                 measure(lambda: feature.is_visible(next_identifier()), min_time)))
+        results.append(summarize('_is_ramped', params,
+                                 measure(lambda: feature._is_ramped(next_identifier()), min_time)))
+        results.append(summarize('is_visible_per_call_batch', dict(params, batch_size=BATCH_SIZE),
+                                 measure(lambda: [feature.is_visible(identifier) for identifier in identifiers], min_time),
+                                 operations_per_call=BATCH_SIZE))
+        results.append(summarize('filter_visible_batch', dict(params, batch_size=BATCH_SIZE),
+                                 measure(lambda: feature.filter_visible(identifiers), min_time),
+                                 operations_per_call=BATCH_SIZE))
+        if numpy is not None and identifier_type == 'int':
+            # compare with is_visible_per_call_batch for the speedup of bulk evaluation
+            identifier_array = numpy.array(identifiers)
+            results.append(summarize('visible_mask_numpy_batch', dict(params, batch_size=BATCH_SIZE),
+                                     measure(lambda: feature.visible_mask(identifier_array), min_time),
+                                     operations_per_call=BATCH_SIZE))
+
+    feature.delete()
+    return results
+
+
+def benchmark_feature_count(feature_count, min_time):
+    """ Benchmarks listing and evaluating ``feature_count`` features. """
+
+    names = ['benchmark{0}'.format(index) for index in range(feature_count)]
+    for index, name in enumerate(names):
+        feature = Feature(name)
+        feature.percentage = index % 101
+        feature._save()
+
+    params = {'feature_count': feature_count}
+    results = [
+        summarize('all_features', params, measure(Feature.all_features, min_time)),
+        summarize('all_features_with_data', params,
+                  measure(lambda: Feature.all_features(include_data=True), min_time)),
+        summarize('evaluate_all', params,
+                  measure(lambda: Feature.evaluate_all(3, names=names), min_time),
+                  operations_per_call=feature_count),
+        summarize('init_and_is_visible_per_feature', params,
+                  measure(lambda: [Feature(name).is_visible(3) for name in names], min_time),
+                  operations_per_call=feature_count),
+    ]
+
+    for name in names:
+        Feature(name).delete()
+    return results
+
+
+def run(args):
+    """ Runs every benchmark selected by the arguments. Returns the report. """
+
+    if args.backend == 'memory':
+        backend = InMemoryBackend()
+    else:
+        backend = RedisBackend(host=args.host, port=args.port, db=args.db)
+
+    default_backend, default_namespace = feature_ramp.backend, Feature.REDIS_NAMESPACE
+    feature_ramp.set_backend(backend)
+    Feature.REDIS_NAMESPACE = BENCHMARK_NAMESPACE
+
+    results = []
+    try:
+        for whitelist_size in args.whitelist_sizes:
+            results.extend(benchmark_whitelist(whitelist_size, args.identifier_types, args.min_time))
+            report_progress(results)
+
+        for feature_count in args.feature_counts:
+            results.extend(benchmark_feature_count(feature_count, args.min_time))
+            report_progress(results)
+    finally:
+        for name in Feature.all_features():
+            Feature(name).delete()
+        Feature.REDIS_NAMESPACE = default_namespace
+        feature_ramp.set_backend(default_backend)
+
+    return {
+        'meta': {
+            'timestamp': time.time(),
+            'python': platform.python_version(),
+            'implementation': platform.python_implementation(),
+            'platform': platform.platform(),
+            'backend': args.backend,
+            'bucketer': type(Feature.bucketer).__name__,
+            'buckets': Feature.bucketer.buckets,
+            'min_time': args.min_time,
+        },
+        'results': results,
+    }
+
+
+def report_progress(results):
+    """ Prints the results not printed yet to stderr, one line each. """
+
+    for result in results[report_progress.printed:]:
+        sys.stderr.write('{0:<34} {1:<60} {2:>14.1f} ops/s  p50 {3:>10.1f}us  p99 {4:>10.1f}us\n'.format(
+            result['benchmark'], json.dumps(result['params'], sort_keys=True),
+            result['ops_per_sec'] or 0, result['p50_us'], result['p99_us']))
+    report_progress.printed = len(results)
+
+report_progress.printed = 0
+
+
+def int_list(value):
+    return [int(item) for item in value.split(',') if item]
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks feature evaluation and storage.")
+    parser.add_argument('--backend', choices=['redis', 'memory'], default='redis',
+                        help="store features in a Redis server, or in this process")
+    parser.add_argument('--host', default='localhost')
+    parser.add_argument('--port', type=int, default=6379)
+    parser.add_argument('--db', type=int, default=0)
+    parser.add_argument('--feature-counts', type=int_list, default=[10, 100, 1000, 10000],
+                        help="comma separated numbers of features")
+    parser.add_argument('--whitelist-sizes', type=int_list, default=[0, 100, 10000, 1000000],
+                        help="comma separated whitelist sizes")
+    parser.add_argument('--identifier-types', type=lambda value: value.split(','), default=['int', 'str', 'unicode'],
+                        help="comma separated identifier types: int, str, unicode")
+    parser.add_argument('--min-time', type=float, default=1.0,
+                        help="seconds to run each benchmark for")
+    parser.add_argument('--quick', action='store_true',
+                        help="small sizes and short runs, for checking the benchmarks work")
+    parser.add_argument('--output', help="write the JSON report to this file instead of stdout")
+    args = parser.parse_args(argv)
+
+    if args.quick:
+        args.feature_counts = [10, 100]
+        args.whitelist_sizes = [0, 1000]
+        args.min_time = 0.05
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    report = json.dumps(run(args), indent=2, sort_keys=True)
+
+    if args.output:
+        with open(args.output, 'w') as output:
+            output.write(report + '\n')
+    else:
+        sys.stdout.write(report + '\n')
+
+
+if __name__ == '__main__':
+    main()
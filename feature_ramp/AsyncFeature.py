@@ -0,0 +1,483 @@
+import asyncio
+
+from feature_ramp.Backend import AsyncRedisBackend, WatchError
+from feature_ramp.Feature import Feature, _LOG_CHANGE_SCRIPT, _UNAVAILABLE, _UPDATE_SCRIPT
+
+# The asyncio storage backend AsyncFeature reads and writes through. Like
+# feature_ramp.backend it connects lazily; use set_backend() to replace it.
+backend = AsyncRedisBackend(host='localhost', port=6379, db=0)
+
+
+def set_backend(new_backend):
+    """ Replaces the asyncio storage backend used by every AsyncFeature. """
+
+    global backend
+    backend = new_backend
+
+
+class AsyncFeature(Feature):
+    """
+    The asyncio counterpart of Feature, for services running on an event loop.
+    Requires Python 3 and redis-py 4.2 or later.
+
+    Every method that talks to Redis is a coroutine; the evaluation logic is
+    shared with Feature, so both always give the same answers. Features are
+    loaded with the load() coroutine instead of the constructor.
+
+    Usage:
+
+    feature = await AsyncFeature.load("all_functionality")
+    await feature.set_percentage(5)
+    await feature.add_to_whitelist(identifier)
+    await feature.is_visible(identifier)
+    await AsyncFeature.all_features(include_data=True)
+    """
+
+    def __init__(self, *args, **kwargs):
+        raise TypeError("AsyncFeature must be loaded with 'await AsyncFeature.load(feature_name)'")
+
+    @classmethod
+    async def load(cls, feature_name, feature_group_name=None, default_percentage=0):
+        """ Loads the feature's settings, from the cache if one is configured. """
+
+        key = cls._get_redis_key_for_feature(feature_name)
+        redis_data = (await cls._load_many_redis_data_async([key]))[0]
+        return cls._from_redis_data(feature_name, redis_data,
+                                    feature_group_name=feature_group_name,
+                                    default_percentage=default_percentage)
+
+    @classmethod
+    async def evaluate_all(cls, identifier, names=None, feature_group_names=None, default_percentage=0,
+                           attributes=None):
+        """ See Feature.evaluate_all(). """
+
+        if names is None:
+            names = await cls.all_features()
+
+        feature_group_names = feature_group_names or {}
+        keys = [cls._get_redis_key_for_feature(name) for name in names]
+
+        visibility = dict()
+        for name, redis_data in zip(names, await cls._load_many_redis_data_async(keys)):
+            feature = cls._from_redis_data(name, redis_data,
+                                           feature_group_name=feature_group_names.get(name),
+                                           default_percentage=default_percentage)
+            visibility[name] = await feature.is_visible(identifier, attributes)
+
+        return visibility
+
+    async def is_visible(self, identifier, attributes=None):
+        """ See Feature.is_visible(). """
+
+        visible = self._recall_decision(identifier, attributes)
+        if visible is None:
+            visible = self._remember_decision(identifier, attributes, await self._evaluate(identifier, attributes))
+        return self._report_decision(identifier, visible)
+
+    async def _evaluate(self, identifier, attributes=None):
+        """ See Feature._evaluate(). """
+
+        whitelisted = await self.is_whitelisted(identifier)
+        blacklisted = not whitelisted and await self.is_blacklisted(identifier)
+        return self._evaluate_membership(identifier, whitelisted, blacklisted, attributes)
+
+    async def is_whitelisted(self, identifier):
+        """ See Feature.is_whitelisted(). """
+
+        if self.uses_redis_sets:
+            return self._is_member('whitelist', identifier, await self._read_async(
+                backend.sismember, self._get_redis_list_key('whitelist'), identifier))
+
+        return Feature.is_whitelisted(self, identifier)
+
+    async def is_blacklisted(self, identifier):
+        """ See Feature.is_blacklisted(). """
+
+        if self.uses_redis_sets:
+            blacklisted = self._is_member('blacklist', identifier, await self._read_async(
+                backend.sismember, self._get_redis_list_key('blacklist'), identifier))
+        else:
+            blacklisted = identifier in self._blacklist_set
+
+        if not blacklisted and self.blacklist_bloom is not None:
+            blacklisted = await self._is_in_blacklist_bloom_filter(identifier)
+        return blacklisted
+
+    async def _is_in_blacklist_bloom_filter(self, identifier):
+        """ See Feature._is_in_blacklist_bloom_filter(). """
+
+        if self._blacklist_bloom_filter is not None:
+            return identifier in self._blacklist_bloom_filter
+
+        async with backend.pipeline(transaction=False) as pipe:
+            self._queue_blacklist_bloom_lookup(pipe, identifier)
+            return self._is_set_in_blacklist_bloom_filter(await self._read_async(pipe.execute))
+
+    async def activate(self):
+        """ See Feature.activate(). """
+
+        await self.set_percentage(100)
+
+    async def deactivate(self):
+        """ See Feature.deactivate(). """
+
+        await self.set_percentage(0)
+
+    async def reset_settings(self):
+        """ See Feature.reset_settings(). """
+
+        list_keys = self._get_redis_list_keys_in_use()
+        if list_keys:
+            await backend.delete(*list_keys)
+
+        self._reset_locally()
+        await self._save()
+
+    async def delete(self):
+        """ See Feature.delete(). """
+
+        async with backend.pipeline() as pipe:
+            self._queue_delete(pipe)
+            await pipe.execute()
+        await self._record_change_async(self._delete_locally)
+
+    async def set_percentage(self, percentage):
+        """ See Feature.set_percentage(). """
+
+        update = self._percentage_update(percentage)
+        await self._update(*update)
+        self._apply_locally(*update)
+
+    async def set_schedule(self, start_time, end_time, start_percentage, end_percentage, step=None):
+        """ See Feature.set_schedule(). """
+
+        update = self._schedule_update(start_time, end_time, start_percentage, end_percentage, step)
+        await self._update(*update)
+        self._apply_locally(*update)
+
+    async def set_rules(self, rules):
+        """ See Feature.set_rules(). """
+
+        update = self._rules_update(rules)
+        await self._update(*update)
+        self._apply_locally(*update)
+
+    async def add_to_whitelist(self, identifier):
+        """ See Feature.add_to_whitelist(). """
+
+        await self._change_list('add', 'whitelist', [identifier])
+
+    async def add_many_to_whitelist(self, identifiers):
+        """ See Feature.add_many_to_whitelist(). """
+
+        return await self._change_list('add', 'whitelist', identifiers)
+
+    async def remove_from_whitelist(self, identifier):
+        """ See Feature.remove_from_whitelist(). """
+
+        if not await self._change_list('remove', 'whitelist', [identifier]):
+            raise ValueError("{0} is not in the whitelist".format(identifier))
+
+    async def remove_many_from_whitelist(self, identifiers):
+        """ See Feature.remove_many_from_whitelist(). """
+
+        return await self._change_list('remove', 'whitelist', identifiers)
+
+    async def add_to_blacklist(self, identifier):
+        """ See Feature.add_to_blacklist(). """
+
+        await self._change_list('add', 'blacklist', [identifier])
+
+    async def add_many_to_blacklist(self, identifiers):
+        """ See Feature.add_many_to_blacklist(). """
+
+        return await self._change_list('add', 'blacklist', identifiers)
+
+    async def remove_from_blacklist(self, identifier):
+        """ See Feature.remove_from_blacklist(). """
+
+        if not await self._change_list('remove', 'blacklist', [identifier]):
+            raise ValueError("{0} is not in the blacklist".format(identifier))
+
+    async def remove_many_from_blacklist(self, identifiers):
+        """ See Feature.remove_many_from_blacklist(). """
+
+        return await self._change_list('remove', 'blacklist', identifiers)
+
+    async def use_redis_sets(self):
+        """ See Feature.use_redis_sets(). """
+
+        if self.uses_redis_sets:
+            return
+
+        async with backend.pipeline() as pipe:
+            self._queue_use_redis_sets(pipe)
+            await pipe.execute()
+
+        self._use_redis_sets_locally()
+        await self._save()
+
+    async def use_blacklist_bloom_filter(self, capacity, error_rate=0.001):
+        """ See Feature.use_blacklist_bloom_filter(). """
+
+        if self.blacklist_bloom is not None:
+            return
+
+        async with backend.pipeline() as pipe:
+            bloom_filter = self._queue_use_blacklist_bloom_filter(pipe, capacity, error_rate)
+            await pipe.execute()
+
+        self._use_blacklist_bloom_filter_locally(bloom_filter)
+        await self._save()
+
+    async def fetch_lists(self):
+        """ Downloads the whitelist and blacklist of a feature that uses Redis sets,
+        and its blacklist Bloom filter, which Feature does lazily on first access.
+        """
+
+        if self.uses_redis_sets:
+            for list_name in ['whitelist', 'blacklist']:
+                members = await self._read_async(backend.smembers, self._get_redis_list_key(list_name))
+                setattr(self, list_name, self._receive_redis_set_members(list_name, members))
+
+        if self.blacklist_bloom is not None:
+            bitmap = await self._read_async(backend.get, self._get_redis_list_key('blacklist_bloom'))
+            self._blacklist_bloom_filter = self._receive_blacklist_bloom_filter(bitmap)
+
+    @classmethod
+    async def all_features(cls, include_data=False):
+        """ See Feature.all_features(). """
+
+        rkeys = cls._receive_feature_keys(await cls._read_async(backend.smembers, cls._get_redis_set_key()))
+        if not include_data:
+            return cls._get_feature_names_from_redis_keys(rkeys)
+
+        features_with_data = dict()
+        for chunk in cls._chunked(rkeys, cls.LOAD_CHUNK_SIZE):
+            for feature, data in await cls._load_summaries_async(chunk):
+                features_with_data[feature] = data
+
+        return features_with_data
+
+    @classmethod
+    async def iter_features(cls, include_data=False):
+        """ See Feature.iter_features(); this is an asynchronous generator. """
+
+        chunk = []
+        async for rkey in backend.sscan_iter(cls._get_redis_set_key(), count=cls.LOAD_CHUNK_SIZE):
+            chunk.append(rkey)
+            if len(chunk) < cls.LOAD_CHUNK_SIZE:
+                continue
+
+            for item in await cls._iter_chunk(chunk, include_data):
+                yield item
+            chunk = []
+
+        for item in await cls._iter_chunk(chunk, include_data):
+            yield item
+
+    @classmethod
+    async def change_version(cls):
+        """ See Feature.change_version(). """
+
+        return int(await backend.get(cls._get_redis_change_version_key()) or 0)
+
+    @classmethod
+    async def changes_since(cls, version):
+        """ See Feature.changes_since(). """
+
+        async with backend.pipeline(transaction=True) as pipe:
+            cls._queue_changes_since(pipe, version)
+            return cls._get_changes_since(version, *await pipe.execute())
+
+    @classmethod
+    async def _log_change_async(cls, key):
+        """ See Feature._log_change(). """
+
+        log_script = backend.register_script(_LOG_CHANGE_SCRIPT)
+        version = await log_script(**cls._get_log_change_script_arguments(key))
+        if version < 0:
+            version = await cls._log_change_with_transaction_async(key)
+        return version
+
+    @classmethod
+    async def _log_change_with_transaction_async(cls, key):
+        """ See Feature._log_change_with_transaction(). """
+
+        version_key = cls._get_redis_change_version_key()
+        async with backend.pipeline() as pipe:
+            for _ in Feature._transaction_attempts(version_key):
+                try:
+                    await pipe.watch(version_key)
+                    version = int(await pipe.get(version_key) or 0) + 1
+
+                    pipe.multi()
+                    cls._queue_log_change(pipe, key, version)
+                    await pipe.execute()
+                    return version
+                except WatchError:
+                    continue
+
+    @classmethod
+    async def _iter_chunk(cls, rkeys, include_data):
+        """ Returns the items iter_features() yields for a chunk of keys. """
+
+        rkeys = cls._current_redis_keys(rkeys)
+        if not include_data:
+            return cls._get_feature_names_from_redis_keys(rkeys)
+
+        return await cls._load_summaries_async(rkeys)
+
+    @classmethod
+    async def _load_summaries_async(cls, keys):
+        """ See Feature._load_summaries(). """
+
+        summaries = []
+        for key, redis_data in zip(keys, await cls._load_many_redis_data_async(keys)):
+            feature_name = cls._get_feature_name_from_redis_key(key)
+            feature = cls._from_redis_data(feature_name, redis_data)
+            await feature.fetch_lists()
+            summaries.append((feature_name, feature._get_summary()))
+
+        return summaries
+
+    @classmethod
+    async def _load_many_redis_data_async(cls, keys):
+        """ See Feature._load_many_redis_data(). """
+
+        generation = Feature.cache.generation() if Feature.cache is not None else None
+        results, missing = cls._lookup_many_redis_data(keys)
+        if missing:
+            values = await cls._read_async(backend.mget, [keys[index] for index in missing])
+            if values is _UNAVAILABLE:
+                values = [_UNAVAILABLE] * len(missing)
+            cls._store_many_redis_data(keys, results, missing, values, generation)
+        return results
+
+    @staticmethod
+    async def _read_async(command, *args):
+        """ See Feature._read(). The breaker's call timeout, if any, cancels slower reads. """
+
+        breaker = Feature.circuit_breaker
+        if breaker is None:
+            return await command(*args)
+
+        if not breaker.allow():
+            breaker.fallbacks += 1
+            return _UNAVAILABLE
+
+        try:
+            result = await asyncio.wait_for(command(*args), breaker.call_timeout)
+        except breaker.errors + (asyncio.TimeoutError,):
+            breaker.record_failure()
+            breaker.fallbacks += 1
+            return _UNAVAILABLE
+        except Exception:
+            breaker.record_success()  # storage answered, if only with an error
+            raise
+
+        breaker.record_success()
+        return result
+
+    async def _change_list(self, operation, list_name, identifiers):
+        """ See Feature._change_list(). """
+
+        identifiers = list(identifiers)
+        if not identifiers:
+            return 0
+
+        if self._changes_blacklist_bloom_filter(operation, list_name):
+            return await self._add_to_blacklist_bloom_filter(identifiers)
+
+        if self.uses_redis_sets:
+            changed = await self._update_redis_set(operation, list_name, identifiers)
+        else:
+            changed = await self._update(operation, list_name, identifiers)
+
+        self._apply_locally(operation, list_name, identifiers)
+        return changed
+
+    async def _update_redis_set(self, operation, list_name, identifiers):
+        """ See Feature._update_redis_set(). """
+
+        async with backend.pipeline() as pipe:
+            self._queue_redis_set_update(pipe, operation, list_name, identifiers)
+            changed = (await pipe.execute())[0]
+        await self._log_change_async(self._get_redis_key())
+
+        self._invalidate()
+        return changed
+
+    async def _add_to_blacklist_bloom_filter(self, identifiers):
+        """ See Feature._add_to_blacklist_bloom_filter(). """
+
+        added = 0
+        for chunk in self._chunked(identifiers, Feature.LOAD_CHUNK_SIZE):
+            async with backend.pipeline(transaction=False) as pipe:
+                positions = self._queue_blacklist_bloom_additions(pipe, chunk)
+                added += self._count_blacklist_bloom_additions(positions, await pipe.execute())
+
+        await self._record_change_async()
+
+        self._add_to_blacklist_bloom_filter_locally(identifiers)
+        return added
+
+    async def _update(self, operation, field, value):
+        """ See Feature._update(). """
+
+        changed = -1
+        script_arguments = self._get_update_script_arguments(operation, field, value)
+        if script_arguments is not None:
+            update_script = backend.register_script(_UPDATE_SCRIPT)
+            changed = await update_script(**script_arguments)
+        if changed < 0:
+            changed = await self._update_with_transaction(operation, field, value)
+        await self._log_change_async(self._get_redis_key())
+
+        self._invalidate()
+        return changed
+
+    async def _update_with_transaction(self, operation, field, value):
+        """ See Feature._update_with_transaction(). """
+
+        key = self._get_redis_key()
+        async with backend.pipeline() as pipe:
+            for _ in Feature._transaction_attempts(key):
+                try:
+                    await pipe.watch(key)
+                    redis_data = self._get_settings_to_update(await pipe.get(key))
+                    changed = self._apply_update(redis_data, operation, field, value)
+
+                    pipe.multi()
+                    self._queue_save(pipe, redis_data)
+                    pipe.publish(Feature._get_redis_channel_key(), key)
+                    await pipe.execute()
+                    return changed
+                except WatchError:
+                    continue
+
+    async def _save(self):
+        """ See Feature._save(). """
+
+        data = self._get_redis_data()
+        async with backend.pipeline() as pipe:
+            self._queue_save(pipe, data)
+            await pipe.execute()
+        await self._record_change_async(lambda: self._save_locally(data))
+
+    async def _record_change_async(self, apply_locally=None):
+        """ See Feature._record_change(). """
+
+        key = self._get_redis_key()
+        await self._log_change_async(key)
+        (apply_locally or self._invalidate)()
+        await backend.publish(Feature._get_redis_channel_key(), key)
+
+    def _get_redis_set_members(self, list_name):
+        raise RuntimeError("call 'await feature.fetch_lists()' before reading the lists of a feature using Redis sets")
+
+    def _get_blacklist_bloom_filter(self):
+        raise RuntimeError("call 'await feature.fetch_lists()' before using the blacklist Bloom filter")
+
+    def _get_redis_set_members_among(self, list_name, identifiers):
+        raise RuntimeError("bulk evaluation of features using Redis sets is not supported by AsyncFeature")
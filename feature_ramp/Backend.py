@@ -0,0 +1,389 @@
+import fnmatch
+import threading
+
+try:
+    import queue
+except ImportError:  # Python 2
+    import Queue as queue
+
+try:
+    import redis as redis_py
+    from redis.exceptions import ConnectionError, TimeoutError, WatchError
+except ImportError:  # redis-py is only needed by RedisBackend
+    redis_py = None
+
+    class ConnectionError(Exception):
+        """ Raised when the storage backend cannot be reached. """
+
+    class TimeoutError(Exception):
+        """ Raised when the storage backend does not answer in time. """
+
+    class WatchError(Exception):
+        """ Raised when a watched key changes before a transaction is executed. """
+
+try:
+    text_type = unicode
+except NameError:  # Python 3
+    text_type = str
+
+
+class RedisBackend(object):
+    """
+    Stores features in Redis through redis-py.
+
+    No connection is made, and redis-py is not even required, until the
+    first command is sent. Connections are taken from a pool, configured
+    with the given arguments:
+
+    RedisBackend(host='redis.internal', max_connections=50, socket_timeout=0.1)
+    RedisBackend(url='redis://redis.internal:6379/0')
+
+    Any redis-py command can be called on the backend directly.
+    """
+
+    def __init__(self, url=None, **connection_kwargs):
+        self.url = url
+        self.connection_kwargs = connection_kwargs
+        self._client = None
+        self._scripts = {}
+        self._lock = threading.Lock()
+
+    @property
+    def client(self):
+        """ The redis-py client, created on first use. """
+
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    self._client = self._create_client()
+        return self._client
+
+    def register_script(self, script):
+        """ Returns a callable running the given Lua script, registered once per backend. """
+
+        if script not in self._scripts:
+            self._scripts[script] = self.client.register_script(script)
+        return self._scripts[script]
+
+    def _create_client(self):
+        """ Builds the connection pool and client. This does no network I/O either;
+        redis-py connects when the first command is sent.
+        """
+
+        if redis_py is None:
+            raise ImportError("RedisBackend requires redis-py: pip install redis")
+
+        if self.url is not None:
+            pool = redis_py.ConnectionPool.from_url(self.url, **self.connection_kwargs)
+        else:
+            pool = redis_py.ConnectionPool(**self.connection_kwargs)
+        return redis_py.StrictRedis(connection_pool=pool)
+
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+
+        command = getattr(self.client, name)
+        setattr(self, name, command)  # later lookups skip __getattr__
+        return command
+
+
+class AsyncRedisBackend(RedisBackend):
+    """
+    Stores features in Redis through the asyncio client of redis-py 4.2 or
+    later, for AsyncFeature. Commands return awaitables; otherwise it is
+    configured, and connects lazily, like RedisBackend.
+    """
+
+    def _create_client(self):
+        try:
+            from redis import asyncio as redis_asyncio
+        except ImportError:
+            raise ImportError("AsyncRedisBackend requires redis-py 4.2 or later: pip install 'redis>=4.2'")
+
+        if self.url is not None:
+            pool = redis_asyncio.ConnectionPool.from_url(self.url, **self.connection_kwargs)
+        else:
+            pool = redis_asyncio.ConnectionPool(**self.connection_kwargs)
+        return redis_asyncio.StrictRedis(connection_pool=pool)
+
+
+class InMemoryBackend(object):
+    """
+    Stores features in a dictionary in the current process, for tests and
+    local benchmarks. Supports the subset of Redis commands that
+    feature_ramp uses, with the same return values as redis-py, including
+    pipelines with WATCH/MULTI and pub/sub within the process.
+
+    Lua scripts are not executed: calling a registered script returns -1,
+    which Feature treats as the script declining, falling back to a
+    WATCH/MULTI transaction.
+
+    feature_ramp.set_backend(InMemoryBackend())
+    """
+
+    def __init__(self):
+        self._data = {}
+        self._versions = {}
+        self._subscribers = {}
+        self._lock = threading.RLock()
+
+    def get(self, name):
+        return self._value(self._data.get(self._encode(name)))
+
+    def mget(self, keys, *args):
+        keys = [self._encode(key) for key in list(keys) + list(args)]
+        with self._lock:
+            return [self._value(self._data.get(key)) for key in keys]
+
+    def set(self, name, value, nx=False):
+        name = self._encode(name)
+        with self._lock:
+            if nx and name in self._data:
+                return None
+            self._data[name] = self._encode(value)
+            self._touch(name)
+        return True
+
+    def delete(self, *names):
+        deleted = 0
+        with self._lock:
+            for name in map(self._encode, names):
+                if self._data.pop(name, None) is not None:
+                    deleted += 1
+                    self._touch(name)
+        return deleted
+
+    def exists(self, *names):
+        return len([name for name in map(self._encode, names) if name in self._data])
+
+    def setbit(self, name, offset, value):
+        name = self._encode(name)
+        index, mask = offset >> 3, 0x80 >> (offset & 7)
+        with self._lock:
+            bits = self._data.get(name)
+            if not isinstance(bits, bytearray):  # bitmaps are kept mutable
+                bits = self._data[name] = bytearray(bits or b'')
+            if len(bits) <= index:
+                bits.extend(b'\x00' * (index + 1 - len(bits)))
+
+            old_value = 1 if bits[index] & mask else 0
+            if value:
+                bits[index] |= mask
+            else:
+                bits[index] &= ~mask & 0xff
+            self._touch(name)
+        return old_value
+
+    def getbit(self, name, offset):
+        bits = self._data.get(self._encode(name)) or b''
+        index = offset >> 3
+        if index >= len(bits):
+            return 0
+        return 1 if bytearray(bits[index:index + 1])[0] & (0x80 >> (offset & 7)) else 0
+
+    def sadd(self, name, *values):
+        name = self._encode(name)
+        with self._lock:
+            members = self._data.setdefault(name, set())
+            added = set(self._encode(value) for value in values) - members
+            members.update(added)
+            self._touch(name)
+        return len(added)
+
+    def srem(self, name, *values):
+        name = self._encode(name)
+        with self._lock:
+            members = self._data.get(name, set())
+            removed = set(self._encode(value) for value in values) & members
+            members.difference_update(removed)
+            if not members:
+                self._data.pop(name, None)
+            self._touch(name)
+        return len(removed)
+
+    def sunionstore(self, dest, keys, *args):
+        keys = [keys] if isinstance(keys, (bytes, text_type)) else list(keys)
+        with self._lock:
+            members = set()
+            for key in keys + list(args):
+                members.update(self._data.get(self._encode(key), ()))
+            self.delete(dest)
+            if members:
+                self._data[self._encode(dest)] = members
+                self._touch(self._encode(dest))
+        return len(members)
+
+    def smembers(self, name):
+        with self._lock:
+            return set(self._data.get(self._encode(name), ()))
+
+    def sismember(self, name, value):
+        return self._encode(value) in self._data.get(self._encode(name), ())
+
+    def sscan_iter(self, name, match=None, count=None):
+        for member in self.smembers(name):
+            if match is None or fnmatch.fnmatchcase(member, self._encode(match)):
+                yield member
+
+    def zadd(self, name, mapping):
+        name = self._encode(name)
+        with self._lock:
+            scores = self._data.setdefault(name, dict())
+            added = len([member for member in mapping if self._encode(member) not in scores])
+            for member, score in mapping.items():
+                scores[self._encode(member)] = float(score)
+            self._touch(name)
+        return added
+
+    def zrangebyscore(self, name, min, max, withscores=False):
+        with self._lock:
+            scores = dict(self._data.get(self._encode(name), {}))
+        members = sorted((score, member) for member, score in scores.items()
+                         if float(min) <= score <= float(max))
+        if withscores:
+            return [(member, score) for score, member in members]
+        return [member for _, member in members]
+
+    def zremrangebyscore(self, name, min, max):
+        name = self._encode(name)
+        with self._lock:
+            scores = self._data.get(name, {})
+            removed = [member for member, score in scores.items() if float(min) <= score <= float(max)]
+            for member in removed:
+                del scores[member]
+            if not scores:
+                self._data.pop(name, None)
+            self._touch(name)
+        return len(removed)
+
+    def publish(self, channel, message):
+        channel = self._encode(channel)
+        with self._lock:
+            subscribers = list(self._subscribers.get(channel, ()))
+        for pubsub in subscribers:
+            pubsub._deliver('message', channel, self._encode(message))
+        return len(subscribers)
+
+    def pubsub(self, ignore_subscribe_messages=False):
+        return InMemoryPubSub(self, ignore_subscribe_messages)
+
+    def pipeline(self, transaction=True):
+        return InMemoryPipeline(self)
+
+    def register_script(self, script):
+        def decline(keys=None, args=None, client=None):
+            return -1
+        return decline
+
+    def flushdb(self):
+        with self._lock:
+            for name in list(self._data):
+                self._touch(name)
+            self._data.clear()
+        return True
+
+    def _value(self, value):
+        """ Returns a stored string value the way redis-py returns it. """
+
+        return bytes(value) if isinstance(value, bytearray) else value
+
+    def _touch(self, name):
+        """ Records that a key was written, invalidating WATCHes on it. """
+
+        self._versions[name] = self._versions.get(name, 0) + 1
+
+    def _encode(self, value):
+        """ Converts a value to bytes the way redis-py does before sending it. """
+
+        if isinstance(value, bytes):
+            return value
+        if not isinstance(value, text_type):
+            value = repr(value) if isinstance(value, float) else str(value)
+            if isinstance(value, bytes):
+                return value
+        return value.encode('utf-8')
+
+
+class InMemoryPipeline(object):
+    """ Queues commands for an InMemoryBackend and executes them atomically. """
+
+    def __init__(self, backend):
+        self._backend = backend
+        self.reset()
+
+    def watch(self, *names):
+        """ Watches keys for changes; until multi() is called commands run immediately. """
+
+        backend = self._backend
+        self._watched.update((name, backend._versions.get(name, 0)) for name in map(backend._encode, names))
+        self._immediate = True
+
+    def multi(self):
+        self._immediate = False
+
+    def execute(self):
+        backend = self._backend
+        with backend._lock:
+            try:
+                for name, version in self._watched.items():
+                    if backend._versions.get(name, 0) != version:
+                        raise WatchError("Watched variable changed.")
+                return [command(*args, **kwargs) for command, args, kwargs in self._commands]
+            finally:
+                self.reset()
+
+    def reset(self):
+        self._commands = []
+        self._watched = {}
+        self._immediate = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.reset()
+
+    def __getattr__(self, name):
+        command = getattr(self._backend, name)
+        if self._immediate:
+            return command
+
+        def queue_command(*args, **kwargs):
+            self._commands.append((command, args, kwargs))
+            return self
+        return queue_command
+
+
+class InMemoryPubSub(object):
+    """ Receives messages published on an InMemoryBackend. """
+
+    def __init__(self, backend, ignore_subscribe_messages=False):
+        self._backend = backend
+        self._ignore_subscribe_messages = ignore_subscribe_messages
+        self._messages = queue.Queue()
+        self.channels = set()
+
+    def subscribe(self, *channels):
+        with self._backend._lock:
+            for channel in map(self._backend._encode, channels):
+                self._backend._subscribers.setdefault(channel, set()).add(self)
+                self.channels.add(channel)
+                if not self._ignore_subscribe_messages:
+                    self._deliver('subscribe', channel, len(self.channels))
+
+    def get_message(self, ignore_subscribe_messages=False, timeout=0):
+        try:
+            return self._messages.get(timeout=timeout) if timeout else self._messages.get_nowait()
+        except queue.Empty:
+            return None
+
+    def close(self):
+        with self._backend._lock:
+            for channel in self.channels:
+                self._backend._subscribers.get(channel, set()).discard(self)
+            self.channels = set()
+
+    def _deliver(self, message_type, channel, data):
+        self._messages.put({'type': message_type, 'pattern': None,
+                            'channel': channel, 'data': data})
@@ -0,0 +1,101 @@
+import hashlib
+import math
+import struct
+
+try:
+    text_type = unicode
+except NameError:  # Python 3
+    text_type = str
+
+
+class BloomFilter(object):
+    """
+    A compact, probabilistic set of identifiers, used for blacklists too large
+    to store as lists (see Feature.use_blacklist_bloom_filter()).
+
+    Membership tests never miss an identifier that was added, but may report
+    identifiers that were not added (false positives), at a rate chosen when
+    the filter is sized. Identifiers cannot be removed.
+
+    The bits are laid out like a Redis bitmap, most significant bit first, so
+    the filter can be stored in a Redis string and updated with SETBIT and
+    GETBIT. Identifiers are hashed by their utf-8 encoded str(), so 3, '3' and
+    b'3' are the same identifier.
+
+    bloom = BloomFilter.for_capacity(1000000, error_rate=0.001)
+    bloom.add(identifier)
+    identifier in bloom
+    """
+
+    def __init__(self, num_bits, num_hashes, data=None):
+        if num_bits < 1 or num_hashes < 1:
+            raise ValueError("A Bloom filter needs at least one bit and one hash")
+
+        self.num_bits = num_bits
+        self.num_hashes = num_hashes
+
+        size = (num_bits + 7) // 8
+        self.data = bytearray(data or b'')[:size]
+        self.data.extend(b'\x00' * (size - len(self.data)))  # Redis omits trailing zero bytes
+
+    @classmethod
+    def for_capacity(cls, capacity, error_rate=0.001):
+        """ Returns an empty filter sized to hold ``capacity`` identifiers with a false
+        positive rate of ``error_rate``.
+        """
+
+        if capacity < 1:
+            raise ValueError("capacity must be at least 1")
+        if not 0 < error_rate < 1:
+            raise ValueError("error_rate must be between 0 and 1")
+
+        num_bits = int(math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        num_hashes = max(1, int(round(float(num_bits) / capacity * math.log(2))))
+        return cls(num_bits, num_hashes)
+
+    def positions(self, identifier):
+        """ Returns the bit offsets set for the identifier, by double hashing. """
+
+        return self.positions_for(identifier, self.num_bits, self.num_hashes)
+
+    @staticmethod
+    def positions_for(identifier, num_bits, num_hashes):
+        """ Returns the bit offsets set for the identifier in a filter of the given size. """
+
+        if not isinstance(identifier, (bytes, text_type)):
+            identifier = str(identifier)
+        if isinstance(identifier, text_type):
+            identifier = identifier.encode('utf-8')
+
+        first, second = struct.unpack('>QQ', hashlib.md5(identifier).digest())
+        second |= 1  # odd, so the offsets do not cycle early for even sizes
+        return [(first + index * second) % num_bits for index in range(num_hashes)]
+
+    def add(self, identifier):
+        """ Adds the identifier. Returns False if it was (probably) already present. """
+
+        data = self.data
+        added = False
+        for position in self.positions(identifier):
+            mask = 0x80 >> (position & 7)
+            if not data[position >> 3] & mask:
+                data[position >> 3] |= mask
+                added = True
+        return added
+
+    def update(self, identifiers):
+        """ Adds all of the identifiers. Returns how many were not already present. """
+
+        return len([identifier for identifier in identifiers if self.add(identifier)])
+
+    def __contains__(self, identifier):
+        data = self.data
+        for position in self.positions(identifier):
+            if not data[position >> 3] & (0x80 >> (position & 7)):
+                return False
+        return True
+
+    def to_bytes(self):
+        """ Returns the bitmap, as stored in Redis. """
+
+        return bytes(self.data)
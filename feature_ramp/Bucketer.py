@@ -0,0 +1,173 @@
+import math
+import zlib
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+try:
+    string_types = basestring
+except NameError:  # Python 3
+    string_types = str
+
+
+def _crc32_table():
+    """ Returns the lookup table of the reflected CRC-32 used by zlib.crc32. """
+
+    table = []
+    for byte in range(256):
+        crc = byte
+        for _ in range(8):
+            crc = (crc >> 1) ^ 0xedb88320 if crc & 1 else crc >> 1
+        table.append(crc)
+    return table
+
+
+class Bucketer(object):
+    """
+    Assigns identifiers to ramp buckets for Feature._is_ramped().
+
+    Every identifier is hashed into one of ``buckets`` buckets, shifted by an
+    offset derived from the feature (or feature group) name so that different
+    features ramp different users first. A feature ramped to a percentage is
+    visible to the identifiers in the first ``percentage * buckets / 100``
+    buckets, so 10000 buckets allow ramping in steps of 0.01%.
+
+    Subclasses provide the hash function. The bucketer used by all features
+    is configured on the Feature class:
+
+    Feature.bucketer = Crc32Bucketer(buckets=10000)
+    """
+
+    def __init__(self, buckets=100):
+        if buckets < 100 or buckets % 100:
+            raise ValueError("buckets must be a positive multiple of 100")
+
+        self.buckets = buckets
+
+    def hash(self, value):
+        """ Returns a non-negative integer hash of the given string. """
+
+        raise NotImplementedError
+
+    def offset(self, feature_name, feature_group_name=None):
+        """ Returns the offset added to every identifier's hash for a feature.
+        Features in the same group share the group's offset.
+        """
+
+        return self.hash(feature_group_name or feature_name) % self.buckets
+
+    def ranking(self, offset, identifier):
+        """ Returns the bucket of ``identifier`` for a feature with the given offset. """
+
+        return (offset + self.hash(self._get_key(identifier))) % self.buckets
+
+    def rankings(self, offset, identifiers):
+        """ Returns the bucket of each identifier, as ranking() would. """
+
+        buckets = self.buckets
+        hash_ = self.hash
+        get_key = self._get_key
+        return [(offset + hash_(get_key(identifier))) % buckets for identifier in identifiers]
+
+    def rankings_array(self, offset, identifiers):
+        """ Returns the buckets of a NumPy array of integer identifiers as a NumPy
+        array, as rankings() would. Subclasses may vectorize the hashing.
+        """
+
+        return numpy.array(self.rankings(offset, identifiers.tolist()), dtype=numpy.int64)
+
+    def threshold(self, percentage):
+        """ Returns the number of buckets ramped at the given percentage; identifiers
+        whose ranking is below it see the feature.
+        """
+
+        # round first so float noise such as 0.07 * 100 == 7.000000000000001
+        # does not ramp an extra bucket
+        return int(math.ceil(round(percentage * self.buckets / 100.0, 9)))
+
+    def normalize_percentage(self, percentage):
+        """ Truncates the percentage to the precision the buckets allow; an int for
+        100 buckets, and a float with more decimal places for finer bucketing.
+        """
+
+        # round first, as in threshold(), so float noise such as 0.57 * 10000 / 100
+        # == 56.99999999999999 does not truncate a valid step to the one below
+        ramped = int(round(float(percentage) * self.buckets / 100, 9))
+        if (ramped * 100) % self.buckets == 0:
+            return ramped * 100 // self.buckets
+        return ramped * 100.0 / self.buckets
+
+    def _get_key(self, identifier):
+        """ Returns the string hashed for an identifier; non-strings use their str(). """
+
+        return identifier if isinstance(identifier, string_types) else str(identifier)
+
+
+class Crc32Bucketer(Bucketer):
+    """
+    The default bucketer, hashing with zlib.crc32. Unlike the builtin hash(),
+    CRC32 is the same in every process and Python version, so every worker
+    puts an identifier in the same bucket.
+    """
+
+    _table = None
+
+    def hash(self, value):
+        if not isinstance(value, bytes):
+            value = value.encode('utf-8')
+        return zlib.crc32(value) & 0xffffffff
+
+    def rankings_array(self, offset, identifiers):
+        """ Computes the CRC32 of every identifier's decimal string with array operations,
+        one table lookup per digit position, instead of one zlib call per identifier.
+        """
+
+        if Crc32Bucketer._table is None:
+            Crc32Bucketer._table = numpy.array(_crc32_table(), dtype=numpy.uint32)
+        table = Crc32Bucketer._table
+
+        # the digits of str(identifier) are taken from its magnitude, most significant first
+        if identifiers.dtype.kind == 'u':
+            negative = numpy.zeros(len(identifiers), dtype=bool)
+            magnitude = identifiers.astype(numpy.uint64)
+        else:
+            signed = identifiers.astype(numpy.int64)
+            negative = signed < 0
+            # -(value + 1) + 1 does not overflow for the smallest int64
+            magnitude = numpy.where(negative, -(signed + 1), signed).astype(numpy.uint64) + negative
+        powers = numpy.array([10 ** exponent for exponent in range(20)], dtype=numpy.uint64)
+        lengths = numpy.searchsorted(powers[1:], magnitude, side='right') + 1
+
+        crc = numpy.full(len(identifiers), 0xffffffff, dtype=numpy.uint32)
+        if negative.any():
+            crc = numpy.where(negative, table[(crc ^ ord('-')) & 0xff] ^ (crc >> 8), crc)
+        for position in range(int(lengths.max()) if len(identifiers) else 0):
+            exponent = lengths - 1 - position
+            digits = (magnitude // powers[numpy.maximum(exponent, 0)] % 10).astype(numpy.uint32)
+            updated = table[(crc ^ (digits + ord('0'))) & 0xff] ^ (crc >> 8)
+            crc = numpy.where(exponent >= 0, updated, crc)
+        crc ^= numpy.uint32(0xffffffff)
+
+        return (crc.astype(numpy.int64) + offset) % self.buckets
+
+
+class LegacyHashBucketer(Bucketer):
+    """
+    Reproduces the bucketing of earlier releases, built on the builtin hash().
+    This includes the feature group offset not being reduced modulo 100, so
+    grouped features keep their assignments too.
+
+    Only use this to keep existing ramps stable while migrating: with hash
+    randomization (the default on Python 3) buckets differ between processes.
+    """
+
+    def __init__(self):
+        super(LegacyHashBucketer, self).__init__(buckets=100)
+
+    def hash(self, value):
+        return hash(value)
+
+    def offset(self, feature_name, feature_group_name=None):
+        return hash(feature_name) % 100 if not feature_group_name else hash(feature_group_name)
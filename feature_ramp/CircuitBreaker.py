@@ -0,0 +1,222 @@
+import threading
+import time
+
+from feature_ramp.Backend import ConnectionError, TimeoutError
+from feature_ramp.FeatureCache import _freeze_settings
+
+# Breaker states, see CircuitBreaker.state
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+class CircuitOpenError(ConnectionError):
+    """ Raised by CircuitBreaker.call() instead of calling storage while the breaker is open. """
+
+
+class CircuitBreaker(object):
+    """
+    Stops features from waiting on Redis while it is failing, so that a
+    latency spike or failover slows down no request by more than one timeout.
+
+    Once set as Feature.circuit_breaker, reads of settings and list
+    memberships go through call(). After ``failure_threshold`` consecutive
+    failures the breaker opens: reads are not sent at all, and features are
+    evaluated with the last settings loaded for them, the settings in
+    ``snapshot`` (a FeatureSnapshot) if they were never loaded, or their
+    ``default_percentage`` otherwise. Whitelists and blacklists kept in Redis
+    sets fall back the same way: identifiers are looked up in the members
+    last downloaded, or those in the snapshot, or are taken to be in neither
+    list. Only blacklist Bloom filters fail closed: if a filter was never
+    downloaded and is not in the snapshot, it is taken to hold every
+    identifier, hiding the feature from everyone but its whitelist. Listing the active features, as all_features() and
+    evaluate_all() do, falls back on the last list read or the features in the
+    snapshot. After ``reset_timeout`` seconds a single trial read is let through, which closes the breaker if
+    it succeeds and opens it again if not. Writes are never stopped.
+
+    Redis-py bounds every call by the socket timeouts of its connections,
+    which should be set to the longest acceptable wait; calls slower than
+    ``call_timeout``, if given, count as failures even if they succeed:
+
+    feature_ramp.set_backend(RedisBackend(host='redis.internal', socket_timeout=0.05,
+                                          socket_connect_timeout=0.05))
+    Feature.circuit_breaker = CircuitBreaker(failure_threshold=5, reset_timeout=10, call_timeout=0.02)
+    Feature.circuit_breaker.stats()  # e.g. for a health check
+
+    The counters are approximate, as some are updated without locking.
+    """
+
+    # the errors of a storage call that count as failures
+    errors = (ConnectionError, TimeoutError)
+
+    def __init__(self, failure_threshold=5, reset_timeout=10.0, call_timeout=None, snapshot=None,
+                 clock=time.time):
+        if failure_threshold < 1:
+            raise ValueError("failure_threshold must be at least 1")
+
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.call_timeout = call_timeout
+        self.snapshot = snapshot
+        self._clock = clock
+
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = None
+        self.times_opened = self.failed_calls = self.slow_calls = 0
+        self.rejected_calls = self.fallbacks = 0
+
+        self._last_known = dict()
+        self._last_known_lists = dict()
+        self._lock = threading.Lock()
+
+    def call(self, command, *args, **kwargs):
+        """ Calls a storage command, recording whether it failed. Raises CircuitOpenError
+        without calling it if the breaker is open, and re-raises the command's errors.
+        """
+
+        if not self.allow():
+            raise CircuitOpenError("Circuit breaker is open")
+
+        start = self._clock()
+        try:
+            result = command(*args, **kwargs)
+        except self.errors:
+            self.record_failure()
+            raise
+        except Exception:
+            self.record_success()  # storage answered, if only with an error
+            raise
+
+        self.record_success(self._clock() - start)
+        return result
+
+    def allow(self):
+        """ Returns true if a call may be sent to storage. Once the reset timeout has
+        passed, an open breaker lets a single trial call through.
+        """
+
+        if self.state == CLOSED:
+            return True
+
+        with self._lock:
+            if self.state == OPEN and self._clock() - self.opened_at >= self.reset_timeout:
+                self.state = HALF_OPEN
+                return True
+
+        self.rejected_calls += 1
+        return False
+
+    def record_success(self, seconds=0):
+        """ Records a call that succeeded in ``seconds``; calls slower than the call
+        timeout count as failures.
+        """
+
+        if self.call_timeout is not None and seconds > self.call_timeout:
+            self.slow_calls += 1
+            self.record_failure()
+            return
+
+        self.consecutive_failures = 0
+        if self.state != CLOSED:
+            with self._lock:
+                self.state = CLOSED
+                self.opened_at = None
+
+    def record_failure(self):
+        """ Records a failed call, opening the breaker if there have been too many in a
+        row or it was trying a call while open.
+        """
+
+        with self._lock:
+            self.failed_calls += 1
+            self.consecutive_failures += 1
+            if self.state == HALF_OPEN or (self.state == CLOSED and
+                                           self.consecutive_failures >= self.failure_threshold):
+                self.state = OPEN
+                self.opened_at = self._clock()
+                self.times_opened += 1
+
+    def remember(self, key, redis_data):
+        """ Keeps the settings loaded for the Redis key, frozen, to fall back on. """
+
+        self._last_known[key] = _freeze_settings(redis_data)
+
+    def remember_list(self, key, members):
+        """ Keeps a copy of the members of the Redis set holding a whitelist or blacklist,
+        or the bitmap of a blacklist Bloom filter, downloaded from the Redis key, or the
+        names of the active features listed from it.
+        """
+
+        self._last_known_lists[key] = list(members) if isinstance(members, list) else members
+
+    def fallback_settings(self, key, feature_name):
+        """ Returns the settings to evaluate a feature with when they cannot be loaded:
+        the last ones loaded, or those in the snapshot, or none at all, so that the
+        feature's default percentage applies.
+        """
+
+        redis_data = self._last_known.get(key)
+        if redis_data is not None:
+            return redis_data
+
+        if self.snapshot is not None and feature_name in self.snapshot:
+            return self.snapshot.get(feature_name)._get_redis_data()
+        return {}
+
+    def fallback_list(self, key, feature_name, list_name):
+        """ Returns the members of a feature's whitelist or blacklist, or the bitmap of its
+        blacklist Bloom filter ('blacklist_bloom'), when they cannot be downloaded: the
+        last ones downloaded, or those in the snapshot, or None if neither is known.
+        """
+
+        members = self._last_known_lists.get(key)
+        if members is not None:
+            return list(members) if isinstance(members, list) else members
+
+        if self.snapshot is None or feature_name not in self.snapshot:
+            return None
+        feature = self.snapshot.get(feature_name)
+        if list_name == 'blacklist_bloom':
+            bloom_filter = feature.blacklist_bloom_filter
+            return bloom_filter.to_bytes() if bloom_filter is not None else None
+        return getattr(feature, list_name)
+
+    def fallback_feature_names(self, key):
+        """ Returns the names of the active features when the Redis set listing them
+        cannot be read: the last ones read from it, or those in the snapshot, or None if
+        neither is known.
+        """
+
+        names = self._last_known_lists.get(key)
+        if names is not None:
+            return list(names)
+
+        if self.snapshot is None:
+            return None
+        return self.snapshot.feature_names()
+
+    def stats(self):
+        """ Returns the breaker's state and counters, for monitoring. """
+
+        return {
+            'state': self.state,
+            'consecutive_failures': self.consecutive_failures,
+            'times_opened': self.times_opened,
+            'failed_calls': self.failed_calls,
+            'slow_calls': self.slow_calls,
+            'rejected_calls': self.rejected_calls,
+            'fallbacks': self.fallbacks,
+            'last_known_features': len(self._last_known),
+            'last_known_lists': len(self._last_known_lists),
+        }
+
+    def reset(self):
+        """ Closes the breaker and clears its counters, keeping the last known settings. """
+
+        with self._lock:
+            self.state = CLOSED
+            self.consecutive_failures = 0
+            self.opened_at = None
+            self.times_opened = self.failed_calls = self.slow_calls = 0
+            self.rejected_calls = self.fallbacks = 0
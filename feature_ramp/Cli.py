@@ -0,0 +1,189 @@
+"""
+Bulk imports and exports of feature whitelists and blacklists:
+
+$ python -m feature_ramp.Cli import beta_program whitelist cohort.txt
+$ python -m feature_ramp.Cli import beta_program blacklist users.csv --csv --column 2 --header
+$ python -m feature_ramp.Cli export beta_program whitelist --output whitelist.txt
+$ python -m feature_ramp.Cli export-all --output features.jsonl
+
+Imports stream identifiers from files of one identifier per line (or CSV
+files, or - for stdin) and send them in batches, one pipeline of SADDs (or
+SREMs) per batch, straight to the Redis sets holding the list, so neither
+the list nor more than one batch of the input is ever held in memory (see
+Feature.import_many()). Imports therefore need the feature to use Redis
+sets; --use-redis-sets moves it to them first. Blacklists kept in a Bloom
+filter are imported with SETBITs instead. Both store identifiers as
+strings, so identifiers are imported as they are written. Duplicates within
+a batch are dropped before sending, and Redis skips identifiers that are
+already present. Exports stream the lists of features using Redis sets with
+SSCAN. Progress and throughput are reported on stderr.
+"""
+
+import argparse
+import csv
+import io
+import json
+import sys
+import time
+
+from feature_ramp.Feature import Feature
+
+try:
+    text_type = unicode
+except NameError:  # Python 3
+    text_type = str
+
+LISTS = ('whitelist', 'blacklist')
+
+
+def import_identifiers(feature_name, list_name, identifiers, batch_size=10000, remove=False, progress=None):
+    """ Adds (or removes) the identifiers to (or from) the feature's list with
+    Feature.import_many(). Returns how many identifiers were read and how many were changed.
+    """
+
+    return Feature(feature_name).import_many(list_name, identifiers, remove, batch_size, progress)
+
+
+def export_identifiers(feature_name, list_name, output, progress=None, batch_size=10000):
+    """ Writes the feature's list to ``output``, one identifier per line. Returns the
+    number written.
+    """
+
+    written = 0
+    for member in Feature(feature_name).iter_list(list_name, batch_size):
+        output.write(_to_text(member) + u'\n')
+        written += 1
+        if progress is not None and written % batch_size == 0:
+            progress(written, written)
+
+    return written
+
+
+def export_features(output, progress=None):
+    """ Writes the ramping data of every feature to ``output`` as JSON lines, each
+    holding the feature's name and its data as returned by all_features(). Returns
+    the number of features written.
+    """
+
+    written = 0
+    for feature_name, data in Feature.iter_features(include_data=True):
+        output.write(text_type(json.dumps(dict(data, feature=feature_name), sort_keys=True)) + u'\n')
+        written += 1
+        if progress is not None and written % Feature.LOAD_CHUNK_SIZE == 0:
+            progress(written, written)
+
+    return written
+
+
+def read_identifiers(lines, use_csv=False, column=0, header=False):
+    """ Yields the identifiers in an iterable of lines, one per line or, with
+    ``use_csv``, from the given column. Blank values are skipped.
+    """
+
+    rows = csv.reader(lines) if use_csv else ([line] for line in lines)
+    if header:
+        next(rows, None)
+
+    for row in rows:
+        if len(row) <= column:
+            continue
+        value = row[column].strip()
+        if value:
+            yield value
+
+
+def _to_text(identifier):
+    if isinstance(identifier, bytes):  # str on Python 2
+        return identifier.decode('utf-8')
+    return text_type(identifier)
+
+
+class ProgressReporter(object):
+    """ Writes running totals and throughput to a stream, at most once per ``interval`` seconds. """
+
+    def __init__(self, verb, stream=None, interval=1.0, clock=time.time):
+        self.verb = verb
+        self.stream = stream if stream is not None else sys.stderr
+        self.interval = interval
+        self._clock = clock
+        self.started = self._last_report = clock()
+
+    def __call__(self, processed, changed):
+        now = self._clock()
+        if now - self._last_report >= self.interval:
+            self._last_report = now
+            self.report(processed, changed)
+
+    def report(self, processed, changed):
+        elapsed = max(self._clock() - self.started, 1e-9)
+        self.stream.write("{0} {1} ({2} changed) in {3:.1f}s, {4:.0f}/s\n".format(
+            self.verb, processed, changed, elapsed, processed / elapsed))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Bulk imports and exports feature whitelists and blacklists.")
+    subparsers = parser.add_subparsers(dest='command')
+
+    import_parser = subparsers.add_parser('import', help="add identifiers from a file to a list")
+    import_parser.add_argument('feature')
+    import_parser.add_argument('list', choices=LISTS)
+    import_parser.add_argument('file', help="file of identifiers, or - for stdin")
+    import_parser.add_argument('--remove', action='store_true', help="remove the identifiers instead")
+    import_parser.add_argument('--batch-size', type=int, default=10000)
+    import_parser.add_argument('--csv', action='store_true', help="read a column of a CSV file")
+    import_parser.add_argument('--column', type=int, default=0, help="zero-based CSV column")
+    import_parser.add_argument('--header', action='store_true', help="skip the first line")
+    import_parser.add_argument('--use-redis-sets', action='store_true',
+                               help="move the feature's lists to Redis sets first, which imports need")
+
+    export_parser = subparsers.add_parser('export', help="write a list to a file, one identifier per line")
+    export_parser.add_argument('feature')
+    export_parser.add_argument('list', choices=LISTS)
+    export_parser.add_argument('--output', help="file to write to instead of stdout")
+
+    export_all_parser = subparsers.add_parser('export-all', help="write every feature to a file of JSON lines")
+    export_all_parser.add_argument('--output', help="file to write to instead of stdout")
+
+    for subparser in [import_parser, export_parser, export_all_parser]:
+        subparser.add_argument('--quiet', action='store_true', help="do not report progress")
+
+    args = parser.parse_args(argv)
+    if args.command is None:
+        parser.error("a command is required")
+
+    progress = None
+    if not args.quiet:
+        progress = ProgressReporter('Removed' if getattr(args, 'remove', False) else
+                                    'Imported' if args.command == 'import' else 'Exported')
+
+    if args.command == 'import':
+        if args.use_redis_sets and not Feature(args.feature).uses_redis_sets:
+            Feature(args.feature).use_redis_sets()
+
+        input_file = sys.stdin if args.file == '-' else open(args.file)
+        try:
+            identifiers = read_identifiers(input_file, args.csv, args.column, args.header)
+            processed, changed = import_identifiers(args.feature, args.list, identifiers,
+                                                    args.batch_size, args.remove, progress)
+        except ValueError as error:
+            parser.error(str(error))
+        finally:
+            if input_file is not sys.stdin:
+                input_file.close()
+    else:
+        output = sys.stdout if args.output is None else io.open(args.output, 'w', encoding='utf-8')
+        try:
+            if args.command == 'export':
+                processed = changed = export_identifiers(args.feature, args.list, output, progress)
+            else:
+                processed = changed = export_features(output, progress)
+        finally:
+            if output is not sys.stdout:
+                output.close()
+
+    if progress is not None:
+        progress.report(processed, changed)
+
+
+if __name__ == '__main__':
+    main()
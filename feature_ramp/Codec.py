@@ -0,0 +1,192 @@
+import json
+import struct
+import sys
+from array import array
+
+try:
+    text_type = unicode
+    integer_types = (int, long)
+except NameError:  # Python 3
+    text_type = str
+    integer_types = (int,)
+
+# array typecodes for unsigned integers of each width in bytes, on this platform
+_UNSIGNED_TYPECODES = dict()
+for _typecode in 'QLIHB':
+    try:
+        _UNSIGNED_TYPECODES.setdefault(array(_typecode).itemsize, _typecode)
+    except ValueError:  # 'Q' needs Python 3.3
+        pass
+
+
+class JsonCodec(object):
+    """
+    Encodes feature settings as JSON, the format of REDIS_VERSION 1. JSON
+    documents can be changed in place by Feature's update script.
+    """
+
+    scriptable = True
+
+    def encode(self, redis_data):
+        return json.dumps(redis_data)
+
+    def decode(self, raw):
+        return json.loads(raw)
+
+
+class BinaryCodec(object):
+    """
+    Encodes feature settings in a compact binary format, the format of
+    REDIS_VERSION 2, so that features with large whitelists and blacklists
+    take less memory in Redis and load faster.
+
+    Lists of only integers are stored as fixed-width offsets from their
+    smallest member, using the narrowest width that fits (e.g. 4 bytes each
+    for ids up to 4 billion apart), which decode at C speed through the
+    array module, and lists of only strings as their NUL separated utf-8
+    bytes. Other lists and fields are stored as a JSON trailer, so any
+    settings round-trip exactly, in order.
+
+    Layout (little-endian):
+        magic (3s), format version (B), has percentage (B), percentage (d)
+        whitelist, blacklist: kind (B: 0 in trailer, 1 integers, 2 strings), then
+            integers: count (I), base (q), width (B), offsets
+            strings:  count (I), length (I), NUL separated utf-8 bytes
+        trailer: length (I), JSON object of the remaining fields
+    """
+
+    MAGIC = b'\xfeFR'
+    FORMAT_VERSION = 1
+    LISTS = ('whitelist', 'blacklist')
+    scriptable = False
+
+    _HEADER = struct.Struct('<3sBBd')
+    _INTEGERS = struct.Struct('<IqB')
+    _STRINGS = struct.Struct('<II')
+    _LENGTH = struct.Struct('<I')
+    _KIND = struct.Struct('<B')
+
+    _IN_TRAILER, _INTEGER_LIST, _STRING_LIST = 0, 1, 2
+
+    def encode(self, redis_data):
+        rest = dict(redis_data)
+        percentage = rest.pop('percentage', None)
+        parts = [self._HEADER.pack(self.MAGIC, self.FORMAT_VERSION, percentage is not None, percentage or 0)]
+
+        for list_name in self.LISTS:
+            members = rest.get(list_name)
+            encoded = self._encode_list(members) if members is not None else None
+            if encoded is None:
+                parts.append(self._KIND.pack(self._IN_TRAILER))
+            else:
+                parts.append(encoded)
+                del rest[list_name]
+
+        trailer = json.dumps(rest).encode('utf-8') if rest else b''
+        parts.append(self._LENGTH.pack(len(trailer)))
+        parts.append(trailer)
+        return b''.join(parts)
+
+    def decode(self, raw):
+        _, version, has_percentage, percentage = self._HEADER.unpack_from(raw, 0)
+        if version != self.FORMAT_VERSION:
+            raise ValueError("Unsupported binary feature format version {0}".format(version))
+
+        redis_data = dict()
+        offset = self._HEADER.size
+        for list_name in self.LISTS:
+            kind = self._KIND.unpack_from(raw, offset)[0]
+            offset += self._KIND.size
+            if kind == self._INTEGER_LIST:
+                redis_data[list_name], offset = self._decode_integers(raw, offset)
+            elif kind == self._STRING_LIST:
+                redis_data[list_name], offset = self._decode_strings(raw, offset)
+
+        trailer_length = self._LENGTH.unpack_from(raw, offset)[0]
+        offset += self._LENGTH.size
+        if trailer_length:
+            redis_data.update(json.loads(raw[offset:offset + trailer_length].decode('utf-8')))
+
+        if has_percentage:
+            redis_data['percentage'] = int(percentage) if percentage.is_integer() else percentage
+        return redis_data
+
+    def _encode_list(self, members):
+        """ Returns the encoded list, or None if it must be stored in the trailer. """
+
+        if all(isinstance(member, integer_types) and not isinstance(member, bool) for member in members):
+            return self._encode_integers(members)
+        if all(isinstance(member, (bytes, text_type)) for member in members):
+            return self._encode_strings(members)  # None if a member contains NUL
+        return None
+
+    def _encode_integers(self, members):
+        base = min(members) if members else 0
+        if base < -2 ** 63 or (members and max(members) >= 2 ** 63):
+            return None
+
+        offsets = [member - base for member in members]
+        typecode = self._typecode_for(max(offsets) if offsets else 0)
+        return (self._KIND.pack(self._INTEGER_LIST) +
+                self._INTEGERS.pack(len(members), base, array(typecode).itemsize) +
+                self._to_bytes(array(typecode, offsets)))
+
+    def _encode_strings(self, members):
+        encoded = b'\x00'.join(member.encode('utf-8') if isinstance(member, text_type) else member
+                               for member in members)
+        if encoded.count(b'\x00') != max(len(members) - 1, 0):
+            return None
+        return (self._KIND.pack(self._STRING_LIST) +
+                self._STRINGS.pack(len(members), len(encoded)) +
+                encoded)
+
+    def _decode_integers(self, raw, offset):
+        count, base, width = self._INTEGERS.unpack_from(raw, offset)
+        offset += self._INTEGERS.size
+        offsets = self._from_bytes(raw, offset, count, width)
+        if base:
+            members = [base + member_offset for member_offset in offsets]
+        else:
+            members = offsets.tolist()
+        return members, offset + count * width
+
+    def _decode_strings(self, raw, offset):
+        count, length = self._STRINGS.unpack_from(raw, offset)
+        offset += self._STRINGS.size
+        if not count:
+            return [], offset
+        return raw[offset:offset + length].decode('utf-8').split(u'\x00'), offset + length
+
+    def _typecode_for(self, largest):
+        for width in sorted(_UNSIGNED_TYPECODES):
+            if largest < 2 ** (8 * width):
+                return _UNSIGNED_TYPECODES[width]
+        raise ValueError("{0} does not fit in an unsigned 64 bit integer".format(largest))
+
+    def _to_bytes(self, values):
+        if sys.byteorder == 'big':
+            values.byteswap()
+        return values.tobytes() if hasattr(values, 'tobytes') else values.tostring()
+
+    def _from_bytes(self, raw, offset, count, width):
+        values = array(_UNSIGNED_TYPECODES[width])
+        data = raw[offset:offset + count * width]
+        if hasattr(values, 'frombytes'):
+            values.frombytes(data)
+        else:
+            values.fromstring(data)
+        if sys.byteorder == 'big':
+            values.byteswap()
+        return values
+
+
+# The codec that writes each REDIS_VERSION. Any of them can be read by decode().
+CODECS = {1: JsonCodec(), 2: BinaryCodec()}
+
+
+def decode(raw):
+    """ Decodes settings written by any codec, detected from their first bytes. """
+
+    if raw[:len(BinaryCodec.MAGIC)] == BinaryCodec.MAGIC:
+        return CODECS[2].decode(raw)
+    return CODECS[1].decode(raw)
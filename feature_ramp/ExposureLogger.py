@@ -0,0 +1,187 @@
+import collections
+import json
+import random
+import threading
+import time
+
+import feature_ramp
+
+try:
+    text_type = unicode
+except NameError:  # Python 3
+    text_type = str
+
+
+class ExposureLogger(threading.Thread):
+    """
+    Records which identifiers were shown which features, for experiment
+    analysis, without slowing down evaluations.
+
+    Once set as Feature.exposure_logger, every is_visible() call hands its
+    decision to log(), which only samples, dedupes and appends it to a
+    bounded in-memory queue; a background thread writes the queue to a sink
+    in batches. When the queue is full, because the sink is slow or down,
+    new exposures are dropped and counted rather than waited on.
+
+    Repeated (feature, identifier, visible) exposures are logged once, so an
+    identifier that moves in or out of a feature, e.g. as it ramps, is logged
+    again. The exposures seen are remembered until ``dedupe_size`` of them
+    have been, after which they are forgotten all at once, so memory stays
+    bounded.
+
+    Usage:
+
+    Feature.exposure_logger = ExposureLogger(RedisStreamSink(), sample_rate=0.1)
+    Feature.exposure_logger.start()
+    ...
+    Feature.exposure_logger.stop()  # writes what is still queued
+
+    The counters (queued, dropped, deduped, sampled_out, written, failed) are
+    approximate, as they are updated without locking.
+    """
+
+    def __init__(self, sink, max_queue_size=10000, batch_size=500, flush_interval=1.0,
+                 sample_rate=1.0, dedupe_size=100000, clock=time.time):
+        super(ExposureLogger, self).__init__(name='ExposureLogger')
+        self.daemon = True
+
+        if not 0 <= sample_rate <= 1:
+            raise ValueError("sample_rate must be between 0 and 1")
+
+        self.sink = sink
+        self.max_queue_size = max_queue_size
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.sample_rate = sample_rate
+        self.dedupe_size = dedupe_size
+        self._clock = clock
+
+        self.queued = self.dropped = self.deduped = self.sampled_out = 0
+        self.written = self.failed = 0
+
+        self._queue = collections.deque()
+        self._seen = dict()
+        self._flush_lock = threading.Lock()
+        self._stopped = threading.Event()
+
+    def log(self, feature_name, identifier, visible, feature_group_name=None):
+        """ Queues an exposure to be written. Never blocks; returns whether it was queued. """
+
+        if self.sample_rate < 1 and random.random() >= self.sample_rate:
+            self.sampled_out += 1
+            return False
+
+        exposure = (feature_name, identifier, bool(visible))
+        try:
+            if exposure in self._seen:
+                self.deduped += 1
+                return False
+            if len(self._seen) >= self.dedupe_size:
+                self._seen = dict()
+            self._seen[exposure] = True
+        except TypeError:  # unhashable identifier, log it every time
+            pass
+
+        if len(self._queue) >= self.max_queue_size:
+            self.dropped += 1
+            return False
+
+        self._queue.append({
+            'feature': feature_name,
+            'feature_group': feature_group_name,
+            'identifier': identifier,
+            'visible': visible,
+            'timestamp': self._clock(),
+        })
+        self.queued += 1
+        return True
+
+    def run(self):
+        while not self._stopped.wait(self.flush_interval):
+            self.flush()
+
+    def stop(self, timeout=None):
+        """ Stops the background thread, then writes whatever is still queued. """
+
+        self._stopped.set()
+        if self.is_alive():
+            self.join(timeout)
+        self.flush()
+
+    def flush(self):
+        """ Writes every queued exposure to the sink, in batches. Returns the number written. """
+
+        written = 0
+        with self._flush_lock:
+            while self._queue:
+                batch = []
+                while self._queue and len(batch) < self.batch_size:
+                    batch.append(self._queue.popleft())
+
+                try:
+                    self.sink.write(batch)
+                except Exception:
+                    self.failed += len(batch)  # dropped, so a broken sink cannot back up the queue
+                else:
+                    self.written += len(batch)
+                    written += len(batch)
+        return written
+
+    def __len__(self):
+        return len(self._queue)
+
+
+class RedisStreamSink(object):
+    """
+    Appends exposures to a Redis stream, one entry each, through
+    feature_ramp.backend. The stream is capped at about ``max_length``
+    entries.
+
+    Entries have the fields feature, feature_group, identifier, visible
+    ('1' or '0') and timestamp.
+    """
+
+    def __init__(self, stream_key='feature.exposures', max_length=1000000):
+        self.stream_key = stream_key
+        self.max_length = max_length
+
+    def write(self, exposures):
+        pipe = feature_ramp.backend.pipeline(transaction=False)
+        for exposure in exposures:
+            pipe.xadd(self.stream_key, {
+                'feature': exposure['feature'],
+                'feature_group': exposure['feature_group'] or '',
+                'identifier': _to_text(exposure['identifier']),
+                'visible': '1' if exposure['visible'] else '0',
+                'timestamp': repr(exposure['timestamp']),
+            }, maxlen=self.max_length, approximate=True)
+        pipe.execute()
+
+
+class FileSink(object):
+    """ Appends exposures to a local file, one JSON object per line. """
+
+    def __init__(self, path):
+        self.path = path
+
+    def write(self, exposures):
+        lines = [json.dumps(dict(exposure, identifier=_to_json(exposure['identifier'])), sort_keys=True)
+                 for exposure in exposures]
+        with open(self.path, 'a') as exposure_file:
+            exposure_file.write('\n'.join(lines) + '\n')
+
+
+def _to_text(identifier):
+    if isinstance(identifier, bytes) and not isinstance(identifier, str):
+        return identifier.decode('utf-8')
+    if isinstance(identifier, (str, text_type)):
+        return identifier
+    return str(identifier)
+
+
+def _to_json(identifier):
+    """ Returns the identifier as it can be written to JSON; bytes are decoded. """
+
+    if isinstance(identifier, bytes) and not isinstance(identifier, str):
+        return identifier.decode('utf-8')
+    return identifier
@@ -1,6 +1,87 @@
+import itertools
 import json
-
-from feature_ramp import redis
+import numbers
+import time
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+import feature_ramp
+from feature_ramp import Codec, Targeting
+from feature_ramp.Backend import WatchError
+from feature_ramp.BloomFilter import BloomFilter
+from feature_ramp.Bucketer import Crc32Bucketer
+from feature_ramp.FeatureCache import _freeze_settings
+from feature_ramp.FeatureContext import FeatureContext
+from feature_ramp.Instrumentation import BLACKLIST, RAMP, TARGETING, WHITELIST
+from feature_ramp.RampSchedule import RampSchedule
+
+
+# Atomically sets fields of a feature's JSON settings (see Feature._update())
+# and returns 1. Redis runs scripts without serving other clients, so this
+# declines (returning -1) documents larger than ARGV[5] bytes, which are
+# updated with a transaction instead; so are whitelist and blacklist changes,
+# since those documents grow with the lists. Because Lua numbers are doubles
+# and cjson encodes them with 14 significant digits, it also declines to
+# rewrite any document holding numbers that would not survive the round trip,
+# and to create documents, which must start from the feature's local settings.
+# Backends that cannot run Lua decline the same way, as does the script for
+# documents that are not JSON (see Codec).
+_UPDATE_SCRIPT = """
+local function is_unsafe(value)
+    if type(value) == 'table' then
+        for _, item in pairs(value) do
+            if is_unsafe(item) then return true end
+        end
+        return false
+    end
+    return type(value) == 'number' and
+        (math.abs(value) >= 2^53 or tonumber(string.format('%.14g', value)) ~= value)
+end
+
+if redis.call('STRLEN', KEYS[1]) > tonumber(ARGV[5]) then return -1 end
+
+local raw = redis.call('GET', KEYS[1])
+if not raw or string.sub(raw, 1, 1) ~= '{' then return -1 end
+local data = cjson.decode(raw)
+
+local operation, field, value = ARGV[2], ARGV[3], cjson.decode(ARGV[4])
+if is_unsafe(data) or is_unsafe(value) then return -1 end
+
+if operation == 'set' then
+    data[field] = value
+elseif operation == 'merge' then
+    for name, item in pairs(value) do
+        if item == cjson.null then data[name] = nil else data[name] = item end
+    end
+end
+
+-- cjson encodes empty tables as objects, so drop them and let readers
+-- fall back to their default of an empty list
+for name, item in pairs(data) do
+    if type(item) == 'table' and next(item) == nil then data[name] = nil end
+end
+
+redis.call('SET', KEYS[1], cjson.encode(data))
+redis.call('SADD', KEYS[2], KEYS[1])
+redis.call('PUBLISH', ARGV[1], KEYS[1])
+return 1
+"""
+
+# Atomically records that a feature changed: bumps the global change version
+# and stores the feature's key in the change log with it as its score, then
+# drops entries too old to be kept. Returns the new version.
+_LOG_CHANGE_SCRIPT = """
+local version = redis.call('INCR', KEYS[1])
+redis.call('ZADD', KEYS[2], version, ARGV[1])
+redis.call('ZREMRANGEBYSCORE', KEYS[2], '-inf', version - tonumber(ARGV[2]))
+return version
+"""
+
+# returned by Feature._read() in place of a result when Feature.circuit_breaker stopped the read
+_UNAVAILABLE = object()
 
 
 class Feature(object):
@@ -15,45 +96,207 @@ class Feature(object):
     Feature("on_off_toggled").deactivate()
 
     Feature("all_functionality").set_percentage(5)
+    Feature("all_functionality").set_schedule(start_time, end_time, 5, 100, step=5)
     Feature("all_functionality").add_to_whitelist(identifier)
     Feature("all_functionality").is_visible(identifier)
+    Feature("all_functionality").filter_visible(identifiers)
+    Feature.evaluate_all(identifier)
     Feature("all_functionality").remove_from_whitelist(identifier)
     Feature("all_functionality").deactivate()
 
+    Feature("ios_in_ca").set_rules([{'attribute': 'platform', 'operator': 'eq', 'value': 'ios'},
+                                    {'attribute': 'region', 'operator': 'in', 'values': ['CA']}])
+    Feature("ios_in_ca").is_visible(identifier, attributes={'platform': 'ios', 'region': 'CA'})
+
     Feature("go_away").reset_settings()
     Feature("go_away").delete()
+
+    Very large whitelists and blacklists can be kept in native Redis sets:
+
+    Feature("beta_program").use_redis_sets()
+
+    and multi-million id blacklists in a Bloom filter, at the cost of wrongly
+    excluding a small fraction of other identifiers:
+
+    Feature("money_movement").use_blacklist_bloom_filter(capacity=5000000, error_rate=0.0001)
+
+    Settings can optionally be cached in-process (see FeatureCache):
+
+    Feature.cache = FeatureCache(max_size=1000, ttl=30)
+    FeatureSubscriber(Feature.cache).start()
+
+    and held for the length of a request (see FeatureContext):
+
+    with FeatureContext():
+        handle_request()
+
+    Reads can be kept from waiting on a failing Redis (see CircuitBreaker):
+
+    Feature.circuit_breaker = CircuitBreaker(failure_threshold=5, reset_timeout=10)
     """
 
     REDIS_NAMESPACE = 'feature'
+    # selects both the keys and the format (see Codec.CODECS) settings are written in;
+    # 2 is a compact binary format, see Migration for moving features to it
     REDIS_VERSION = 1
     REDIS_SET_KEY = 'active_features'
+    REDIS_CHANNEL_KEY = 'changes'
+    REDIS_CHANGE_VERSION_KEY = 'change_version'
+    REDIS_CHANGE_LOG_KEY = 'change_log'
+
+    # number of most recent change versions kept in the change log; see FeatureSync
+    CHANGE_LOG_SIZE = 10000
+
+    # number of features loaded per MGET when reading many features at once
+    LOAD_CHUNK_SIZE = 500
+
+    # largest settings document, in bytes, that scalar changes are applied to by a
+    # script inside Redis; larger ones are rewritten by the client in a transaction
+    UPDATE_SCRIPT_MAX_SIZE = 16384
+
+    # times an optimistic transaction is retried while other clients change its keys,
+    # before giving up with WatchError
+    TRANSACTION_MAX_ATTEMPTS = 100
+
+    # an optional FeatureCache consulted before Redis when loading settings
+    cache = None
+
+    # assigns identifiers to ramp buckets; see Bucketer
+    bucketer = Crc32Bucketer()
+
+    # an optional Instrumentation told about evaluations and cache lookups
+    instrumentation = None
+
+    # an optional ExposureLogger told about every is_visible() decision
+    exposure_logger = None
+
+    # an optional CircuitBreaker guarding reads; while it is open, or when a read
+    # fails, features are evaluated with their last known settings instead
+    circuit_breaker = None
 
     def __init__(self, feature_name, feature_group_name=None, default_percentage=0):
         self.feature_name = feature_name  # set here so redis_key() works
         self.feature_group_name = feature_group_name
+        self._ramp_offset = Feature.bucketer.offset(feature_name, feature_group_name)
 
-        key = self._get_redis_key()
-        redis_raw = redis.get(key)
-        redis_data = self._deserialize(redis_raw)
+        self._set_redis_data(self._load_redis_data(), default_percentage)
 
-        self.whitelist = redis_data.get('whitelist', [])
-        self.blacklist = redis_data.get('blacklist', [])
-        self.percentage = redis_data.get('percentage', default_percentage)
+    @classmethod
+    def evaluate_all(cls, identifier, names=None, feature_group_names=None, default_percentage=0,
+                     attributes=None):
+        """ Returns a dict mapping feature names to whether each feature is visible to
+        the given identifier (with the given attributes), using the same rules as is_visible().
+
+        All settings are fetched with a single MGET (cached settings are not fetched at
+        all). If no names are given, every active feature is evaluated, which costs one
+        more round trip to list them. ``feature_group_names`` optionally maps feature
+        names to their group name.
+        """
+
+        if names is None:
+            names = cls.all_features()
+
+        feature_group_names = feature_group_names or {}
+        keys = [cls._get_redis_key_for_feature(name) for name in names]
 
-    def is_visible(self, identifier):
+        visibility = dict()
+        for name, redis_data in zip(names, cls._load_many_redis_data(keys)):
+            feature = cls._from_redis_data(name, redis_data,
+                                           feature_group_name=feature_group_names.get(name),
+                                           default_percentage=default_percentage)
+            visibility[name] = feature.is_visible(identifier, attributes)
+
+        return visibility
+
+    def is_visible(self, identifier, attributes=None):
         """ Returns true if the feature is visible to the given identifier.
         Whitelisted users are always on even if they are also blacklisted.
         Blacklisted users are always off unless whitelisted.
+        If the feature has targeting rules (see set_rules()), other users are off
+        unless their ``attributes`` match the rules.
         For users neither white or blacklisted, it will respect ramp percentage.
+        Inside a FeatureContext, the answer is remembered for the rest of the context.
+        Decisions are reported to Feature.exposure_logger, if one is set.
+        """
+
+        return self._decide(identifier, attributes)
+
+    def _decide(self, identifier, attributes=None, ranking=None):
+        """ Implements is_visible(), given the identifier's ramp ranking if it is already
+        known, as for the features of a FeatureGroup.
+        """
+
+        visible = self._recall_decision(identifier, attributes)
+        if visible is None:
+            visible = self._remember_decision(identifier, attributes, self._evaluate(identifier, attributes, ranking))
+        return self._report_decision(identifier, visible)
+
+    def _recall_decision(self, identifier, attributes):
+        """ Returns the decision the current FeatureContext remembers for the identifier,
+        or None if there is none.
+        """
+
+        context = FeatureContext.current()
+        if context is None:
+            return None
+        return context.get_decision(self, identifier, attributes)
+
+    def _remember_decision(self, identifier, attributes, visible):
+        """ Remembers a new decision in the current FeatureContext, if any, and returns it. """
+
+        context = FeatureContext.current()
+        if context is not None:
+            context.set_decision(self, identifier, visible, attributes)
+        return visible
+
+    def _report_decision(self, identifier, visible):
+        """ Reports a decision to Feature.exposure_logger, if one is set, and returns it. """
+
+        if Feature.exposure_logger is not None:
+            Feature.exposure_logger.log(self.feature_name, identifier, visible, self.feature_group_name)
+        return visible
+
+    def _evaluate(self, identifier, attributes=None, ranking=None):
+        """ Decides is_visible(), reporting the decision path to Feature.instrumentation. """
+
+        whitelisted = self.is_whitelisted(identifier)
+        blacklisted = not whitelisted and self.is_blacklisted(identifier)
+        return self._evaluate_membership(identifier, whitelisted, blacklisted, attributes, ranking)
+
+    def _evaluate_membership(self, identifier, whitelisted, blacklisted, attributes=None, ranking=None):
+        """ Decides is_visible() once the identifier's whitelist and blacklist membership
+        are known, reporting the decision path to Feature.instrumentation.
         """
 
-        if self.is_whitelisted(identifier):
+        instrumentation = Feature.instrumentation
+
+        if whitelisted:
+            if instrumentation is not None:
+                instrumentation.evaluation(self.feature_name, WHITELIST)
             return True
 
-        if self.is_blacklisted(identifier):
+        if blacklisted:
+            if instrumentation is not None:
+                instrumentation.evaluation(self.feature_name, BLACKLIST)
             return False
 
-        return self._is_ramped(identifier)
+        if not self.matches_rules(attributes):
+            if instrumentation is not None:
+                instrumentation.evaluation(self.feature_name, TARGETING)
+            return False
+
+        if instrumentation is not None:
+            instrumentation.evaluation(self.feature_name, RAMP)
+        return self._is_ramped(identifier, ranking)
+
+    def matches_rules(self, attributes):
+        """ Returns true if the attributes match every one of the feature's targeting
+        rules, or the feature has none. ``attributes`` may be None.
+        """
+
+        if self._rules_predicate is None:
+            return True
+        return self._rules_predicate(attributes or {})
 
     @property
     def is_active(self):
@@ -63,17 +306,147 @@ class Feature(object):
 
         return self.percentage > 0
 
+    @property
+    def percentage(self):
+        """ The percentage the feature is ramped to. While the feature has a ramp
+        schedule (see set_schedule()), this is the percentage the schedule gives for
+        the current time.
+        """
+
+        if self.schedule is None:
+            return self._percentage
+        return Feature.bucketer.normalize_percentage(self.schedule.percentage_at(time.time()))
+
+    @percentage.setter
+    def percentage(self, percentage):
+        self._percentage = percentage
+
+    @property
+    def whitelist(self):
+        """ The list of whitelisted identifiers. If the feature uses Redis sets, the
+        whitelist is only downloaded the first time it is accessed.
+        """
+
+        if self._whitelist is None:
+            self.whitelist = self._get_redis_set_members('whitelist')
+        return list(self._whitelist)
+
+    @whitelist.setter
+    def whitelist(self, whitelist):
+        self._set_members('whitelist', whitelist)
+
+    @property
+    def blacklist(self):
+        """ The list of blacklisted identifiers. If the feature uses Redis sets, the
+        blacklist is only downloaded the first time it is accessed.
+        """
+
+        if self._blacklist is None:
+            self.blacklist = self._get_redis_set_members('blacklist')
+        return list(self._blacklist)
+
+    @blacklist.setter
+    def blacklist(self, blacklist):
+        self._set_members('blacklist', blacklist)
+
+    def _set_members(self, list_name, members, member_set=None):
+        """ Sets the whitelist or blacklist, kept as a tuple and a frozenset so that
+        they can be shared with FrozenSettings. ``member_set`` is the frozenset of the
+        members, if it is already known.
+        """
+
+        members = tuple(members)
+        setattr(self, '_' + list_name, members)
+        setattr(self, '_' + list_name + '_set', frozenset(members) if member_set is None else member_set)
+        setattr(self, '_' + list_name + '_arrays', {})
+
     def is_whitelisted(self, identifier):
         """ Given a identifier, returns true if the id is present in the whitelist. """
 
-        return identifier in self.whitelist
+        if self.uses_redis_sets:
+            return self._is_member('whitelist', identifier, self._read(
+                feature_ramp.backend.sismember, self._get_redis_list_key('whitelist'), identifier))
+
+        return identifier in self._whitelist_set
 
     def is_blacklisted(self, identifier):
-        """ Given a identifier, returns true if the id is present in the blacklist. """
+        """ Given a identifier, returns true if the id is present in the blacklist, or
+        (probably) present in the feature's blacklist Bloom filter. See CircuitBreaker for
+        how the check falls back if the breaker stops it.
+        """
+
+        if self.uses_redis_sets:
+            blacklisted = self._is_member('blacklist', identifier, self._read(
+                feature_ramp.backend.sismember, self._get_redis_list_key('blacklist'), identifier))
+        else:
+            blacklisted = identifier in self._blacklist_set
+
+        if not blacklisted and self.blacklist_bloom is not None:
+            blacklisted = self._is_in_blacklist_bloom_filter(identifier)
+        return blacklisted
+
+    def _is_member(self, list_name, identifier, is_member):
+        """ Interprets the SISMEMBER reply for the identifier in the Redis set holding the
+        whitelist or blacklist. If Feature.circuit_breaker stopped the read, the identifier
+        is looked up in the last known members of the list instead, as the lists of
+        features not using Redis sets are taken from their last known settings.
+        """
+
+        if is_member is not _UNAVAILABLE:
+            return bool(is_member)
+        return self._to_redis_member(identifier) in self._get_known_members(list_name)
+
+    def _get_known_members(self, list_name):
+        """ Returns the set of members of the whitelist or blacklist kept in Redis sets
+        that is known without reading Redis: the one downloaded by this object, or the
+        one Feature.circuit_breaker falls back on, which is then kept like a download.
+        """
+
+        if getattr(self, '_' + list_name) is None:
+            members = self._get_fallback_list(list_name)
+            if members is None:
+                return set()
+            setattr(self, list_name, members)
+        return getattr(self, '_' + list_name + '_set')
+
+    @property
+    def blacklist_bloom_filter(self):
+        """ The BloomFilter holding the rest of the blacklist, or None if the feature
+        does not use one. It is only downloaded the first time it is accessed.
+        """
+
+        if self._blacklist_bloom_filter is None and self.blacklist_bloom is not None:
+            self._blacklist_bloom_filter = self._get_blacklist_bloom_filter()
+        return self._blacklist_bloom_filter
+
+    def _is_in_blacklist_bloom_filter(self, identifier):
+        """ Checks the blacklist Bloom filter, locally if it has been downloaded and
+        otherwise with one pipeline of GETBITs.
+        """
+
+        if self._blacklist_bloom_filter is not None:
+            return identifier in self._blacklist_bloom_filter
 
-        return identifier in self.blacklist
+        pipe = feature_ramp.backend.pipeline(transaction=False)
+        self._queue_blacklist_bloom_lookup(pipe, identifier)
+        return self._is_set_in_blacklist_bloom_filter(self._read(pipe.execute))
 
-    def _is_ramped(self, identifier):
+    def _queue_blacklist_bloom_lookup(self, pipe, identifier):
+        """ Queues the GETBITs of the identifier's bits in the blacklist Bloom filter. """
+
+        key = self._get_redis_list_key('blacklist_bloom')
+        for position in self._get_blacklist_bloom_positions(identifier):
+            pipe.getbit(key, position)
+
+    @staticmethod
+    def _is_set_in_blacklist_bloom_filter(bits):
+        """ Interprets the replies to _queue_blacklist_bloom_lookup(); if Feature.circuit_breaker
+        stopped the read, the identifier is treated as blacklisted.
+        """
+
+        return bits is _UNAVAILABLE or all(bits)
+
+    def _is_ramped(self, identifier, ranking=None):
         """
         Checks whether ``identifier`` is ramped for this feature or not.
         ``identifier`` can be a user_id, email address, etc
@@ -89,19 +462,189 @@ class Feature(object):
         getting the first percent of experimental changes (e.g.,
         user.id in {1, 101, 202, ...}). To achieve this, whether or not
         this user is ramped is computed by hashing the feature name and
-        combining this hash with the user's integer id, using the
+        combining this hash with the hash of the user's id, using the
         modulus operator to distribute the results evenly on a scale
-        of 0 to 100.
+        of 0 to 100 (or finer, see Bucketer).
 
         Returns True if the feature is ramped high enough that the
         feature should be visible to the user with that id, and False
-        if not.
+        if not. ``ranking`` is the identifier's ranking, if already known.
+        """
+        bucketer = Feature.bucketer
+        if ranking is None:
+            ranking = bucketer.ranking(self._ramp_offset, identifier)
+
+        return ranking < bucketer.threshold(self.percentage)
+
+    def visible_mask(self, identifiers, attributes=None):
+        """ Returns a list of booleans, one per identifier, with the same result as
+        calling is_visible() on each. Intended for bulk evaluation of many identifiers,
+        e.g. in offline jobs. ``attributes`` optionally lists each identifier's
+        attributes, in the same order, for features with targeting rules.
+
+        The ramp offset is computed once, and if the feature uses Redis sets their
+        membership is checked with one pipeline per chunk of identifiers. A NumPy array
+        of identifiers is also accepted, in which case a NumPy boolean array is returned;
+        arrays of integers are hashed and checked with array operations.
+        """
+
+        is_array = numpy is not None and isinstance(identifiers, numpy.ndarray)
+        if is_array and identifiers.dtype.kind in 'iu' and identifiers.ndim == 1:
+            return self._visible_mask_array(identifiers, attributes)
+        if is_array:
+            identifiers = identifiers.tolist()
+
+        mask = self._visible_mask(identifiers, attributes)
+        if is_array:
+            return numpy.array(mask, dtype=bool)
+        return mask
+
+    def _visible_mask(self, identifiers, attributes=None, rankings=None):
+        """ Implements visible_mask() for a list or iterable of identifiers, given their
+        ramp rankings if they are already known, as for the features of a FeatureGroup.
+        """
+
+        has_bloom_filter = self.blacklist_bloom is not None
+        has_rules = self._rules_predicate is not None
+        if self.uses_redis_sets or has_bloom_filter or has_rules or Feature.instrumentation is not None:
+            identifiers = list(identifiers)
+
+        if self.uses_redis_sets:
+            whitelist = self._get_redis_set_members_among('whitelist', identifiers)
+            blacklist = self._get_redis_set_members_among('blacklist', identifiers)
+        else:
+            whitelist = self._whitelist_set
+            blacklist = self._blacklist_set
+
+        if has_bloom_filter:
+            bloom_filter = self.blacklist_bloom_filter
+            blacklist = set(blacklist)
+            blacklist.update(identifier for identifier in identifiers if identifier in bloom_filter)
+
+        percentage = self.percentage
+
+        if percentage >= 100:
+            mask = [identifier in whitelist or identifier not in blacklist
+                    for identifier in identifiers]
+        elif percentage <= 0:
+            mask = [identifier in whitelist for identifier in identifiers]
+        else:
+            identifiers = list(identifiers)
+            threshold = Feature.bucketer.threshold(percentage)
+            if rankings is None:
+                rankings = Feature.bucketer.rankings(self._ramp_offset, identifiers)
+            mask = [identifier in whitelist or
+                    (identifier not in blacklist and ramp_ranking < threshold)
+                    for identifier, ramp_ranking in zip(identifiers, rankings)]
+
+        targeted = None
+        if has_rules:
+            attributes = attributes if attributes is not None else [None] * len(identifiers)
+            targeted = [self.matches_rules(identifier_attributes) for identifier_attributes in attributes]
+            mask = [visible and (is_targeted or identifier in whitelist)
+                    for identifier, visible, is_targeted in zip(identifiers, mask, targeted)]
+
+        if Feature.instrumentation is not None:
+            self._record_evaluations(identifiers, whitelist, blacklist, targeted)
+
+        return mask
+
+    def _visible_mask_array(self, identifiers, attributes=None):
+        """ Implements visible_mask() for a NumPy array of integer identifiers. """
+
+        if self.uses_redis_sets:
+            whitelist = self._get_redis_set_members_among('whitelist', identifiers.tolist())
+            blacklist = self._get_redis_set_members_among('blacklist', identifiers.tolist())
+            whitelisted = numpy.isin(identifiers, self._integer_array(whitelist, identifiers.dtype))
+            blacklisted = numpy.isin(identifiers, self._integer_array(blacklist, identifiers.dtype))
+        else:
+            whitelisted = numpy.isin(identifiers, self._member_array('whitelist', identifiers.dtype))
+            blacklisted = numpy.isin(identifiers, self._member_array('blacklist', identifiers.dtype))
+
+        if self.blacklist_bloom is not None:
+            bloom_filter = self.blacklist_bloom_filter
+            blacklisted |= numpy.array([identifier in bloom_filter for identifier in identifiers.tolist()], dtype=bool)
+
+        percentage = self.percentage
+        if percentage >= 100:
+            ramped = numpy.ones(len(identifiers), dtype=bool)
+        elif percentage <= 0:
+            ramped = numpy.zeros(len(identifiers), dtype=bool)
+        else:
+            bucketer = Feature.bucketer
+            ramped = bucketer.rankings_array(self._ramp_offset, identifiers) < bucketer.threshold(percentage)
+
+        targeted = numpy.ones(len(identifiers), dtype=bool)
+        if self._rules_predicate is not None:
+            attributes = attributes if attributes is not None else [None] * len(identifiers)
+            targeted = numpy.array([self.matches_rules(identifier_attributes)
+                                    for identifier_attributes in attributes], dtype=bool)
+
+        mask = whitelisted | (~blacklisted & targeted & ramped)
+
+        instrumentation = Feature.instrumentation
+        if instrumentation is not None:
+            unlisted = ~whitelisted & ~blacklisted
+            counts = {WHITELIST: int(whitelisted.sum()),
+                      BLACKLIST: int((~whitelisted & blacklisted).sum()),
+                      TARGETING: int((unlisted & ~targeted).sum()),
+                      RAMP: int((unlisted & targeted).sum())}
+            for decision, count in counts.items():
+                if count:
+                    instrumentation.evaluation(self.feature_name, decision, count)
+
+        return mask
+
+    def _member_array(self, list_name, dtype):
+        """ Returns the local whitelist or blacklist as an array for _visible_mask_array(),
+        converted once per type of identifiers until the list changes.
         """
-        consistent_offset = hash(self.feature_name) % 100 if not self.feature_group_name else hash(self.feature_group_name)
-        identifier = identifier if isinstance(identifier, basestring) else str(identifier)
-        ramp_ranking = (consistent_offset + hash(identifier)) % 100
 
-        return ramp_ranking < self.percentage
+        arrays = getattr(self, '_' + list_name + '_arrays')
+        if dtype not in arrays:
+            arrays[dtype] = self._integer_array(getattr(self, '_' + list_name + '_set'), dtype)
+        return arrays[dtype]
+
+    @staticmethod
+    def _integer_array(members, dtype):
+        """ Returns the members that can equal an integer identifier of the given NumPy
+        type as an array of that type; strings and out of range numbers never do.
+        """
+
+        limits = numpy.iinfo(dtype)
+        return numpy.array([member for member in members
+                            if isinstance(member, numbers.Integral) and limits.min <= member <= limits.max],
+                           dtype=dtype)
+
+    def _record_evaluations(self, identifiers, whitelist, blacklist, targeted=None):
+        """ Reports the decision paths visible_mask() took to Feature.instrumentation. """
+
+        counts = {WHITELIST: 0, BLACKLIST: 0, TARGETING: 0, RAMP: 0}
+        for index, identifier in enumerate(identifiers):
+            if identifier in whitelist:
+                counts[WHITELIST] += 1
+            elif identifier in blacklist:
+                counts[BLACKLIST] += 1
+            elif targeted is not None and not targeted[index]:
+                counts[TARGETING] += 1
+            else:
+                counts[RAMP] += 1
+
+        for decision, count in counts.items():
+            if count:
+                Feature.instrumentation.evaluation(self.feature_name, decision, count)
+
+    def filter_visible(self, identifiers, attributes=None):
+        """ Returns the identifiers the feature is visible to, in their original order.
+        See visible_mask().
+        """
+
+        if numpy is not None and isinstance(identifiers, numpy.ndarray):
+            return identifiers[self.visible_mask(identifiers, attributes)]
+
+        identifiers = list(identifiers)
+        return [identifier for identifier, visible
+                in zip(identifiers, self.visible_mask(identifiers, attributes)) if visible]
 
     def activate(self):
         """ Ramp feature to 100%. This is a convenience method useful for single-toggle features. """
@@ -118,57 +661,644 @@ class Feature(object):
         the whitelist and blacklist are emptied.
         """
 
-        self.percentage = 0
-        self.whitelist = []
-        self.blacklist = []
+        list_keys = self._get_redis_list_keys_in_use()
+        if list_keys:
+            feature_ramp.backend.delete(*list_keys)
+
+        self._reset_locally()
         self._save()
 
     def delete(self):
         """ Deletes the feature settings from Redis entirely. """
 
-        key = self._get_redis_key()
-        redis.delete(key)
-        redis.srem(Feature._get_redis_set_key(), key)
+        pipe = feature_ramp.backend.pipeline()
+        self._queue_delete(pipe)
+        pipe.execute()
+        self._record_change(self._delete_locally)
 
     def set_percentage(self, percentage):
         """ Ramps the feature to the given percentage.
 
         If percentage is not a number between 0 and 100 inclusive, ValueError is raised.
-        Calls int() on percentage because we are using modulus to select the users
-        being shown the feature in _is_ramped(); floats will truncated.
+        The percentage is truncated to the precision of the bucketer's buckets because
+        we are using modulus to select the users being shown the feature in _is_ramped();
+        with the default 100 buckets, floats will truncated to integers.
+
+        Any ramp schedule is removed; feature.set_percentage(feature.percentage) stops
+        a scheduled ramp where it is.
         """
 
-        percentage = int(float(percentage))
-        if (percentage < 0 or percentage > 100):
-            raise ValueError("Percentage is not a valid integer")
+        update = self._percentage_update(percentage)
+        self._update(*update)
+        self._apply_locally(*update)
 
-        self.percentage = percentage
-        self._save()
+    def set_schedule(self, start_time, end_time, start_percentage, end_percentage, step=None):
+        """ Ramps the feature gradually from ``start_percentage`` at ``start_time`` to
+        ``end_percentage`` at ``end_time``, linearly or in increments of ``step``
+        percentage points; see RampSchedule. The schedule is saved once, and every
+        process computes the current percentage locally, so the feature's settings do
+        not change, and caches of them stay valid, for the whole ramp.
+
+        The percentage stored by set_percentage() is ignored while the schedule is set,
+        including after it ends, when the feature stays at ``end_percentage``.
+        Invalid schedules raise ValueError and are not saved.
+        """
+
+        update = self._schedule_update(start_time, end_time, start_percentage, end_percentage, step)
+        self._update(*update)
+        self._apply_locally(*update)
+
+    def set_rules(self, rules):
+        """ Replaces the feature's targeting rules; see Targeting.compile_rules() for
+        their format. Only identifiers whose attributes match every rule are then
+        ramped, while whitelisted identifiers still always see the feature. Pass an
+        empty list to remove the rules.
+
+        Malformed rules raise ValueError and are not saved.
+        """
+
+        update = self._rules_update(rules)
+        self._update(*update)
+        self._apply_locally(*update)
 
     def add_to_whitelist(self, identifier):
         """ Whitelist the given identifier to always see the feature regardless of ramp. """
 
-        self.whitelist.append(identifier)
-        self._save()
+        self._change_list('add', 'whitelist', [identifier])
+
+    def add_many_to_whitelist(self, identifiers):
+        """ Whitelist all of the given identifiers in a single update. Identifiers that
+        are already whitelisted are skipped. Returns the number of identifiers added.
+        """
+
+        return self._change_list('add', 'whitelist', identifiers)
 
     def remove_from_whitelist(self, identifier):
-        """ Remove the given identifier from the whitelist to respect ramp percentage. """
+        """ Remove the given identifier from the whitelist to respect ramp percentage.
+        Raises ValueError if the identifier is not whitelisted.
+        """
 
-        self.whitelist.remove(identifier)
-        self._save()
+        if not self._change_list('remove', 'whitelist', [identifier]):
+            raise ValueError("{0} is not in the whitelist".format(identifier))
+
+    def remove_many_from_whitelist(self, identifiers):
+        """ Remove all of the given identifiers from the whitelist in a single update.
+        Returns the number of identifiers removed.
+        """
+
+        return self._change_list('remove', 'whitelist', identifiers)
 
     def add_to_blacklist(self, identifier):
         """ Blacklist the given identifier to never see the feature regardless of ramp. """
 
-        self.blacklist.append(identifier)
-        self._save()
+        self._change_list('add', 'blacklist', [identifier])
+
+    def add_many_to_blacklist(self, identifiers):
+        """ Blacklist all of the given identifiers in a single update. Identifiers that
+        are already blacklisted are skipped. Returns the number of identifiers added.
+        """
+
+        return self._change_list('add', 'blacklist', identifiers)
 
     def remove_from_blacklist(self, identifier):
-        """ Remove the given identifier from the blacklist to respect ramp percentage. """
+        """ Remove the given identifier from the blacklist to respect ramp percentage.
+        Raises ValueError if the identifier is not blacklisted, or if the blacklist is
+        a Bloom filter, which cannot remove identifiers; whitelist them instead.
+        """
+
+        if not self._change_list('remove', 'blacklist', [identifier]):
+            raise ValueError("{0} is not in the blacklist".format(identifier))
+
+    def remove_many_from_blacklist(self, identifiers):
+        """ Remove all of the given identifiers from the blacklist in a single update.
+        Returns the number of identifiers removed.
+        """
+
+        return self._change_list('remove', 'blacklist', identifiers)
+
+    def import_many(self, list_name, identifiers, remove=False, batch_size=10000, progress=None):
+        """ Adds (or, with ``remove``, removes) a stream of identifiers to (or from) the
+        whitelist or blacklist in batches of ``batch_size``, with pipelined SADDs (or SREMs)
+        to the Redis set holding the list, or SETBITs to the blacklist Bloom filter, so that
+        neither the list nor more than one batch of identifiers is ever held in memory.
+        Raises ValueError if the list is kept in neither (see use_redis_sets()).
+
+        Returns how many identifiers were read and how many were changed. ``progress``,
+        if given, is called with both counts after every batch.
+        """
+
+        operation = 'remove' if remove else 'add'
+        use_bloom_filter = self._changes_blacklist_bloom_filter(operation, list_name)
+        if not use_bloom_filter and not self.uses_redis_sets:
+            raise ValueError("{0} must use Redis sets for bulk imports".format(self.feature_name))
+
+        key = self._get_redis_list_key(list_name)
+        read = changed = 0
+        for batch in Feature._chunked(identifiers, batch_size):
+            read += len(batch)
+            batch = Feature._dedupe(batch)
+
+            pipe = feature_ramp.backend.pipeline(transaction=False)
+            if use_bloom_filter:
+                positions = self._queue_blacklist_bloom_additions(pipe, batch)
+                changed += self._count_blacklist_bloom_additions(positions, pipe.execute())
+            else:
+                # short commands, so Redis is never blocked for long
+                for chunk in Feature._chunked(batch, Feature.LOAD_CHUNK_SIZE):
+                    getattr(pipe, 'srem' if remove else 'sadd')(key, *chunk)
+                changed += sum(pipe.execute())
+
+            if progress is not None:
+                progress(read, changed)
+
+        if read:
+            self._record_change()
+        return read, changed
+
+    def iter_list(self, list_name, batch_size=10000):
+        """ Yields the members of the whitelist or blacklist. The Redis sets of features
+        using them are walked with SSCAN in batches of about ``batch_size``, so they are
+        never held in memory at once; as with SSCAN, a member may be yielded more than
+        once if the list changes during the iteration.
+        """
+
+        if not self.uses_redis_sets:
+            return iter(getattr(self, list_name))
+        members = feature_ramp.backend.sscan_iter(self._get_redis_list_key(list_name), count=batch_size)
+        return (Feature._to_text(member) for member in members)
+
+    def use_redis_sets(self):
+        """ Moves the whitelist and blacklist out of the feature's settings and into
+        native Redis sets. Membership is then checked with SISMEMBER, so its cost does
+        not grow with the size of the lists, and constructing the feature no longer
+        downloads them. Note that Redis stores identifiers as strings.
+        """
 
-        self.blacklist.remove(identifier)
+        if self.uses_redis_sets:
+            return
+
+        pipe = feature_ramp.backend.pipeline()
+        self._queue_use_redis_sets(pipe)
+        pipe.execute()
+
+        self._use_redis_sets_locally()
+        self._save()
+
+    def use_blacklist_bloom_filter(self, capacity, error_rate=0.001):
+        """ Moves the blacklist into a Bloom filter sized for ``capacity`` identifiers,
+        stored in Redis as a bitmap. Identifiers blacklisted afterwards are added to the
+        filter, whose memory use and lookup cost do not grow with the number of them.
+
+        A fraction ``error_rate`` of identifiers that were never blacklisted are
+        excluded too; false positives never make a feature visible, and whitelisted
+        identifiers still see it. Identifiers cannot be removed from the filter.
+        """
+
+        if self.blacklist_bloom is not None:
+            return
+
+        pipe = feature_ramp.backend.pipeline()
+        bloom_filter = self._queue_use_blacklist_bloom_filter(pipe, capacity, error_rate)
+        pipe.execute()
+
+        self._use_blacklist_bloom_filter_locally(bloom_filter)
         self._save()
 
+    def _change_list(self, operation, list_name, identifiers):
+        """ Adds ('add') or removes ('remove') the identifiers to or from the whitelist
+        or blacklist, both in Redis and on this object. Returns the number of identifiers
+        that were not already present, or that were present, respectively.
+        """
+
+        identifiers = list(identifiers)
+        if not identifiers:
+            return 0
+
+        if self._changes_blacklist_bloom_filter(operation, list_name):
+            return self._add_to_blacklist_bloom_filter(identifiers)
+
+        if self.uses_redis_sets:
+            changed = self._update_redis_set(operation, list_name, identifiers)
+        else:
+            changed = self._update(operation, list_name, identifiers)
+
+        self._apply_locally(operation, list_name, identifiers)
+        return changed
+
+    def _update_redis_set(self, operation, list_name, identifiers):
+        """ Adds or removes the identifiers to or from the Redis set holding the whitelist
+        or blacklist, and records the change like _update(). Returns the number of
+        identifiers changed.
+        """
+
+        pipe = feature_ramp.backend.pipeline()
+        self._queue_redis_set_update(pipe, operation, list_name, identifiers)
+        changed = pipe.execute()[0]
+        Feature._log_change(self._get_redis_key())
+
+        self._invalidate()
+        return changed
+
+    def _add_to_blacklist_bloom_filter(self, identifiers):
+        """ Sets the identifiers' bits in the blacklist Bloom filter with pipelined
+        SETBITs, which concurrent writers cannot undo. Returns the number of identifiers
+        that were not already (probably) present.
+        """
+
+        added = 0
+        for chunk in self._chunked(identifiers, Feature.LOAD_CHUNK_SIZE):
+            pipe = feature_ramp.backend.pipeline(transaction=False)
+            positions = self._queue_blacklist_bloom_additions(pipe, chunk)
+            added += self._count_blacklist_bloom_additions(positions, pipe.execute())
+
+        self._record_change()
+
+        self._add_to_blacklist_bloom_filter_locally(identifiers)
+        return added
+
+    def _record_change(self, apply_locally=None):
+        """ Logs, applies locally and publishes a change written to Redis, as _update()
+        does for its settings. ``apply_locally`` updates the cache and the current
+        FeatureContext, and defaults to invalidating them.
+        """
+
+        key = self._get_redis_key()
+        Feature._log_change(key)
+        (apply_locally or self._invalidate)()
+        feature_ramp.backend.publish(Feature._get_redis_channel_key(), key)
+
+    def _get_blacklist_bloom_positions(self, identifier):
+        """ Returns the bits of the blacklist Bloom filter set for the identifier. """
+
+        return BloomFilter.positions_for(identifier, self.blacklist_bloom['bits'], self.blacklist_bloom['hashes'])
+
+    def _get_blacklist_bloom_filter(self):
+        """ Downloads the blacklist Bloom filter. """
+
+        return self._receive_blacklist_bloom_filter(
+            self._read(feature_ramp.backend.get, self._get_redis_list_key('blacklist_bloom')))
+
+    def _receive_blacklist_bloom_filter(self, bitmap):
+        """ Returns the blacklist Bloom filter given its downloaded bitmap, keeping the
+        bitmap in Feature.circuit_breaker. If the breaker stopped the download, returns
+        the filter it falls back on or else, failing closed, one holding every identifier.
+        """
+
+        num_bits, num_hashes = self.blacklist_bloom['bits'], self.blacklist_bloom['hashes']
+        if bitmap is _UNAVAILABLE:
+            bitmap = self._get_fallback_list('blacklist_bloom')
+            if bitmap is None:
+                bitmap = b'\xff' * ((num_bits + 7) // 8)
+        elif Feature.circuit_breaker is not None:
+            bitmap = bitmap or b''  # Redis has no key for an empty filter
+            Feature.circuit_breaker.remember_list(self._get_redis_list_key('blacklist_bloom'), bitmap)
+        return BloomFilter(num_bits, num_hashes, bitmap)
+
+    def _update(self, operation, field, value):
+        """ Atomically applies a single change to the feature's settings in Redis,
+        without rewriting the fields it does not touch. ``operation`` is one of 'set'
+        (replaces ``field`` with ``value``), 'add' or 'remove' (adds or removes the
+        items of ``value`` to or from the list in ``field``), or 'merge' (sets every
+        field of the dict ``value``, removing those set to None; ``field`` is unused).
+
+        Concurrent updates from other processes are never lost: 'set' and 'merge'
+        are applied by a script inside Redis while the settings are small, and every
+        other change is made by an optimistic transaction, so that Redis is never
+        busy decoding and encoding long lists. A transaction still reads and writes
+        the whole settings document, so changing a list stored in it costs as many
+        bytes as the list; features with large lists should keep them in Redis sets
+        (see use_redis_sets()), which are changed with a single SADD or SREM. Raises
+        WatchError if the settings keep being changed concurrently for
+        TRANSACTION_MAX_ATTEMPTS attempts. Returns the number of items changed.
+        """
+
+        changed = -1
+        script_arguments = self._get_update_script_arguments(operation, field, value)
+        if script_arguments is not None:
+            update_script = feature_ramp.backend.register_script(_UPDATE_SCRIPT)
+            changed = update_script(**script_arguments)
+        if changed < 0:
+            changed = self._update_with_transaction(operation, field, value)
+        Feature._log_change(self._get_redis_key())
+
+        # other fields may have been changed concurrently, so reload on next access
+        self._invalidate()
+        return changed
+
+    def _update_with_transaction(self, operation, field, value):
+        """ Applies the change like _update(), for changes and settings that the update
+        script does not rewrite, by retrying an optimistic WATCH/MULTI transaction.
+        """
+
+        key = self._get_redis_key()
+        with feature_ramp.backend.pipeline() as pipe:
+            for _ in Feature._transaction_attempts(key):
+                try:
+                    pipe.watch(key)
+                    redis_data = self._get_settings_to_update(pipe.get(key))
+                    changed = self._apply_update(redis_data, operation, field, value)
+
+                    pipe.multi()
+                    self._queue_save(pipe, redis_data)
+                    pipe.publish(Feature._get_redis_channel_key(), key)
+                    pipe.execute()
+                    return changed
+                except WatchError:
+                    continue
+
+    # The helpers below hold the logic of the changes above apart from their I/O,
+    # which AsyncFeature performs with its asyncio backend instead.
+
+    def _get_redis_list_keys_in_use(self):
+        """ Returns the keys of the Redis sets and the Bloom filter bitmap the feature uses. """
+
+        keys = []
+        if self.uses_redis_sets:
+            keys.extend([self._get_redis_list_key('whitelist'), self._get_redis_list_key('blacklist')])
+        if self.blacklist_bloom is not None:
+            keys.append(self._get_redis_list_key('blacklist_bloom'))
+        return keys
+
+    def _reset_locally(self):
+        """ Clears this object's settings, as reset_settings() does. """
+
+        self.percentage = 0
+        self.schedule = None
+        self.whitelist = []
+        self.blacklist = []
+        self.blacklist_bloom = self._blacklist_bloom_filter = None
+        self.rules, self._rules_predicate = [], None
+
+    def _queue_delete(self, pipe):
+        """ Queues deleting every key of the feature and removing it from the set of
+        active features.
+        """
+
+        key = self._get_redis_key()
+        pipe.delete(key,
+                    self._get_redis_list_key('whitelist'),
+                    self._get_redis_list_key('blacklist'),
+                    self._get_redis_list_key('blacklist_bloom'))
+        pipe.srem(Feature._get_redis_set_key(), key)
+
+    def _delete_locally(self):
+        """ Records that the feature was deleted in the cache and the current FeatureContext. """
+
+        if Feature.cache is not None:
+            Feature.cache.set(self._get_redis_key(), {})
+        self._forget_in_context()
+
+    @staticmethod
+    def _percentage_update(percentage):
+        """ Returns the _update() arguments of set_percentage(). """
+
+        percentage = Feature.bucketer.normalize_percentage(percentage)
+        if (percentage < 0 or percentage > 100):
+            raise ValueError("Percentage is not a valid integer")
+
+        return 'merge', None, {'percentage': percentage, 'schedule': None}
+
+    @staticmethod
+    def _schedule_update(start_time, end_time, start_percentage, end_percentage, step=None):
+        """ Returns the _update() arguments of set_schedule(). """
+
+        bucketer = Feature.bucketer
+        schedule = RampSchedule(start_time, end_time, bucketer.normalize_percentage(start_percentage),
+                                bucketer.normalize_percentage(end_percentage), step)
+        return 'set', 'schedule', schedule.to_dict()
+
+    @staticmethod
+    def _rules_update(rules):
+        """ Returns the _update() arguments of set_rules(). """
+
+        rules = list(rules)
+        Targeting.compile_rules(rules)  # raises ValueError for malformed rules
+        return 'set', 'rules', rules
+
+    def _apply_locally(self, operation, field, value):
+        """ Applies a change, as described in _update(), to this object's settings
+        after it has been made in Redis.
+        """
+
+        if operation == 'merge':
+            for name, item in value.items():
+                self._set_field_locally(name, item)
+        elif operation == 'set':
+            self._set_field_locally(field, value)
+        elif operation == 'add':
+            self._add_locally(field, value)
+        else:
+            self._remove_locally(field, value)
+
+    def _set_field_locally(self, field, value):
+        """ Sets one of the fields that set_percentage(), set_schedule() and set_rules()
+        change on this object, None meaning that it was removed.
+        """
+
+        if field == 'percentage':
+            self.percentage = value
+        elif field == 'schedule':
+            self.schedule = RampSchedule.from_dict(value) if value else None
+        elif field == 'rules':
+            self.rules = value or []
+            self._rules_predicate = Targeting.compile_rules(self.rules)
+
+    def _add_locally(self, list_name, identifiers):
+        """ Adds the identifiers to this object's whitelist or blacklist after they
+        have been added in Redis.
+        """
+
+        if self.uses_redis_sets:
+            setattr(self, '_' + list_name, None)  # re-downloaded on next access
+            return
+
+        members = list(getattr(self, '_' + list_name))
+        member_set = set(getattr(self, '_' + list_name + '_set'))
+        for identifier in identifiers:
+            if identifier not in member_set:
+                members.append(identifier)
+                member_set.add(identifier)
+        self._set_members(list_name, members, frozenset(member_set))
+
+    def _remove_locally(self, list_name, identifiers):
+        """ Removes the identifiers from this object's whitelist or blacklist after
+        they have been removed in Redis.
+        """
+
+        if self.uses_redis_sets:
+            setattr(self, '_' + list_name, None)  # re-downloaded on next access
+            return
+
+        identifiers = set(identifiers)
+        self._set_members(list_name, [member for member in getattr(self, '_' + list_name)
+                                      if member not in identifiers])
+
+    def _changes_blacklist_bloom_filter(self, operation, list_name):
+        """ Returns true if a change to the list is made to the blacklist Bloom filter.
+        Raises ValueError for removals, which the filter cannot make.
+        """
+
+        if list_name != 'blacklist' or self.blacklist_bloom is None:
+            return False
+        if operation == 'remove':
+            raise ValueError("Identifiers cannot be removed from a Bloom filter blacklist")
+        return True
+
+    def _queue_redis_set_update(self, pipe, operation, list_name, identifiers):
+        """ Queues adding or removing the identifiers to or from the Redis set holding
+        the whitelist or blacklist, whose reply comes first, and announcing the change.
+        """
+
+        key = self._get_redis_list_key(list_name)
+        if operation == 'add':
+            pipe.sadd(key, *identifiers)
+        else:
+            pipe.srem(key, *identifiers)
+        pipe.publish(Feature._get_redis_channel_key(), self._get_redis_key())
+
+    def _queue_blacklist_bloom_additions(self, pipe, identifiers):
+        """ Queues the SETBITs adding the identifiers to the blacklist Bloom filter.
+        Returns the positions set for each identifier.
+        """
+
+        key = self._get_redis_list_key('blacklist_bloom')
+        positions = [self._get_blacklist_bloom_positions(identifier) for identifier in identifiers]
+        for identifier_positions in positions:
+            for position in identifier_positions:
+                pipe.setbit(key, position, 1)
+        return positions
+
+    @staticmethod
+    def _count_blacklist_bloom_additions(positions, old_bits):
+        """ Returns how many identifiers had any of their bits unset before, given the
+        positions and the replies of _queue_blacklist_bloom_additions().
+        """
+
+        old_bits = iter(old_bits)
+        return len([identifier_positions for identifier_positions in positions
+                    if not all([next(old_bits) for _ in identifier_positions])])
+
+    def _add_to_blacklist_bloom_filter_locally(self, identifiers):
+        """ Adds the identifiers to the blacklist Bloom filter, if it has been downloaded. """
+
+        if self._blacklist_bloom_filter is not None:
+            self._blacklist_bloom_filter.update(identifiers)
+
+    def _queue_use_redis_sets(self, pipe):
+        """ Queues copying the whitelist and blacklist into Redis sets for use_redis_sets(). """
+
+        for list_name in ['whitelist', 'blacklist']:
+            members = getattr(self, list_name)
+            if members:
+                pipe.sadd(self._get_redis_list_key(list_name), *members)
+
+    def _use_redis_sets_locally(self):
+        """ Switches this object to the Redis sets, once the lists have been copied. """
+
+        self.uses_redis_sets = True
+        self._whitelist = self._blacklist = None
+
+    def _queue_use_blacklist_bloom_filter(self, pipe, capacity, error_rate):
+        """ Queues storing a Bloom filter holding the blacklist for use_blacklist_bloom_filter(),
+        and returns the filter.
+        """
+
+        bloom_filter = BloomFilter.for_capacity(capacity, error_rate)
+        bloom_filter.update(self.blacklist)
+
+        pipe.set(self._get_redis_list_key('blacklist_bloom'), bloom_filter.to_bytes())
+        if self.uses_redis_sets:
+            pipe.delete(self._get_redis_list_key('blacklist'))
+        return bloom_filter
+
+    def _use_blacklist_bloom_filter_locally(self, bloom_filter):
+        """ Switches this object to the blacklist Bloom filter, once it has been stored. """
+
+        self.blacklist_bloom = {'bits': bloom_filter.num_bits, 'hashes': bloom_filter.num_hashes}
+        self._blacklist_bloom_filter = bloom_filter
+        self.blacklist = []
+
+    def _get_update_script_arguments(self, operation, field, value):
+        """ Returns the keyword arguments to call the update script with for the change,
+        or None if the change is always made with a transaction.
+        """
+
+        if operation not in ('set', 'merge') or not Codec.CODECS[Feature.REDIS_VERSION].scriptable:
+            return None
+
+        return {'keys': [self._get_redis_key(), Feature._get_redis_set_key()],
+                'args': [Feature._get_redis_channel_key(), operation, field or '', json.dumps(value),
+                         Feature.UPDATE_SCRIPT_MAX_SIZE]}
+
+    def _get_settings_to_update(self, redis_raw):
+        """ Returns the settings dictionary a change is applied to: the stored one, or,
+        if the feature was never saved, a copy of its local settings, so that the
+        default percentage it was loaded with is stored along with the change.
+        """
+
+        if redis_raw is None:
+            return self._get_redis_data()
+        return self._deserialize(redis_raw)
+
+    def _queue_save(self, pipe, redis_data):
+        """ Queues writing the settings and adding the feature to the set of active features. """
+
+        key = self._get_redis_key()
+        pipe.set(key, self._serialize(redis_data))
+        # store feature key in a set so we know what's turned on without
+        # needing to search all Redis keys with a * which is slow.
+        pipe.sadd(Feature._get_redis_set_key(), key)
+
+    def _save_locally(self, redis_data):
+        """ Writes saved settings through to the cache and drops them from the current
+        FeatureContext.
+        """
+
+        if Feature.cache is not None:
+            Feature.cache.set(self._get_redis_key(), redis_data)
+        self._forget_in_context()
+
+    def _invalidate(self):
+        """ Drops the copies of the feature's settings held by the cache and the current
+        FeatureContext after a change.
+        """
+
+        if Feature.cache is not None:
+            Feature.cache.invalidate(self._get_redis_key())
+        self._forget_in_context()
+
+    @staticmethod
+    def _apply_update(redis_data, operation, field, value):
+        """ Applies a change as described in _update() to a settings dictionary. """
+
+        if operation == 'set':
+            redis_data[field] = value
+            return 1
+
+        if operation == 'merge':
+            for name, item in value.items():
+                if item is None:
+                    redis_data.pop(name, None)
+                else:
+                    redis_data[name] = item
+            return 1
+
+        members = redis_data.get(field, [])
+        if operation == 'add':
+            present = set(members)
+            added = 0
+            for member in value:
+                if member not in present:
+                    members.append(member)
+                    present.add(member)
+                    added += 1
+            redis_data[field] = members
+            return added
+
+        removed = set(value)
+        redis_data[field] = [member for member in members if member not in removed]
+        return len(members) - len(redis_data[field])
+
     @classmethod
     def all_features(cls, include_data=False):
         """
@@ -182,47 +1312,474 @@ class Feature(object):
             { 'percentage': 50, 'whitelist': [3], 'blacklist': [4,5] }
         }
         """
-        key = cls._get_redis_set_key()
-        features = [cls._get_feature_name_from_redis_key(rkey) for rkey in redis.smembers(key)]
+        rkeys = cls._receive_feature_keys(cls._read(feature_ramp.backend.smembers, cls._get_redis_set_key()))
         if not include_data:
-            return features
+            return cls._get_feature_names_from_redis_keys(rkeys)
 
-        # we intentionally do not use pipelining here, since that would lock Redis and
-        # this does not need to be atomic
+        # load the settings with one MGET per chunk of features instead of one GET
+        # each; chunking keeps every command short so Redis is never blocked for
+        # long, and this does not need to be atomic
         features_with_data = dict()
-        for feature in features:
-            data = cls(feature)
-            features_with_data[feature] = {'percentage': data.percentage}
-            if data.whitelist:
-                features_with_data[feature]['whitelist'] = data.whitelist
-            if data.blacklist:
-                features_with_data[feature]['blacklist'] = data.blacklist
+        for chunk in cls._chunked(rkeys, cls.LOAD_CHUNK_SIZE):
+            for feature, data in cls._load_summaries(chunk):
+                features_with_data[feature] = data
 
         return features_with_data
 
+    @classmethod
+    def iter_features(cls, include_data=False):
+        """
+        Like all_features(), but returns a generator that walks the set of active
+        features with SSCAN, so that very large numbers of features never have
+        to be held in memory at once.
+
+        Yields feature names, or (feature_name, ramping_data) tuples when
+        ``include_data`` is set. As with SSCAN, a feature may be yielded more
+        than once if features are added or removed during the iteration.
+        """
+        rkeys = feature_ramp.backend.sscan_iter(cls._get_redis_set_key(), count=cls.LOAD_CHUNK_SIZE)
+        for chunk in cls._chunked(rkeys, cls.LOAD_CHUNK_SIZE):
+            chunk = cls._current_redis_keys(chunk)
+            if not include_data:
+                for feature in cls._get_feature_names_from_redis_keys(chunk):
+                    yield feature
+                continue
+
+            for feature, data in cls._load_summaries(chunk):
+                yield feature, data
+
+    @classmethod
+    def change_version(cls):
+        """ Returns the current change version, which is bumped by every save and delete. """
+
+        return int(feature_ramp.backend.get(cls._get_redis_change_version_key()) or 0)
+
+    @classmethod
+    def changes_since(cls, version):
+        """ Returns the current change version and the names of the features changed
+        since the given version, which was returned by change_version() or an earlier
+        call. The names are None if the change log no longer reaches back that far,
+        in which case every feature must be reloaded.
+        """
+
+        pipe = feature_ramp.backend.pipeline(transaction=True)
+        cls._queue_changes_since(pipe, version)
+        return cls._get_changes_since(version, *pipe.execute())
+
+    @classmethod
+    def _queue_changes_since(cls, pipe, version):
+        """ Queues reading the change version and the keys changed since ``version``. """
+
+        pipe.get(cls._get_redis_change_version_key())
+        pipe.zrangebyscore(cls._get_redis_change_log_key(), version + 1, '+inf')
+
+    @classmethod
+    def _get_changes_since(cls, version, current_version, keys):
+        """ Returns what changes_since() does, given the replies to _queue_changes_since(). """
+
+        current_version = int(current_version or 0)
+        if not current_version - cls.CHANGE_LOG_SIZE <= version <= current_version:
+            return current_version, None  # trimmed from the log, or Redis was reset
+
+        return current_version, cls._get_feature_names_from_redis_keys(cls._current_redis_keys(keys))
+
+    @classmethod
+    def _log_change(cls, key):
+        """ Records the change of the feature stored at the given key in the change log.
+        Returns the new change version.
+        """
+
+        log_script = feature_ramp.backend.register_script(_LOG_CHANGE_SCRIPT)
+        version = log_script(**cls._get_log_change_script_arguments(key))
+        if version < 0:  # the backend cannot run scripts
+            version = cls._log_change_with_transaction(key)
+        return version
+
+    @classmethod
+    def _get_log_change_script_arguments(cls, key):
+        """ Returns the keyword arguments to call the change log script with. """
+
+        return {'keys': [cls._get_redis_change_version_key(), cls._get_redis_change_log_key()],
+                'args': [key, cls.CHANGE_LOG_SIZE]}
+
+    @classmethod
+    def _log_change_with_transaction(cls, key):
+        """ Records a change like _log_change(), with a WATCH/MULTI transaction. """
+
+        version_key = cls._get_redis_change_version_key()
+        with feature_ramp.backend.pipeline() as pipe:
+            for _ in Feature._transaction_attempts(version_key):
+                try:
+                    pipe.watch(version_key)
+                    version = int(pipe.get(version_key) or 0) + 1
+
+                    pipe.multi()
+                    cls._queue_log_change(pipe, key, version)
+                    pipe.execute()
+                    return version
+                except WatchError:
+                    continue
+
+    @classmethod
+    def _queue_log_change(cls, pipe, key, version):
+        """ Queues recording a change as the given version, as the change log script does. """
+
+        log_key = cls._get_redis_change_log_key()
+        pipe.set(cls._get_redis_change_version_key(), version)
+        pipe.zadd(log_key, {key: version})
+        pipe.zremrangebyscore(log_key, '-inf', version - cls.CHANGE_LOG_SIZE)
+
+    @classmethod
+    def _load_summaries(cls, keys):
+        """ Returns (feature_name, ramping_data) pairs for the given keys, as reported
+        by all_features(), loaded with a single MGET.
+        """
+
+        summaries = []
+        for key, redis_data in zip(keys, cls._load_many_redis_data(keys)):
+            feature = cls._get_feature_name_from_redis_key(key)
+            summaries.append((feature, cls._from_redis_data(feature, redis_data)._get_summary()))
+
+        return summaries
+
+    def _get_summary(self):
+        """ Returns the ramping data reported for this feature by all_features(). """
+
+        summary = {'percentage': self._percentage}
+        if self.whitelist:
+            summary['whitelist'] = self.whitelist
+        if self.blacklist:
+            summary['blacklist'] = self.blacklist
+        if self.uses_redis_sets:
+            summary['redis_sets'] = True
+        if self.blacklist_bloom is not None:
+            summary['blacklist_bloom'] = self.blacklist_bloom
+        if self.rules:
+            summary['rules'] = self.rules
+        if self.schedule is not None:
+            summary['schedule'] = self.schedule.to_dict()
+        return summary
+
+    @staticmethod
+    def _transaction_attempts(key):
+        """ Yields once per attempt of an optimistic transaction watching the key, and
+        raises WatchError once TRANSACTION_MAX_ATTEMPTS attempts have been made.
+        """
+
+        for attempt in range(Feature.TRANSACTION_MAX_ATTEMPTS):
+            yield attempt
+        raise WatchError("{0} was changed concurrently during each of {1} attempts".format(
+            key, Feature.TRANSACTION_MAX_ATTEMPTS))
+
+    @staticmethod
+    def _chunked(iterable, size):
+        """ Yields lists of up to ``size`` consecutive items from the iterable. """
+
+        iterator = iter(iterable)
+        while True:
+            chunk = list(itertools.islice(iterator, size))
+            if not chunk:
+                return
+            yield chunk
+
+    @staticmethod
+    def _dedupe(items):
+        """ Drops repeated items from a list, keeping the first occurrence. """
+
+        seen = set()
+        return [item for item in items if not (item in seen or seen.add(item))]
+
     def _save(self):
         """ Saves the feature settings to Redis in a dictionary. """
 
+        data = self._get_redis_data()
+        pipe = feature_ramp.backend.pipeline()
+        self._queue_save(pipe, data)
+        pipe.execute()
+        # also lets other processes know their cached copy is stale
+        self._record_change(lambda: self._save_locally(data))
+
+    def _load_redis_data(self):
+        """ Returns the deserialized settings for this feature, from the current
+        FeatureContext or the cache if they hold them, and from Redis otherwise.
+        """
+
         key = self._get_redis_key()
-        value = json.dumps(self._get_redis_data())
-        redis.set(key, value)
+        context = FeatureContext.current()
+        redis_data = context.get_settings(key) if context is not None else None
+        if redis_data is not None:
+            return redis_data
+
+        cache = Feature.cache
+        generation = None
+        if cache is not None:
+            generation = cache.generation()
+            redis_data = cache.get(key)
+            if Feature.instrumentation is not None:
+                Feature.instrumentation.cache_lookups(int(redis_data is not None), int(redis_data is None))
+
+        if redis_data is None:
+            redis_data = Feature._receive_redis_data(key, self._read(feature_ramp.backend.get, key), generation)
+
+        if context is not None:
+            context.set_settings(key, redis_data)
+        return redis_data
 
-        # store feature key in a set so we know what's turned on without
-        # needing to search all Redis keys with a * which is slow.
-        set_key = Feature._get_redis_set_key()
-        redis.sadd(set_key, key)
+    @classmethod
+    def _load_many_redis_data(cls, keys):
+        """ Returns the deserialized settings for each of the given keys, in order.
+        Keys missing from the current FeatureContext and the cache are fetched from
+        Redis with a single MGET.
+        """
+
+        generation = Feature.cache.generation() if Feature.cache is not None else None
+        results, missing = cls._lookup_many_redis_data(keys)
+        if missing:
+            values = cls._read(feature_ramp.backend.mget, [keys[index] for index in missing])
+            if values is _UNAVAILABLE:
+                values = [_UNAVAILABLE] * len(missing)
+            cls._store_many_redis_data(keys, results, missing, values, generation)
+        return results
+
+    @classmethod
+    def _lookup_many_redis_data(cls, keys):
+        """ Returns the settings for each of the given keys held by the current
+        FeatureContext or the cache (None for the others), and the indexes of the
+        keys that must be fetched from Redis.
+        """
+
+        context = FeatureContext.current()
+        if context is not None:
+            results = [context.get_settings(key) for key in keys]
+        else:
+            results = [None] * len(keys)
+        unloaded = [index for index, redis_data in enumerate(results) if redis_data is None]
+
+        cache = Feature.cache
+        if cache is None:
+            return results, unloaded
+
+        for index in unloaded:
+            results[index] = cache.get(keys[index])
+            if context is not None and results[index] is not None:
+                context.set_settings(keys[index], results[index])
+
+        missing = [index for index in unloaded if results[index] is None]
+        if Feature.instrumentation is not None:
+            Feature.instrumentation.cache_lookups(len(unloaded) - len(missing), len(missing))
+        return results, missing
+
+    @classmethod
+    def _store_many_redis_data(cls, keys, results, missing, values, generation=None):
+        """ Deserializes the values fetched for the missing keys into ``results``, and
+        keeps them in the cache and the current FeatureContext. ``generation`` is the
+        cache generation taken before the values were read (see FeatureCache.set()).
+        """
+
+        context = FeatureContext.current()
+        for index, redis_raw in zip(missing, values):
+            results[index] = cls._receive_redis_data(keys[index], redis_raw, generation)
+            if context is not None:
+                context.set_settings(keys[index], results[index])
+
+    @classmethod
+    def _receive_feature_keys(cls, rkeys):
+        """ Returns the keys of the active features of the current REDIS_VERSION, given
+        the members of the set of active features read from Redis, and keeps their names
+        in Feature.circuit_breaker. If the read was stopped by the breaker, returns the
+        keys of its fallback feature names instead.
+        """
+
+        breaker = Feature.circuit_breaker
+        if rkeys is _UNAVAILABLE:
+            names = breaker.fallback_feature_names(cls._get_redis_set_key()) or []
+            return [cls._get_redis_key_for_feature(name) for name in names]
+
+        rkeys = cls._current_redis_keys(rkeys)
+        if breaker is not None:
+            breaker.remember_list(cls._get_redis_set_key(), cls._get_feature_names_from_redis_keys(rkeys))
+        return rkeys
+
+    @classmethod
+    def _receive_redis_data(cls, key, redis_raw, generation=None):
+        """ Deserializes settings read from Redis into FrozenSettings, keeping them in the cache unless the
+        feature was invalidated since the cache ``generation`` the read started in, and,
+        as the last known settings, in Feature.circuit_breaker. If the read was stopped
+        by the breaker, returns its fallback settings instead, which are not cached.
+        """
+
+        breaker = Feature.circuit_breaker
+        if redis_raw is _UNAVAILABLE:
+            return breaker.fallback_settings(key, cls._get_feature_name_from_redis_key(key))
+
+        redis_data = _freeze_settings(cls._deserialize(redis_raw))
+        if Feature.cache is not None:
+            Feature.cache.set(key, redis_data, generation)
+        if breaker is not None:
+            breaker.remember(key, redis_data)
+        return redis_data
+
+    @staticmethod
+    def _read(command, *args):
+        """ Sends a read command to the storage backend, through Feature.circuit_breaker
+        if one is set. Returns _UNAVAILABLE instead of raising if the breaker is open or
+        the read fails, so that callers can fall back.
+        """
+
+        breaker = Feature.circuit_breaker
+        if breaker is None:
+            return command(*args)
+
+        try:
+            return breaker.call(command, *args)
+        except breaker.errors:
+            breaker.fallbacks += 1
+            return _UNAVAILABLE
+
+    def _forget_in_context(self):
+        """ Drops what the current FeatureContext holds for this feature after a change. """
+
+        context = FeatureContext.current()
+        if context is not None:
+            context.forget(self._get_redis_key(), self.feature_name)
+
+    @classmethod
+    def _from_redis_data(cls, feature_name, redis_data, feature_group_name=None, default_percentage=0):
+        """ Returns a feature built from already deserialized settings, without reading Redis. """
+
+        feature = cls.__new__(cls)
+        feature.feature_name = feature_name
+        feature.feature_group_name = feature_group_name
+        feature._ramp_offset = Feature.bucketer.offset(feature_name, feature_group_name)
+        feature._set_redis_data(redis_data, default_percentage)
+        return feature
+
+    def _set_redis_data(self, redis_data, default_percentage=0):
+        """ Sets this object's settings from their dictionary representation in Redis,
+        taking over the lists and member sets of FrozenSettings without copying them.
+        """
+
+        self.percentage = redis_data.get('percentage', default_percentage)
+        schedule = redis_data.get('schedule')
+        self.schedule = RampSchedule.from_dict(schedule) if schedule else None
+        self.uses_redis_sets = redis_data.get('redis_sets', False)
+        self.rules = list(redis_data.get('rules', []))
+        self._rules_predicate = Targeting.compile_rules(self.rules)  # compiled once per load
+        self.blacklist_bloom = redis_data.get('blacklist_bloom')
+        self._blacklist_bloom_filter = None  # downloaded on first access
+        if self.uses_redis_sets:
+            self._whitelist = self._blacklist = None  # downloaded on first access
+        else:
+            member_sets = getattr(redis_data, 'member_sets', {})
+            self._set_members('whitelist', redis_data.get('whitelist', ()), member_sets.get('whitelist'))
+            self._set_members('blacklist', redis_data.get('blacklist', ()), member_sets.get('blacklist'))
+
+    def _get_redis_set_members(self, list_name):
+        """ Returns the members of the Redis set holding the whitelist or blacklist. """
+
+        return self._receive_redis_set_members(
+            list_name, self._read(feature_ramp.backend.smembers, self._get_redis_list_key(list_name)))
+
+    def _receive_redis_set_members(self, list_name, members):
+        """ Decodes the downloaded members of the Redis set holding the whitelist or
+        blacklist, keeping them in Feature.circuit_breaker. If the breaker stopped the
+        download, returns the members it falls back on, or none.
+        """
+
+        if members is _UNAVAILABLE:
+            return self._get_fallback_list(list_name) or []
+
+        members = [self._to_text(member) for member in members]
+        if Feature.circuit_breaker is not None:
+            Feature.circuit_breaker.remember_list(self._get_redis_list_key(list_name), members)
+        return members
+
+    def _get_fallback_list(self, list_name):
+        """ Returns what Feature.circuit_breaker falls back on for the whitelist, blacklist
+        or blacklist Bloom filter bitmap ('blacklist_bloom') kept in Redis, or None.
+        """
+
+        return Feature.circuit_breaker.fallback_list(self._get_redis_list_key(list_name), self.feature_name, list_name)
+
+    @staticmethod
+    def _to_redis_member(identifier):
+        """ Returns the identifier as it is stored in a Redis set and decoded by _to_text(). """
+
+        if isinstance(identifier, bytes):
+            return Feature._to_text(identifier)
+        if isinstance(identifier, numbers.Number):
+            return str(identifier)
+        return identifier
+
+    def _get_redis_set_members_among(self, list_name, identifiers):
+        """ Returns the set of the given identifiers that are members of the Redis set
+        holding the whitelist or blacklist, pipelining SISMEMBER in chunks.
+        """
+
+        key = self._get_redis_list_key(list_name)
+        members = set()
+        for chunk in self._chunked(identifiers, Feature.LOAD_CHUNK_SIZE):
+            pipe = feature_ramp.backend.pipeline(transaction=False)
+            for identifier in chunk:
+                pipe.sismember(key, identifier)
+            is_member = self._read(pipe.execute)
+            if is_member is _UNAVAILABLE:  # fall back as is_whitelisted() and is_blacklisted() do
+                is_member = [self._is_member(list_name, identifier, _UNAVAILABLE) for identifier in chunk]
+            members.update(identifier for identifier, identifier_is_member
+                           in zip(chunk, is_member) if identifier_is_member)
+
+        return members
 
     def _get_redis_key(self):
         """ Returns the key used in Redis to store a feature's information, with namespace. """
 
+        return Feature._get_redis_key_for_feature(self.feature_name)
+
+    @classmethod
+    def _get_redis_key_for_feature(cls, feature_name):
+        """ Returns the key used in Redis to store the named feature's information, with namespace. """
+
         return '{0}.{1}.{2}'.format(Feature.REDIS_NAMESPACE,
                                     Feature.REDIS_VERSION,
-                                    self.feature_name)
+                                    feature_name)
+
+    def _get_redis_list_key(self, list_name):
+        """ Returns the key of the Redis set holding the whitelist or blacklist of a
+        feature that uses Redis sets, with namespace.
+        """
+
+        return '{0}.{1}'.format(self._get_redis_key(), list_name)
 
     @classmethod
     def _get_feature_name_from_redis_key(self, key):
         """ Returns the feature name given the namespaced key used in Redis. """
-        return key.split('.')[-1]
+        return self._to_text(key).split('.')[-1]
+
+    @classmethod
+    def _current_redis_keys(cls, keys):
+        """ Returns the given keys that belong to the current REDIS_VERSION. """
+
+        return [key for key in keys if cls._is_current_redis_key(key)]
+
+    @classmethod
+    def _get_feature_names_from_redis_keys(cls, keys):
+        """ Returns the feature names given their namespaced keys. """
+
+        return [cls._get_feature_name_from_redis_key(key) for key in keys]
+
+    @classmethod
+    def _is_current_redis_key(cls, key):
+        """ Returns true if the key belongs to the current REDIS_VERSION. The set of active
+        features holds the keys of every version while features are being migrated.
+        """
+        return cls._to_text(key).startswith(cls._get_redis_key_for_feature(''))
+
+    @staticmethod
+    def _to_text(value):
+        """ Decodes a string read from Redis, which returns bytes on Python 3. """
+        if not isinstance(value, str):
+            value = value.decode('utf-8')
+        return value
 
     @classmethod
     def _get_redis_set_key(cls):
@@ -231,26 +1788,69 @@ class Feature(object):
         return '{0}.{1}'.format(Feature.REDIS_NAMESPACE,
                                 Feature.REDIS_SET_KEY)
 
+    @classmethod
+    def _get_redis_channel_key(cls):
+        """ Returns the Redis pub/sub channel that feature changes are published on, with namespace. """
+
+        return '{0}.{1}'.format(Feature.REDIS_NAMESPACE,
+                                Feature.REDIS_CHANNEL_KEY)
+
+    @classmethod
+    def _get_redis_change_version_key(cls):
+        """ Returns the key of the counter bumped by every change to a feature, with namespace. """
+
+        return '{0}.{1}'.format(Feature.REDIS_NAMESPACE,
+                                Feature.REDIS_CHANGE_VERSION_KEY)
+
+    @classmethod
+    def _get_redis_change_log_key(cls):
+        """ Returns the key of the sorted set of changed feature keys, scored by the
+        change version they were last changed in, with namespace.
+        """
+
+        return '{0}.{1}'.format(Feature.REDIS_NAMESPACE,
+                                Feature.REDIS_CHANGE_LOG_KEY)
+
     def _get_redis_data(self):
         """ Returns the dictionary representation of this object for storage in Redis. """
 
-        return {
-            'whitelist': self.whitelist,
-            'blacklist': self.blacklist,
-            'percentage': self.percentage
-        }
+        if self.uses_redis_sets:
+            redis_data = {
+                'redis_sets': True,
+                'percentage': self._percentage
+            }
+        else:
+            redis_data = {
+                'whitelist': self.whitelist,
+                'blacklist': self.blacklist,
+                'percentage': self._percentage
+            }
+
+        if self.blacklist_bloom is not None:
+            redis_data['blacklist_bloom'] = self.blacklist_bloom
+        if self.rules:
+            redis_data['rules'] = self.rules
+        if self.schedule is not None:
+            redis_data['schedule'] = self.schedule.to_dict()
+        return redis_data
+
+    @classmethod
+    def _serialize(cls, redis_data):
+        """ Serializes a settings dictionary in the format of the current REDIS_VERSION. """
 
-    def _deserialize(self, redis_obj):
-        """ Deserializes the serialized JSON representation of this object's dictionary
-        from Redis. If no object is provided, it returns an empty dictionary.
+        return Codec.CODECS[Feature.REDIS_VERSION].encode(redis_data)
+
+    @classmethod
+    def _deserialize(cls, redis_obj):
+        """ Deserializes the serialized JSON (or binary, see Codec) representation of this
+        object's dictionary from Redis. If no object is provided, it returns an empty dictionary.
         """
 
         if redis_obj is None:
             return {}
 
-        return json.loads(redis_obj)
+        return Codec.decode(redis_obj)
 
     def __str__(self):
         """ Pretty print the feature and some stats """
-        stats = self._get_redis_data()
-        return "Feature: {0}\nwhitelisted: {1}\nblacklisted: {2}\npercentage: {3}\n".format(self.feature_name, stats['whitelist'], stats['blacklist'], stats['percentage'])
+        return "Feature: {0}\nwhitelisted: {1}\nblacklisted: {2}\npercentage: {3}\n".format(self.feature_name, self.whitelist, self.blacklist, self.percentage)
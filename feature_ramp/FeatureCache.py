@@ -0,0 +1,152 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class FeatureCache(object):
+    """
+    A process-local cache of deserialized feature settings, so that
+    constructing a Feature does not need a round trip to Redis.
+
+    Entries expire after ``ttl`` seconds, and once ``max_size`` entries
+    are stored the least recently used one is evicted. Caching is opt-in:
+
+    Feature.cache = FeatureCache(max_size=1000, ttl=30)
+    Feature("all_functionality").is_visible(identifier)  # hits Redis once
+    Feature("all_functionality").is_visible(identifier)  # served from the cache
+    Feature.cache.invalidate("feature.1.all_functionality")
+    Feature.cache = None
+
+    Settings are kept as FrozenSettings and returned without copying, so a
+    cache hit costs the same however long the feature's lists are.
+
+    Settings read from Redis can be stale by the time they are stored, if the
+    feature changed and was invalidated while the read was in flight. Readers
+    take generation() before reading and pass it to set(), which then drops
+    the settings instead of caching them for the whole TTL.
+    """
+
+    def __init__(self, max_size=1000, ttl=60, clock=time.time):
+        if max_size < 1:
+            raise ValueError("max_size must be at least 1")
+
+        self.max_size = max_size
+        self.ttl = ttl
+        self._clock = clock
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+        # bumped by every invalidation; the generation each key was last invalidated
+        # in is remembered for up to max_size keys, and older invalidations are
+        # assumed to have happened in _forgotten_generation
+        self._generation = 0
+        self._invalidations = OrderedDict()
+        self._forgotten_generation = 0
+
+    def get(self, key):
+        """ Returns the cached settings for the given Redis key, as read-only
+        FrozenSettings, or None if the key is not cached or its entry has expired.
+        """
+
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is None:
+                return None
+
+            expires_at, data = entry
+            if expires_at <= self._clock():
+                return None
+
+            # re-insert so the key becomes the most recently used
+            self._entries[key] = entry
+            return data
+
+    def generation(self):
+        """ Returns the current generation, to pass to set() along with the settings
+        read after calling this.
+        """
+
+        with self._lock:
+            return self._generation
+
+    def set(self, key, data, generation=None):
+        """ Stores the given settings for the Redis key, frozen. If the settings
+        were read in the given ``generation`` and the key has been invalidated since,
+        they may be stale and are not stored. Returns true if they were stored.
+        """
+
+        entry = (self._clock() + self.ttl, _freeze_settings(data))
+        with self._lock:
+            if generation is not None and generation < self._invalidated_in(key):
+                return False
+
+            self._entries.pop(key, None)
+            self._entries[key] = entry
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+            return True
+
+    def invalidate(self, key=None):
+        """ Drops the given Redis key from the cache. If no key is provided,
+        the whole cache is cleared.
+        """
+
+        with self._lock:
+            self._generation += 1
+            if key is None:
+                self._entries.clear()
+                self._invalidations.clear()
+                self._forgotten_generation = self._generation
+                return
+
+            self._entries.pop(key, None)
+            self._invalidations.pop(key, None)
+            self._invalidations[key] = self._generation
+            while len(self._invalidations) > self.max_size:
+                _, generation = self._invalidations.popitem(last=False)
+                self._forgotten_generation = generation
+
+    def _invalidated_in(self, key):
+        """ Returns the generation the key was last invalidated in, or the latest
+        generation it may have been invalidated in if that was forgotten.
+        """
+
+        return self._invalidations.get(key, self._forgotten_generation)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return self.get(key) is not None
+
+
+class FrozenSettings(dict):
+    """
+    A read-only settings dictionary, as kept by FeatureCache, FeatureContext
+    and CircuitBreaker and shared by every Feature loaded from them. Its lists
+    are stored as tuples, and ``member_sets`` holds frozensets of the whitelist
+    and blacklist, so features take both over without copying or hashing the
+    lists again. Nested dictionaries, such as targeting rules, are shared too
+    and must not be changed.
+    """
+
+    def __init__(self, redis_data):
+        dict.__init__(self, ((field, tuple(value) if isinstance(value, list) else value)
+                             for field, value in redis_data.items()))
+        self.member_sets = dict()
+        for list_name in ['whitelist', 'blacklist']:
+            if list_name in self:
+                self.member_sets[list_name] = frozenset(self[list_name])
+
+    def _read_only(self, *args, **kwargs):
+        raise TypeError("FrozenSettings cannot be changed")
+
+    __setitem__ = __delitem__ = clear = pop = popitem = setdefault = update = _read_only
+
+
+def _freeze_settings(redis_data):
+    """ Returns the settings dictionary as FrozenSettings, freezing it if needed. """
+
+    if isinstance(redis_data, FrozenSettings):
+        return redis_data
+    return FrozenSettings(redis_data)
@@ -0,0 +1,135 @@
+import threading
+
+try:
+    import contextvars
+except ImportError:  # Python 2 and 3.6
+    contextvars = None
+
+from feature_ramp.FeatureCache import _freeze_settings
+
+
+class FeatureContext(object):
+    """
+    A request-scoped view of feature settings. While a context is active,
+    each feature is read from the cache or Redis at most once, and the
+    results of is_visible() are remembered, so every check in the request
+    sees the same settings even if the feature is changed meanwhile, and
+    repeated checks cost nothing.
+
+    with FeatureContext():
+        Feature("all_functionality").is_visible(identifier)  # loads the feature
+        Feature("all_functionality").is_visible(identifier)  # answered from the context
+
+    The active context is tracked per thread, and with contextvars (Python
+    3.7+) per asyncio task too; tasks started inside a context share it.
+    Changes made through Feature inside the context drop what it holds for
+    that feature, so a request always sees its own writes.
+    """
+
+    # number of contexts currently active in any thread, so that features
+    # need not look the current context up when none are in use
+    active = 0
+    _active_lock = threading.Lock()
+
+    def __init__(self):
+        self._settings = dict()
+        self._decisions = dict()
+        self._token = None
+
+    @classmethod
+    def current(cls):
+        """ Returns the context active in this thread or task, or None. """
+
+        if not cls.active:
+            return None
+        return _get_current()
+
+    def __enter__(self):
+        self._token = _set_current(self)
+        with FeatureContext._active_lock:
+            FeatureContext.active += 1
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        with FeatureContext._active_lock:
+            FeatureContext.active -= 1
+        _reset_current(self._token)
+        self._token = None
+
+    def get_settings(self, key):
+        """ Returns the settings loaded for the Redis key, as read-only FrozenSettings, or None. """
+
+        return self._settings.get(key)
+
+    def set_settings(self, key, redis_data):
+        """ Remembers the settings loaded for the Redis key, frozen. """
+
+        self._settings[key] = _freeze_settings(redis_data)
+
+    def get_decision(self, feature, identifier, attributes=None):
+        """ Returns the remembered result of feature.is_visible(identifier, attributes), or None. """
+
+        decisions = self._decisions.get(feature.feature_name)
+        if decisions is None:
+            return None
+        try:
+            return decisions.get(self._decision_key(feature, identifier, attributes))
+        except TypeError:  # unhashable identifier or attribute
+            return None
+
+    def set_decision(self, feature, identifier, visible, attributes=None):
+        """ Remembers the result of feature.is_visible(identifier, attributes). """
+
+        try:
+            self._decisions.setdefault(feature.feature_name, dict())[
+                self._decision_key(feature, identifier, attributes)] = visible
+        except TypeError:
+            pass
+
+    def forget(self, key, feature_name):
+        """ Drops the settings and decisions held for a feature, after it was changed. """
+
+        self._settings.pop(key, None)
+        self._decisions.pop(feature_name, None)
+
+    def __len__(self):
+        return len(self._settings)
+
+    def __contains__(self, key):
+        return key in self._settings
+
+    @staticmethod
+    def _decision_key(feature, identifier, attributes):
+        # the percentage tells apart features loaded with different default percentages,
+        # and attributes only matter to features with targeting rules
+        if attributes and feature.rules:
+            attributes = frozenset(attributes.items())
+        else:
+            attributes = None
+        return (feature.feature_group_name, feature.percentage, identifier, attributes)
+
+
+if contextvars is not None:
+    _current = contextvars.ContextVar('feature_ramp_context', default=None)
+
+    def _get_current():
+        return _current.get()
+
+    def _set_current(context):
+        return _current.set(context)
+
+    def _reset_current(token):
+        _current.reset(token)
+else:
+    _local = threading.local()
+
+    def _get_current():
+        return getattr(_local, 'context', None)
+
+    def _set_current(context):
+        previous = _get_current()
+        _local.context = context
+        return previous
+
+    def _reset_current(previous):
+        _local.context = previous
@@ -0,0 +1,200 @@
+import json
+
+import feature_ramp
+from feature_ramp.Backend import WatchError
+from feature_ramp.Feature import Feature
+
+
+class FeatureGroup(object):
+    """
+    A named group of features that ramp the same identifiers first, stored
+    in Redis with its list of member features and the ramp offset they share.
+
+    Features in a group are evaluated together: their settings are loaded
+    with one MGET, and since they share an offset each identifier's ramp
+    ranking is computed once for the whole group rather than once per feature.
+
+    Usage:
+
+    group = FeatureGroup("checkout_redesign")
+    group.add_feature("new_cart")
+    group.add_feature("new_payment_form")
+    group.evaluate(identifier)         # {'new_cart': True, 'new_payment_form': False}
+    group.evaluate_many(identifiers)   # {'new_cart': [True, ...], 'new_payment_form': [False, ...]}
+    Feature.evaluate_all(identifier, feature_group_names=FeatureGroup.feature_group_names())
+
+    The offset is what the bucketer gives for the group's name when the group
+    is created, so that its features are evaluated the same way by
+    Feature(feature_name, feature_group_name=group_name). A different offset
+    can be chosen when creating a group to ramp other identifiers first; its
+    features should then only be evaluated through the group.
+    """
+
+    REDIS_GROUP_KEY = 'group'
+    REDIS_GROUP_SET_KEY = 'groups'
+
+    def __init__(self, group_name, offset=None):
+        self.group_name = group_name
+        self._set_redis_data(self._load_redis_data(), offset)
+
+    @classmethod
+    def all_groups(cls):
+        """ Returns the names of all feature groups. """
+
+        return [cls._get_group_name_from_redis_key(key)
+                for key in feature_ramp.backend.smembers(cls._get_redis_set_key())]
+
+    @classmethod
+    def feature_group_names(cls):
+        """ Returns a dict mapping the name of every feature in a group to the group's
+        name, e.g. for Feature.evaluate_all(). Groups are loaded with a single MGET.
+        """
+
+        keys = list(feature_ramp.backend.smembers(cls._get_redis_set_key()))
+        feature_group_names = dict()
+        for key, redis_raw in zip(keys, feature_ramp.backend.mget(keys) if keys else []):
+            group_name = cls._get_group_name_from_redis_key(key)
+            for feature_name in Feature._deserialize(redis_raw).get('members', []):
+                feature_group_names[feature_name] = group_name
+
+        return feature_group_names
+
+    def add_feature(self, feature_name):
+        """ Adds the named feature to the group. Returns false if it already was a member. """
+
+        return bool(self._update('add', feature_name))
+
+    def remove_feature(self, feature_name):
+        """ Removes the named feature from the group. Raises ValueError if it is not a member. """
+
+        if not self._update('remove', feature_name):
+            raise ValueError("{0} is not in the group {1}".format(feature_name, self.group_name))
+
+    def delete(self):
+        """ Deletes the group from Redis. Its features are not changed. """
+
+        key = self._get_redis_key()
+        feature_ramp.backend.delete(key)
+        feature_ramp.backend.srem(FeatureGroup._get_redis_set_key(), key)
+        self.members = []
+
+        if Feature.cache is not None:
+            Feature.cache.invalidate(key)
+        feature_ramp.backend.publish(Feature._get_redis_channel_key(), key)
+
+    def features(self, default_percentage=0):
+        """ Returns the group's features, with their settings loaded with a single MGET
+        (cached settings are not fetched at all).
+        """
+
+        keys = [Feature._get_redis_key_for_feature(name) for name in self.members]
+        features = []
+        for name, redis_data in zip(self.members, Feature._load_many_redis_data(keys)):
+            feature = Feature._from_redis_data(name, redis_data, feature_group_name=self.group_name,
+                                               default_percentage=default_percentage)
+            feature._ramp_offset = self.offset
+            features.append(feature)
+
+        return features
+
+    def evaluate(self, identifier, attributes=None, default_percentage=0):
+        """ Returns a dict mapping the name of every feature in the group to whether it
+        is visible to the identifier (with the given attributes), as is_visible() would.
+        """
+
+        ranking = Feature.bucketer.ranking(self.offset, identifier)
+        return dict((feature.feature_name, feature._decide(identifier, attributes, ranking))
+                    for feature in self.features(default_percentage))
+
+    def evaluate_many(self, identifiers, attributes=None, default_percentage=0):
+        """ Returns a dict mapping the name of every feature in the group to a list of
+        booleans, one per identifier, as visible_mask() would. ``attributes`` optionally
+        lists each identifier's attributes, in the same order.
+        """
+
+        identifiers = list(identifiers)
+        rankings = Feature.bucketer.rankings(self.offset, identifiers)
+        return dict((feature.feature_name, feature._visible_mask(identifiers, attributes, rankings))
+                    for feature in self.features(default_percentage))
+
+    def _update(self, operation, feature_name):
+        """ Adds or removes a member with an optimistic WATCH/MULTI transaction, creating
+        the group if needed. Returns the number of members changed; the group is not
+        written if there were none.
+        """
+
+        key = self._get_redis_key()
+        with feature_ramp.backend.pipeline() as pipe:
+            for _ in Feature._transaction_attempts(key):
+                try:
+                    pipe.watch(key)
+                    redis_data = Feature._deserialize(pipe.get(key))
+                    redis_data.setdefault('offset', self.offset)
+                    changed = Feature._apply_update(redis_data, operation, 'members', [feature_name])
+                    if not changed:
+                        break
+
+                    pipe.multi()
+                    pipe.set(key, json.dumps(redis_data))
+                    pipe.sadd(FeatureGroup._get_redis_set_key(), key)
+                    pipe.publish(Feature._get_redis_channel_key(), key)
+                    pipe.execute()
+                    break
+                except WatchError:
+                    continue
+
+        if Feature.cache is not None:
+            Feature.cache.invalidate(key)
+        self._set_redis_data(redis_data)
+        return changed
+
+    def _load_redis_data(self):
+        """ Returns the group's settings, from the cache if it holds them. """
+
+        key = self._get_redis_key()
+        cache = Feature.cache
+        generation = cache.generation() if cache is not None else None
+        redis_data = cache.get(key) if cache is not None else None
+        if redis_data is None:
+            redis_data = Feature._deserialize(feature_ramp.backend.get(key))
+            if cache is not None:
+                cache.set(key, redis_data, generation)
+        return redis_data
+
+    def _set_redis_data(self, redis_data, offset=None):
+        """ Sets this object's members and offset from their dictionary representation in
+        Redis. ``offset`` is used for a group that has not been stored yet.
+        """
+
+        self.members = list(redis_data.get('members', []))
+        if 'offset' in redis_data:
+            self.offset = redis_data['offset']
+        elif offset is not None:
+            self.offset = offset % Feature.bucketer.buckets
+        else:
+            self.offset = Feature.bucketer.offset(self.group_name, self.group_name)
+
+    def _get_redis_key(self):
+        """ Returns the key used in Redis to store the group, with namespace. """
+
+        return '{0}.{1}.{2}'.format(Feature.REDIS_NAMESPACE,
+                                    FeatureGroup.REDIS_GROUP_KEY,
+                                    self.group_name)
+
+    @classmethod
+    def _get_redis_set_key(cls):
+        """ Returns the key of the Redis set holding the keys of every group, with namespace. """
+
+        return '{0}.{1}'.format(Feature.REDIS_NAMESPACE,
+                                FeatureGroup.REDIS_GROUP_SET_KEY)
+
+    @classmethod
+    def _get_group_name_from_redis_key(cls, key):
+        """ Returns the group name given the namespaced key used in Redis. """
+
+        if not isinstance(key, str):
+            key = key.decode('utf-8')  # Redis returns bytes on Python 3
+        return key.split('.', 2)[-1]
+
+    def __str__(self):
+        return "FeatureGroup: {0}\nmembers: {1}\noffset: {2}\n".format(self.group_name, self.members, self.offset)
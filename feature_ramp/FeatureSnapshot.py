@@ -0,0 +1,447 @@
+import json
+import mmap
+import os
+import struct
+import threading
+import time
+
+from feature_ramp import Targeting
+from feature_ramp.BloomFilter import BloomFilter
+from feature_ramp.Feature import Feature
+from feature_ramp.RampSchedule import RampSchedule
+
+try:
+    text_type = unicode
+    integer_types = (int, long)
+except NameError:  # Python 3
+    text_type = str
+    integer_types = (int,)
+
+
+class FeatureSnapshot(object):
+    """
+    A compiled, read-only snapshot of every feature's settings, for prefork
+    servers whose workers would otherwise each fetch and decode the same
+    settings from Redis.
+
+    A single process writes the snapshot file from all_features(), and every
+    worker memory-maps it. All workers then share one copy in the page cache,
+    and lookups binary search the file directly, so nothing is deserialized
+    per process and Redis is never contacted.
+
+    FeatureSnapshot.write('/var/run/features.snapshot')  # e.g. from cron
+
+    snapshot = FeatureSnapshot('/var/run/features.snapshot')
+    snapshot.is_visible('all_functionality', identifier)
+    snapshot.refresh()  # picks up a newer snapshot, if one was written
+
+    Snapshots are replaced with an atomic rename, so readers never see a
+    partially written file and no locking is needed. Identifiers of features
+    that use Redis sets are stored, and looked up, in their string form, as
+    Redis stores them.
+
+    File layout (all integers little-endian):
+        header:  magic, format version (H), feature count (I), created at (d)
+        index:   per feature, sorted by name: name offset (I), name length (I), record offset (I)
+        record:  percentage (d), then the ramp schedule: has schedule (B),
+                 start time, end time, start and end percentages, step (d each, step 0 if none),
+                 uses Redis sets (B), then whitelist and blacklist, each as
+                 sorted int64 ids: count (I), ids (q each)
+                 sorted utf-8 ids: count (I), end offsets (I each), bytes
+                 then the blacklist Bloom filter, if any:
+                 bits (I, 0 if none), hashes (I), bitmap
+                 then the targeting rules: length (I, 0 if none), JSON
+    """
+
+    MAGIC = b'FRSNAP'
+    FORMAT_VERSION = 5
+
+    _HEADER = struct.Struct('<6sHId')
+    _INDEX_ENTRY = struct.Struct('<III')
+    _COUNT = struct.Struct('<I')
+    _ID = struct.Struct('<q')
+    _RAMP = struct.Struct('<dBddddd')
+    _REDIS_SETS = struct.Struct('<B')
+    _BLOOM_HEADER = struct.Struct('<II')
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._open()
+
+    @classmethod
+    def write(cls, path, features_with_data=None):
+        """ Compiles ``features_with_data``, in the format returned by
+        Feature.all_features(include_data=True) and loaded from Redis if not
+        given, into a snapshot file at ``path``, atomically replacing any
+        existing snapshot.
+        """
+
+        if features_with_data is None:
+            features_with_data = Feature.all_features(include_data=True)
+
+        names = sorted((cls._encode(name), name) for name in features_with_data)
+
+        records = []
+        offset = cls._HEADER.size + cls._INDEX_ENTRY.size * len(names)
+        offset += sum(len(encoded) for encoded, _ in names)
+        for _, name in names:
+            record = cls._compile_record(name, features_with_data[name])
+            records.append((offset, record))
+            offset += len(record)
+
+        tmp_path = '{0}.{1}.tmp'.format(path, os.getpid())
+        with open(tmp_path, 'wb') as snapshot_file:
+            snapshot_file.write(cls._HEADER.pack(cls.MAGIC, cls.FORMAT_VERSION, len(names), time.time()))
+
+            name_offset = cls._HEADER.size + cls._INDEX_ENTRY.size * len(names)
+            for (encoded, _), (record_offset, _) in zip(names, records):
+                snapshot_file.write(cls._INDEX_ENTRY.pack(name_offset, len(encoded), record_offset))
+                name_offset += len(encoded)
+            for encoded, _ in names:
+                snapshot_file.write(encoded)
+            for _, record in records:
+                snapshot_file.write(record)
+
+            snapshot_file.flush()
+            os.fsync(snapshot_file.fileno())
+
+        os.rename(tmp_path, path)
+
+    def refresh(self):
+        """ Switches to a newer snapshot if the file has been replaced since it was
+        opened. Returns True if it did.
+        """
+
+        stat = os.stat(self.path)
+        if (stat.st_ino, stat.st_mtime) == self._file_id:
+            return False
+
+        self._open()
+        return True
+
+    def feature_names(self):
+        """ Returns the names of all features in the snapshot. """
+
+        names = []
+        for index in range(self.feature_count):
+            name_offset, name_length, _ = self._INDEX_ENTRY.unpack_from(self._map, self._index_offset(index))
+            names.append(self._map[name_offset:name_offset + name_length].decode('utf-8'))
+        return names
+
+    def __contains__(self, feature_name):
+        return self._find_record(self._map, feature_name) is not None
+
+    def percentage(self, feature_name, default_percentage=0):
+        """ Returns the feature's ramp percentage, or ``default_percentage`` if the
+        feature is not in the snapshot.
+        """
+
+        record_offset = self._find_record(self._map, feature_name)
+        if record_offset is None:
+            return default_percentage
+
+        return self._read_percentage(self._map, record_offset)
+
+    def is_visible(self, feature_name, identifier, feature_group_name=None, default_percentage=0,
+                   attributes=None):
+        """ Returns true if the feature is visible to the identifier (with the given
+        attributes), with the same rules as Feature.is_visible().
+        """
+
+        snapshot_map = self._map
+        record_offset = self._find_record(snapshot_map, feature_name)
+        if record_offset is None:
+            percentage = default_percentage
+        else:
+            percentage = self._read_percentage(snapshot_map, record_offset)
+            redis_sets_offset = record_offset + self._RAMP.size
+            member = identifier
+            if self._REDIS_SETS.unpack_from(snapshot_map, redis_sets_offset)[0]:
+                member = self._encode(identifier)
+            whitelist_offset = redis_sets_offset + self._REDIS_SETS.size
+            found, blacklist_offset = self._contains(snapshot_map, whitelist_offset, member)
+            if found:
+                return True
+            found, bloom_offset = self._contains(snapshot_map, blacklist_offset, member)
+            if found or self._bloom_contains(snapshot_map, bloom_offset, identifier):
+                return False
+            rules_predicate = self._rules_predicate(snapshot_map, record_offset, bloom_offset)
+            if rules_predicate is not None and not rules_predicate(attributes or {}):
+                return False
+
+        bucketer = Feature.bucketer
+        offset = bucketer.offset(feature_name, feature_group_name)
+        return bucketer.ranking(offset, identifier) < bucketer.threshold(percentage)
+
+    def get(self, feature_name, feature_group_name=None, default_percentage=0):
+        """ Returns the snapshot's settings for the feature as a Feature, without
+        contacting Redis. This decodes the whole whitelist and blacklist.
+        """
+
+        snapshot_map = self._map
+        redis_data = {}
+        record_offset = self._find_record(snapshot_map, feature_name)
+        if record_offset is not None:
+            redis_data['percentage'], schedule = self._read_ramp(snapshot_map, record_offset)
+            if schedule is not None:
+                redis_data['schedule'] = schedule.to_dict()
+            offset = record_offset + self._RAMP.size + self._REDIS_SETS.size
+            for list_name in ['whitelist', 'blacklist']:
+                redis_data[list_name], offset = self._read_ids(snapshot_map, offset)
+            bloom_filter = self._read_bloom_filter(snapshot_map, offset)
+            if bloom_filter is not None:
+                redis_data['blacklist_bloom'] = {'bits': bloom_filter.num_bits, 'hashes': bloom_filter.num_hashes}
+            rules = self._read_rules(snapshot_map, offset)
+            if rules:
+                redis_data['rules'] = rules
+
+        feature = Feature._from_redis_data(feature_name, redis_data,
+                                           feature_group_name=feature_group_name,
+                                           default_percentage=default_percentage)
+        if record_offset is not None:
+            feature._blacklist_bloom_filter = bloom_filter
+        return feature
+
+    def _open(self):
+        """ Maps the snapshot file and validates its header. """
+
+        with self._lock:
+            with open(self.path, 'rb') as snapshot_file:
+                stat = os.fstat(snapshot_file.fileno())
+                snapshot_map = mmap.mmap(snapshot_file.fileno(), 0, access=mmap.ACCESS_READ)
+
+            magic, version, feature_count, created_at = self._HEADER.unpack_from(snapshot_map, 0)
+            if magic != self.MAGIC or version != self.FORMAT_VERSION:
+                raise ValueError("{0} is not a version {1} feature snapshot".format(self.path, self.FORMAT_VERSION))
+
+            # the previous map is left to be closed once no lookup still uses it
+            self._map = snapshot_map
+            self._compiled_rules = dict()  # record offset -> rules predicate
+            self._file_id = (stat.st_ino, stat.st_mtime)
+            self.feature_count = feature_count
+            self.created_at = created_at
+
+    def _index_offset(self, index):
+        return self._HEADER.size + self._INDEX_ENTRY.size * index
+
+    def _find_record(self, snapshot_map, feature_name):
+        """ Binary searches the index for the feature's record offset. """
+
+        target = self._encode(feature_name)
+        low, high = 0, self.feature_count
+        while low < high:
+            middle = (low + high) // 2
+            name_offset, name_length, record_offset = self._INDEX_ENTRY.unpack_from(snapshot_map, self._index_offset(middle))
+            name = snapshot_map[name_offset:name_offset + name_length]
+            if name == target:
+                return record_offset
+            if name < target:
+                low = middle + 1
+            else:
+                high = middle
+        return None
+
+    def _read_percentage(self, snapshot_map, record_offset):
+        """ Returns the feature's percentage, as its ramp schedule gives it for the
+        current time if it has one.
+        """
+
+        percentage, schedule = self._read_ramp(snapshot_map, record_offset)
+        if schedule is None:
+            return percentage
+        return Feature.bucketer.normalize_percentage(schedule.percentage_at(time.time()))
+
+    def _read_ramp(self, snapshot_map, record_offset):
+        """ Returns the feature's stored percentage and its RampSchedule, or None. """
+
+        (percentage, has_schedule, start_time, end_time,
+         start_percentage, end_percentage, step) = self._RAMP.unpack_from(snapshot_map, record_offset)
+
+        schedule = None
+        if has_schedule:
+            schedule = RampSchedule(self._to_number(start_time), self._to_number(end_time),
+                                    self._to_number(start_percentage), self._to_number(end_percentage),
+                                    self._to_number(step) or None)
+        return self._to_number(percentage), schedule
+
+    def _contains(self, snapshot_map, offset, identifier):
+        """ Looks the identifier up in the id list at ``offset``. Returns whether it
+        was found and the offset just past the list.
+        """
+
+        int_count = self._COUNT.unpack_from(snapshot_map, offset)[0]
+        ints_offset = offset + self._COUNT.size
+        strings_offset = ints_offset + self._ID.size * int_count
+        string_count = self._COUNT.unpack_from(snapshot_map, strings_offset)[0]
+        ends_offset = strings_offset + self._COUNT.size
+        blob_offset = ends_offset + self._COUNT.size * string_count
+        blob_size = self._COUNT.unpack_from(snapshot_map, ends_offset + self._COUNT.size * (string_count - 1))[0] if string_count else 0
+        end_offset = blob_offset + blob_size
+
+        if self._is_int(identifier):
+            low, high = 0, int_count
+            while low < high:
+                middle = (low + high) // 2
+                value = self._ID.unpack_from(snapshot_map, ints_offset + self._ID.size * middle)[0]
+                if value == identifier:
+                    return True, end_offset
+                if value < identifier:
+                    low = middle + 1
+                else:
+                    high = middle
+            return False, end_offset
+
+        target = self._encode(identifier)
+        low, high = 0, string_count
+        while low < high:
+            middle = (low + high) // 2
+            start = self._COUNT.unpack_from(snapshot_map, ends_offset + self._COUNT.size * (middle - 1))[0] if middle else 0
+            end = self._COUNT.unpack_from(snapshot_map, ends_offset + self._COUNT.size * middle)[0]
+            value = snapshot_map[blob_offset + start:blob_offset + end]
+            if value == target:
+                return True, end_offset
+            if value < target:
+                low = middle + 1
+            else:
+                high = middle
+        return False, end_offset
+
+    def _bloom_contains(self, snapshot_map, offset, identifier):
+        """ Checks the blacklist Bloom filter at ``offset``, if the record has one. """
+
+        num_bits, num_hashes = self._BLOOM_HEADER.unpack_from(snapshot_map, offset)
+        if not num_bits:
+            return False
+
+        bitmap_offset = offset + self._BLOOM_HEADER.size
+        for position in BloomFilter.positions_for(identifier, num_bits, num_hashes):
+            byte = bytearray(snapshot_map[bitmap_offset + (position >> 3):bitmap_offset + (position >> 3) + 1])[0]
+            if not byte & (0x80 >> (position & 7)):
+                return False
+        return True
+
+    def _rules_predicate(self, snapshot_map, record_offset, bloom_offset):
+        """ Returns the compiled targeting rules of the record, compiling them the
+        first time they are needed.
+        """
+
+        compiled_rules = self._compiled_rules
+        try:
+            return compiled_rules[record_offset]
+        except KeyError:
+            rules_predicate = Targeting.compile_rules(self._read_rules(snapshot_map, bloom_offset))
+            compiled_rules[record_offset] = rules_predicate
+            return rules_predicate
+
+    def _read_rules(self, snapshot_map, bloom_offset):
+        """ Decodes the targeting rules following the Bloom filter at ``bloom_offset``. """
+
+        num_bits = self._BLOOM_HEADER.unpack_from(snapshot_map, bloom_offset)[0]
+        offset = bloom_offset + self._BLOOM_HEADER.size + (num_bits + 7) // 8
+        length = self._COUNT.unpack_from(snapshot_map, offset)[0]
+        if not length:
+            return []
+        offset += self._COUNT.size
+        return json.loads(snapshot_map[offset:offset + length].decode('utf-8'))
+
+    def _read_bloom_filter(self, snapshot_map, offset):
+        """ Decodes the blacklist Bloom filter at ``offset``, or returns None. """
+
+        num_bits, num_hashes = self._BLOOM_HEADER.unpack_from(snapshot_map, offset)
+        if not num_bits:
+            return None
+
+        bitmap_offset = offset + self._BLOOM_HEADER.size
+        return BloomFilter(num_bits, num_hashes, snapshot_map[bitmap_offset:bitmap_offset + (num_bits + 7) // 8])
+
+    def _read_ids(self, snapshot_map, offset):
+        """ Decodes the id list at ``offset``. Returns the ids and the offset just
+        past the list.
+        """
+
+        int_count = self._COUNT.unpack_from(snapshot_map, offset)[0]
+        offset += self._COUNT.size
+        ids = [self._ID.unpack_from(snapshot_map, offset + self._ID.size * index)[0]
+               for index in range(int_count)]
+        offset += self._ID.size * int_count
+
+        string_count = self._COUNT.unpack_from(snapshot_map, offset)[0]
+        offset += self._COUNT.size
+        ends = [self._COUNT.unpack_from(snapshot_map, offset + self._COUNT.size * index)[0]
+                for index in range(string_count)]
+        offset += self._COUNT.size * string_count
+
+        start = 0
+        for end in ends:
+            ids.append(snapshot_map[offset + start:offset + end].decode('utf-8'))
+            start = end
+
+        return ids, offset + start
+
+    @classmethod
+    def _compile_record(cls, feature_name, data):
+        """ Returns the binary record for one feature's ramping data, downloading its
+        blacklist Bloom filter if it has one.
+        """
+
+        schedule = data.get('schedule')
+        if schedule:
+            parts = [cls._RAMP.pack(data.get('percentage', 0), True, schedule['start_time'], schedule['end_time'],
+                                    schedule['start_percentage'], schedule['end_percentage'],
+                                    schedule.get('step') or 0)]
+        else:
+            parts = [cls._RAMP.pack(data.get('percentage', 0), False, 0, 0, 0, 0, 0)]
+        redis_sets = data.get('redis_sets', False)
+        parts.append(cls._REDIS_SETS.pack(redis_sets))
+        for list_name in ['whitelist', 'blacklist']:
+            members = data.get(list_name, [])
+            if redis_sets:  # Redis keeps every member as a string
+                ints = []
+                strings = sorted(set(cls._encode(member) for member in members))
+            else:
+                ints = sorted(set(member for member in members if cls._is_int(member)))
+                strings = sorted(set(cls._encode(member) for member in members if not cls._is_int(member)))
+
+            parts.append(cls._COUNT.pack(len(ints)))
+            parts.extend(cls._ID.pack(member) for member in ints)
+
+            parts.append(cls._COUNT.pack(len(strings)))
+            end = 0
+            for member in strings:
+                end += len(member)
+                parts.append(cls._COUNT.pack(end))
+            parts.extend(strings)
+
+        if data.get('blacklist_bloom') is None:
+            parts.append(cls._BLOOM_HEADER.pack(0, 0))
+        else:
+            bloom_filter = Feature._from_redis_data(feature_name, data).blacklist_bloom_filter
+            parts.append(cls._BLOOM_HEADER.pack(bloom_filter.num_bits, bloom_filter.num_hashes))
+            parts.append(bloom_filter.to_bytes())
+
+        rules = json.dumps(data['rules']).encode('utf-8') if data.get('rules') else b''
+        parts.append(cls._COUNT.pack(len(rules)))
+        parts.append(rules)
+
+        return b''.join(parts)
+
+    @staticmethod
+    def _to_number(value):
+        """ Returns a float read from the file as an int if it is a whole number. """
+
+        return int(value) if value.is_integer() else value
+
+    @staticmethod
+    def _is_int(identifier):
+        return isinstance(identifier, integer_types) and not isinstance(identifier, bool) and -2 ** 63 <= identifier < 2 ** 63
+
+    @staticmethod
+    def _encode(identifier):
+        if isinstance(identifier, bytes):
+            return identifier
+        if not isinstance(identifier, text_type):
+            identifier = str(identifier)
+            if isinstance(identifier, bytes):
+                return identifier
+        return identifier.encode('utf-8')
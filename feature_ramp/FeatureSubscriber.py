@@ -0,0 +1,89 @@
+import threading
+
+import feature_ramp
+from feature_ramp.Backend import ConnectionError, TimeoutError
+from feature_ramp.Feature import Feature
+
+
+class FeatureSubscriber(threading.Thread):
+    """
+    A background thread that keeps a FeatureCache fresh by listening for the
+    change notifications Feature publishes on every save and delete.
+
+    Each notification evicts (or, with ``refresh=True``, reloads) only the
+    feature that changed, so caches can use long TTLs and still see ramp
+    changes almost immediately.
+
+    Notifications published while the subscriber is disconnected are lost,
+    so whenever it (re)subscribes it falls back to a full resync: the whole
+    cache is cleared and ``on_resync`` is called, if provided.
+
+    Usage:
+
+    subscriber = FeatureSubscriber(Feature.cache)
+    subscriber.start()
+    ...
+    subscriber.stop()
+    """
+
+    def __init__(self, cache, refresh=False, on_resync=None, reconnect_delay=1.0, poll_timeout=1.0):
+        super(FeatureSubscriber, self).__init__(name='FeatureSubscriber')
+        self.daemon = True
+
+        self.cache = cache
+        self.refresh = refresh
+        self.on_resync = on_resync
+        self.reconnect_delay = reconnect_delay
+        self.poll_timeout = poll_timeout
+
+        self.resync_count = 0
+        self.subscribed = threading.Event()
+        self._stopped = threading.Event()
+
+    def run(self):
+        while not self._stopped.is_set():
+            pubsub = feature_ramp.backend.pubsub(ignore_subscribe_messages=True)
+            try:
+                pubsub.subscribe(Feature._get_redis_channel_key())
+                self.resync()
+                self.subscribed.set()
+
+                while not self._stopped.is_set():
+                    message = pubsub.get_message(timeout=self.poll_timeout)
+                    if message is not None:
+                        self._handle_message(message)
+            except (ConnectionError, TimeoutError):
+                self.subscribed.clear()
+                self._stopped.wait(self.reconnect_delay)
+            finally:
+                pubsub.close()
+
+    def stop(self, timeout=None):
+        """ Stops listening for changes and waits for the thread to exit. """
+
+        self._stopped.set()
+        if self.is_alive():
+            self.join(timeout)
+
+    def resync(self):
+        """ Drops every cached feature, since changes may have been missed. """
+
+        self.cache.invalidate()
+        self.resync_count += 1
+        if self.on_resync is not None:
+            self.on_resync()
+
+    def _handle_message(self, message):
+        """ Evicts or reloads the feature named by a change notification. """
+
+        key = message['data']
+        if isinstance(key, bytes) and not isinstance(key, str):
+            key = key.decode('utf-8')
+
+        # invalidate even when refreshing, so that reads already in flight
+        # do not cache what they read before this change
+        self.cache.invalidate(key)
+        if self.refresh:
+            generation = self.cache.generation()
+            self.cache.set(key, Feature._deserialize(feature_ramp.backend.get(key)), generation)
+
@@ -0,0 +1,59 @@
+import feature_ramp
+from feature_ramp.Feature import Feature
+
+
+class FeatureSync(object):
+    """
+    Keeps a local copy of every feature's ramping data, as returned by
+    Feature.all_features(include_data=True), up to date by reloading only
+    the features that changed since the last refresh.
+
+    Every save and delete bumps a global change version and records the
+    feature in a change log (see Feature.changes_since()), so once the first
+    refresh has loaded every feature, each later refresh costs one round
+    trip plus one MGET per chunk of changed features, however many features
+    there are. If the log no longer reaches back to the last refresh, every
+    feature is reloaded instead.
+
+    sync = FeatureSync()
+    sync.refresh()  # loads every feature
+    sync.features['all_functionality']
+    sync.refresh()  # loads only the features changed since, and returns their names
+    """
+
+    def __init__(self):
+        self.features = dict()
+        self.version = None
+        self.full_refresh_count = 0
+
+    def refresh(self):
+        """ Brings the local copy up to date. Returns the names of the features that
+        changed (including deleted features), or None if every feature was reloaded.
+        """
+
+        if self.version is not None:
+            version, changed = Feature.changes_since(self.version)
+            if changed is not None:
+                self._reload(changed)
+                self.version = version
+                return changed
+
+        # read the version first, so that changes made during the reload are
+        # applied again on the next refresh rather than missed
+        version = Feature.change_version()
+        self.features = Feature.all_features(include_data=True)
+        self.version = version
+        self.full_refresh_count += 1
+        return None
+
+    def _reload(self, names):
+        """ Reloads the named features from Redis, dropping those that were deleted. """
+
+        for chunk in Feature._chunked(names, Feature.LOAD_CHUNK_SIZE):
+            keys = [Feature._get_redis_key_for_feature(name) for name in chunk]
+            for name, raw in zip(chunk, feature_ramp.backend.mget(keys)):
+                if raw is None:
+                    self.features.pop(name, None)
+                else:
+                    feature = Feature._from_redis_data(name, Feature._deserialize(raw))
+                    self.features[name] = feature._get_summary()
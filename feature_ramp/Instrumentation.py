@@ -0,0 +1,257 @@
+import threading
+import timeit
+
+try:
+    import prometheus_client
+except ImportError:  # prometheus_client is only needed by PrometheusInstrumentation
+    prometheus_client = None
+
+try:
+    text_type = unicode
+except NameError:  # Python 3
+    text_type = str
+
+# Evaluation decision paths, see Instrumentation.evaluation()
+WHITELIST = 'whitelist'
+BLACKLIST = 'blacklist'
+TARGETING = 'targeting'
+RAMP = 'ramp'
+
+
+class Instrumentation(object):
+    """
+    Receives measurements from the feature ramping hot paths. Subclasses
+    forward them to a metrics system; every hook is a no-op here.
+
+    Instrumentation is disabled by default and costs a single attribute check
+    per evaluation. To enable it, set Feature.instrumentation, and wrap the
+    backend to also time storage calls:
+
+    instrumentation = MetricsAggregator()
+    Feature.instrumentation = instrumentation
+    feature_ramp.set_backend(InstrumentedBackend(feature_ramp.backend, instrumentation))
+
+    Hooks are called on the evaluating thread, so they must be fast and
+    thread-safe.
+    """
+
+    def storage_call(self, command, seconds, payload_size):
+        """ Called after every storage command, with its duration and the size in
+        bytes of the values sent and received.
+        """
+
+    def evaluation(self, feature_name, decision, count=1):
+        """ Called when identifiers are evaluated for a feature, with the decision path
+        that settled them: WHITELIST, BLACKLIST, TARGETING (excluded by targeting
+        rules) or RAMP.
+        """
+
+    def cache_lookups(self, hits, misses):
+        """ Called after Feature.cache is consulted, with how many settings it held
+        and how many had to be loaded from storage.
+        """
+
+
+class MetricsAggregator(Instrumentation):
+    """
+    Aggregates measurements in process, for tests and ad hoc debugging.
+
+    aggregator.storage_calls['get']        # {'count': .., 'seconds': .., 'max_seconds': .., 'payload_bytes': ..}
+    aggregator.evaluations[('all_functionality', 'whitelist')]
+    aggregator.cache_hit_rate
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def storage_call(self, command, seconds, payload_size):
+        with self._lock:
+            stats = self.storage_calls.get(command)
+            if stats is None:
+                stats = self.storage_calls[command] = {'count': 0, 'seconds': 0.0,
+                                                       'max_seconds': 0.0, 'payload_bytes': 0}
+            stats['count'] += 1
+            stats['seconds'] += seconds
+            stats['max_seconds'] = max(stats['max_seconds'], seconds)
+            stats['payload_bytes'] += payload_size
+
+    def evaluation(self, feature_name, decision, count=1):
+        key = (feature_name, decision)
+        with self._lock:
+            self.evaluations[key] = self.evaluations.get(key, 0) + count
+
+    def cache_lookups(self, hits, misses):
+        with self._lock:
+            self.cache_hits += hits
+            self.cache_misses += misses
+
+    @property
+    def cache_hit_rate(self):
+        """ The fraction of cache lookups that were hits, or None before any lookup. """
+
+        lookups = self.cache_hits + self.cache_misses
+        return float(self.cache_hits) / lookups if lookups else None
+
+    def reset(self):
+        """ Discards everything aggregated so far. """
+
+        with self._lock:
+            self.storage_calls = {}
+            self.evaluations = {}
+            self.cache_hits = 0
+            self.cache_misses = 0
+
+
+class StatsdInstrumentation(Instrumentation):
+    """
+    Sends measurements to statsd through a client with the usual ``timing(stat,
+    milliseconds)`` and ``incr(stat, count)`` methods, such as the one from the
+    statsd package:
+
+    Feature.instrumentation = StatsdInstrumentation(statsd.StatsClient(), prefix='feature_ramp')
+    """
+
+    def __init__(self, client, prefix='feature_ramp'):
+        self.client = client
+        self.prefix = prefix
+
+    def storage_call(self, command, seconds, payload_size):
+        self.client.timing('{0}.storage.{1}'.format(self.prefix, command), seconds * 1000)
+        self.client.incr('{0}.storage.{1}.bytes'.format(self.prefix, command), payload_size)
+
+    def evaluation(self, feature_name, decision, count=1):
+        self.client.incr('{0}.evaluation.{1}.{2}'.format(self.prefix, feature_name, decision), count)
+
+    def cache_lookups(self, hits, misses):
+        if hits:
+            self.client.incr('{0}.cache.hit'.format(self.prefix), hits)
+        if misses:
+            self.client.incr('{0}.cache.miss'.format(self.prefix), misses)
+
+
+class PrometheusInstrumentation(Instrumentation):
+    """
+    Records measurements as prometheus_client metrics, in the given registry or
+    the default one:
+
+    feature_ramp_storage_seconds{command}          histogram
+    feature_ramp_storage_payload_bytes{command}    histogram
+    feature_ramp_evaluations_total{feature, decision}
+    feature_ramp_cache_lookups_total{result}
+    """
+
+    def __init__(self, registry=None, prefix='feature_ramp'):
+        if prometheus_client is None:
+            raise ImportError("PrometheusInstrumentation requires prometheus_client: pip install prometheus_client")
+
+        kwargs = {} if registry is None else {'registry': registry}
+        self.storage_seconds = prometheus_client.Histogram(
+            prefix + '_storage_seconds', "Duration of feature storage commands.", ['command'], **kwargs)
+        self.storage_payload_bytes = prometheus_client.Histogram(
+            prefix + '_storage_payload_bytes', "Bytes sent and received by feature storage commands.", ['command'],
+            buckets=(64, 256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, float('inf')), **kwargs)
+        self.evaluations = prometheus_client.Counter(
+            prefix + '_evaluations', "Feature evaluations by decision path.", ['feature', 'decision'], **kwargs)
+        self.cache_lookups_total = prometheus_client.Counter(
+            prefix + '_cache_lookups', "Feature cache lookups by result.", ['result'], **kwargs)
+
+    def storage_call(self, command, seconds, payload_size):
+        self.storage_seconds.labels(command).observe(seconds)
+        self.storage_payload_bytes.labels(command).observe(payload_size)
+
+    def evaluation(self, feature_name, decision, count=1):
+        self.evaluations.labels(feature_name, decision).inc(count)
+
+    def cache_lookups(self, hits, misses):
+        if hits:
+            self.cache_lookups_total.labels('hit').inc(hits)
+        if misses:
+            self.cache_lookups_total.labels('miss').inc(misses)
+
+
+class InstrumentedBackend(object):
+    """
+    Wraps a synchronous storage backend, reporting the duration and payload size
+    of every command to an Instrumentation. Pipelines are reported once, as a
+    'pipeline' command, when executed.
+
+    feature_ramp.set_backend(InstrumentedBackend(feature_ramp.backend, instrumentation))
+    """
+
+    # commands returning helper objects rather than talking to storage
+    UNTIMED_COMMANDS = frozenset(['pubsub'])
+
+    def __init__(self, backend, instrumentation):
+        self.backend = backend
+        self.instrumentation = instrumentation
+
+    def pipeline(self, *args, **kwargs):
+        return InstrumentedPipeline(self.backend.pipeline(*args, **kwargs), self.instrumentation)
+
+    def register_script(self, script):
+        return self._timed('evalsha', self.backend.register_script(script))
+
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+
+        command = getattr(self.backend, name)
+        if name in self.UNTIMED_COMMANDS or not callable(command):
+            return command
+
+        timed_command = self._timed(name, command)
+        setattr(self, name, timed_command)  # later lookups skip __getattr__
+        return timed_command
+
+    def _timed(self, name, command):
+        instrumentation = self.instrumentation
+        timer = timeit.default_timer
+
+        def timed_command(*args, **kwargs):
+            start = timer()
+            result = command(*args, **kwargs)
+            seconds = timer() - start
+            instrumentation.storage_call(name, seconds, payload_size(args) + payload_size(kwargs.get('args')) +
+                                         payload_size(result))
+            return result
+        return timed_command
+
+
+class InstrumentedPipeline(object):
+    """ Wraps a pipeline of an InstrumentedBackend, timing its execute(). """
+
+    def __init__(self, pipeline, instrumentation):
+        self._pipeline = pipeline
+        self._instrumentation = instrumentation
+
+    def execute(self, *args, **kwargs):
+        start = timeit.default_timer()
+        result = self._pipeline.execute(*args, **kwargs)
+        seconds = timeit.default_timer() - start
+        self._instrumentation.storage_call('pipeline', seconds, payload_size(result))
+        return result
+
+    def __enter__(self):
+        self._pipeline.__enter__()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return self._pipeline.__exit__(exc_type, exc_value, traceback)
+
+    def __getattr__(self, name):
+        return getattr(self._pipeline, name)
+
+
+def payload_size(value):
+    """ Approximates the bytes a value takes on the wire: the length of strings,
+    summed over containers. Numbers, booleans and None count as nothing.
+    """
+
+    if isinstance(value, (bytes, text_type)):
+        return len(value)
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return sum(payload_size(item) for item in value)
+    if isinstance(value, dict):
+        return sum(payload_size(item) for item in value.values())
+    return 0
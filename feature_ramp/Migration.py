@@ -0,0 +1,133 @@
+"""
+Copies every feature's settings from one REDIS_VERSION's keys to another's,
+rewriting them in that version's format (see Codec), e.g. to move to the
+compact binary format:
+
+$ python -m feature_ramp.Migration --from-version 1 --to-version 2
+
+Features are copied in batches, so Redis is never blocked for long. Every
+copied and deleted key is recorded in the change log, so FeatureSync and
+FeatureSubscriber readers of either version pick the migration up. Features
+that already have a key in the new version are never copied again, so
+changes made to them since are kept.
+
+REDIS_VERSION selects both the keys features are read from and their format,
+so processes running different versions read different copies of every
+feature. Roll out a new version in this order:
+
+1. Deploy a release that knows the new version's codec, still running with
+   the old Feature.REDIS_VERSION everywhere.
+2. Pause feature changes, and run the migration.
+3. Deploy Feature.REDIS_VERSION set to the new version. Until every process
+   runs it, a change made through one version is not seen by processes
+   running the other, so keep changes paused until the deploy completes.
+4. Remove the old keys by running again with --delete-old.
+"""
+
+import argparse
+import sys
+
+import feature_ramp
+from feature_ramp import Codec
+from feature_ramp.Feature import Feature
+
+
+def migrate(from_version=1, to_version=2, batch_size=500, delete_old=False):
+    """ Copies all features from ``from_version`` keys to ``to_version`` keys,
+    including Redis sets and Bloom filters, skipping those that already have a
+    ``to_version`` key. Returns the number of features copied.
+    """
+
+    if to_version not in Codec.CODECS:
+        raise ValueError("Unknown REDIS_VERSION {0}".format(to_version))
+
+    set_key = Feature._get_redis_set_key()
+    old_prefix = _get_versioned_key(from_version, '')
+    old_keys = (key for key in feature_ramp.backend.sscan_iter(set_key, count=batch_size)
+                if _decode(key).startswith(old_prefix))
+
+    migrated = 0
+    for batch in Feature._chunked(old_keys, batch_size):
+        migrated += _migrate_batch([_decode(key) for key in batch], to_version, delete_old)
+    return migrated
+
+
+def _migrate_batch(old_keys, to_version, delete_old):
+    """ Copies one batch of features with a single MGET and pipeline. """
+
+    set_key = Feature._get_redis_set_key()
+    codec = Codec.CODECS[to_version]
+
+    new_keys = [_get_versioned_key(to_version, Feature._get_feature_name_from_redis_key(old_key))
+                for old_key in old_keys]
+    values = feature_ramp.backend.mget(old_keys + new_keys)
+
+    migrated = 0
+    changed_keys = []
+    pipe = feature_ramp.backend.pipeline(transaction=False)
+    for old_key, new_key, raw, new_raw in zip(old_keys, new_keys, values, values[len(old_keys):]):
+        if raw is None:  # deleted since the set was read
+            continue
+
+        if new_raw is None:  # otherwise already migrated, and perhaps changed since
+            _queue_copy(pipe, old_key, new_key, Feature._deserialize(raw), codec)
+            changed_keys.append(new_key)
+            migrated += 1
+
+        if delete_old:
+            pipe.delete(old_key, *['{0}.{1}'.format(old_key, suffix)
+                                   for suffix in ['whitelist', 'blacklist', 'blacklist_bloom']])
+            pipe.srem(set_key, old_key)
+            changed_keys.append(old_key)
+
+    pipe.execute()
+    for key in changed_keys:  # once written, so that readers of the log find the new keys
+        Feature._log_change(key)
+    return migrated
+
+
+def _queue_copy(pipe, old_key, new_key, redis_data, codec):
+    """ Queues copying one feature's settings, Redis sets and Bloom filter to its new key. """
+
+    pipe.set(new_key, codec.encode(redis_data), nx=True)  # in case it was written since the MGET
+    pipe.sadd(Feature._get_redis_set_key(), new_key)
+
+    if redis_data.get('redis_sets'):
+        for list_name in ['whitelist', 'blacklist']:
+            pipe.sunionstore('{0}.{1}'.format(new_key, list_name), '{0}.{1}'.format(old_key, list_name))
+    if redis_data.get('blacklist_bloom') is not None:
+        bitmap = feature_ramp.backend.get('{0}.blacklist_bloom'.format(old_key))
+        if bitmap is not None:
+            pipe.set('{0}.blacklist_bloom'.format(new_key), bitmap)
+
+    pipe.publish(Feature._get_redis_channel_key(), new_key)
+
+
+def _get_versioned_key(version, feature_name):
+    """ Returns the key of the named feature for the given REDIS_VERSION; see
+    Feature._get_redis_key_for_feature().
+    """
+
+    return '{0}.{1}.{2}'.format(Feature.REDIS_NAMESPACE, version, feature_name)
+
+
+def _decode(key):
+    return key if isinstance(key, str) else key.decode('utf-8')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Copies features to the keys and format of another REDIS_VERSION.")
+    parser.add_argument('--from-version', type=int, default=1)
+    parser.add_argument('--to-version', type=int, default=2)
+    parser.add_argument('--batch-size', type=int, default=500)
+    parser.add_argument('--delete-old', action='store_true',
+                        help="also delete the features' old keys")
+    args = parser.parse_args(argv)
+
+    migrated = migrate(args.from_version, args.to_version, args.batch_size, args.delete_old)
+    sys.stdout.write("Migrated {0} features from version {1} to version {2}\n".format(
+        migrated, args.from_version, args.to_version))
+
+
+if __name__ == '__main__':
+    main()
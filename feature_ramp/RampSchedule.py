@@ -0,0 +1,93 @@
+import calendar
+import math
+import numbers
+
+
+class RampSchedule(object):
+    """
+    A gradual change of a feature's percentage over time, from
+    ``start_percentage`` at ``start_time`` to ``end_percentage`` at
+    ``end_time`` (Unix timestamps, or datetimes taken as UTC if naive).
+
+    The schedule is stored once, in the feature's settings, and every client
+    computes the current percentage from its own clock, so a rollout over
+    days needs no further writes and cached settings stay valid throughout.
+    The percentage moves linearly, or in increments of ``step`` percentage
+    points if one is given, and holds at ``end_percentage`` once the
+    schedule is over:
+
+    Feature("new_checkout").set_schedule(start, start + 7 * 86400, 0, 100, step=5)
+    """
+
+    def __init__(self, start_time, end_time, start_percentage, end_percentage, step=None):
+        start_time, end_time = self._to_timestamp(start_time), self._to_timestamp(end_time)
+        if not end_time > start_time:
+            raise ValueError("A ramp schedule must end after it starts")
+        for percentage in (start_percentage, end_percentage):
+            if not (self._is_number(percentage) and 0 <= percentage <= 100):
+                raise ValueError("A ramp schedule's percentages must be between 0 and 100")
+        if step is not None and not (self._is_number(step) and step > 0):
+            raise ValueError("A ramp schedule's step must be a positive number")
+
+        self.start_time = start_time
+        self.end_time = end_time
+        self.start_percentage = start_percentage
+        self.end_percentage = end_percentage
+        self.step = step
+
+    @classmethod
+    def from_dict(cls, data):
+        """ Builds a schedule from its representation in a feature's settings. """
+
+        return cls(data['start_time'], data['end_time'], data['start_percentage'], data['end_percentage'],
+                   data.get('step'))
+
+    def to_dict(self):
+        """ Returns the representation of the schedule stored in a feature's settings. """
+
+        data = {
+            'start_time': self.start_time,
+            'end_time': self.end_time,
+            'start_percentage': self.start_percentage,
+            'end_percentage': self.end_percentage,
+        }
+        if self.step is not None:
+            data['step'] = self.step
+        return data
+
+    def percentage_at(self, now):
+        """ Returns the percentage the schedule gives at the Unix timestamp ``now``. """
+
+        if now <= self.start_time:
+            return self.start_percentage
+        if now >= self.end_time:
+            return self.end_percentage
+
+        change = (self.end_percentage - self.start_percentage) * (now - self.start_time) / float(
+            self.end_time - self.start_time)
+        if self.step is not None:
+            # round first so float noise just below a step does not hold the previous one
+            change = math.copysign(math.floor(round(abs(change) / self.step, 9)) * self.step, change)
+        return self.start_percentage + change
+
+    def __eq__(self, other):
+        return isinstance(other, RampSchedule) and self.to_dict() == other.to_dict()
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __repr__(self):
+        return "RampSchedule({start_time!r}, {end_time!r}, {start_percentage!r}, {end_percentage!r}, " \
+               "step={step!r})".format(**self.__dict__)
+
+    @staticmethod
+    def _to_timestamp(value):
+        if hasattr(value, 'utctimetuple'):  # a datetime
+            return calendar.timegm(value.utctimetuple())
+        if not RampSchedule._is_number(value):
+            raise ValueError("{0!r} is not a timestamp or datetime".format(value))
+        return value
+
+    @staticmethod
+    def _is_number(value):
+        return isinstance(value, numbers.Real) and not isinstance(value, bool)
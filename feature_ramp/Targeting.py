@@ -0,0 +1,88 @@
+import numbers
+
+# Rule operators, see compile_rules()
+EQ = 'eq'
+IN = 'in'
+RANGE = 'range'
+
+_MISSING = object()
+
+
+def compile_rules(rules):
+    """
+    Compiles a feature's targeting rules into a predicate taking a dictionary
+    of attributes, which returns True if the attributes match every rule.
+    Returns None if there are no rules. Each rule is a dictionary naming an
+    attribute and an operator:
+
+    {'attribute': 'platform', 'operator': 'eq', 'value': 'ios'}
+    {'attribute': 'region', 'operator': 'in', 'values': ['CA', 'NY']}
+    {'attribute': 'age', 'operator': 'range', 'min': 18, 'max': 65}
+
+    Ranges include ``min`` and exclude ``max``; either may be omitted. An
+    attribute that is missing, or not a number for a range, never matches.
+    Raises ValueError for malformed rules.
+    """
+
+    if not rules:
+        return None
+
+    checks = [_compile_rule(rule) for rule in rules]
+    if len(checks) == 1:
+        return checks[0]
+
+    def matches(attributes):
+        for check in checks:
+            if not check(attributes):
+                return False
+        return True
+    return matches
+
+
+def _compile_rule(rule):
+    """ Returns the predicate for a single rule. """
+
+    if not isinstance(rule, dict) or 'attribute' not in rule:
+        raise ValueError("Targeting rule {0!r} does not name an attribute".format(rule))
+
+    attribute = rule['attribute']
+    operator = rule.get('operator')
+
+    if operator == EQ:
+        if 'value' not in rule:
+            raise ValueError("Targeting rule {0!r} has no value".format(rule))
+        value = rule['value']
+        return lambda attributes: attributes.get(attribute, _MISSING) == value
+
+    if operator == IN:
+        try:
+            values = frozenset(rule['values'])
+        except (KeyError, TypeError):
+            raise ValueError("Targeting rule {0!r} needs a list of values".format(rule))
+
+        def is_in(attributes):
+            try:
+                return attributes.get(attribute, _MISSING) in values
+            except TypeError:  # unhashable attribute value
+                return False
+        return is_in
+
+    if operator == RANGE:
+        low, high = rule.get('min'), rule.get('max')
+        if low is None and high is None:
+            raise ValueError("Targeting rule {0!r} needs a min or a max".format(rule))
+        if not all(bound is None or _is_number(bound) for bound in (low, high)):
+            raise ValueError("Targeting rule {0!r} has a bound that is not a number".format(rule))
+
+        def in_range(attributes):
+            value = attributes.get(attribute)
+            return (_is_number(value) and
+                    (low is None or low <= value) and
+                    (high is None or value < high))
+        return in_range
+
+    raise ValueError("Unknown targeting operator {0!r}".format(operator))
+
+
+def _is_number(value):
+    return isinstance(value, numbers.Real) and not isinstance(value, bool)
@@ -1,3 +1,15 @@
-import redis
+from feature_ramp.Backend import RedisBackend
 
-redis = redis.StrictRedis(host='localhost', port=6379, db=0)
+# The storage backend Feature reads and writes through. It connects lazily,
+# so importing feature_ramp does no network I/O; use set_backend() to point
+# it elsewhere. ``redis`` is kept as an alias of the current backend.
+backend = redis = RedisBackend(host='localhost', port=6379, db=0)
+
+
+def set_backend(new_backend):
+    """ Replaces the storage backend used by every Feature, e.g. with a
+    RedisBackend for another server or an InMemoryBackend in tests.
+    """
+
+    global backend, redis
+    backend = redis = new_backend
@@ -0,0 +1,8 @@
+class FakeClock(object):
+    """ A controllable replacement for time.time(). """
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
@@ -0,0 +1,215 @@
+import sys
+
+from unittest2 import TestCase, skipIf
+
+from feature_ramp import redis
+from feature_ramp.Feature import Feature
+
+
+@skipIf(sys.version_info < (3, 5), "AsyncFeature requires Python 3")
+class AsyncFeatureTest(TestCase):
+    """ Tests the asyncio feature API against Redis. """
+
+    def setUp(self):
+        import asyncio
+        from feature_ramp import AsyncFeature as async_feature
+        from feature_ramp.Backend import AsyncRedisBackend
+
+        self.loop = asyncio.new_event_loop()
+        self.async_feature = async_feature
+        self.default_backend = async_feature.backend
+        # a fresh client per test, since its connections belong to one event loop
+        async_feature.set_backend(AsyncRedisBackend(host='localhost', port=6379, db=0))
+        self.AsyncFeature = async_feature.AsyncFeature
+
+    def tearDown(self):
+        self.wait(self.async_feature.backend.aclose())
+        self.async_feature.set_backend(self.default_backend)
+        self.loop.close()
+        for feature in Feature.all_features():
+            Feature(feature).delete()
+
+    def wait(self, coroutine):
+        return self.loop.run_until_complete(coroutine)
+
+    def load(self, feature_name, **kwargs):
+        return self.wait(self.AsyncFeature.load(feature_name, **kwargs))
+
+    def test_constructor_is_not_supported(self):
+        with self.assertRaises(TypeError):
+            self.AsyncFeature("testing")
+
+    def test_load(self):
+        Feature("testing").set_percentage(5)
+        Feature("testing").add_to_whitelist(3)
+
+        feature = self.load("testing")
+        self.assertEqual(feature.percentage, 5)
+        self.assertEqual(feature.whitelist, [3])
+
+    def test_load_with_default_percentage(self):
+        self.assertEqual(self.load("testing", default_percentage=100).percentage, 100)
+
+    def test_set_percentage(self):
+        feature = self.load("testing")
+        self.wait(feature.set_percentage(5))
+
+        self.assertEqual(feature.percentage, 5)
+        self.assertEqual(Feature("testing").percentage, 5)
+
+    def test_set_schedule(self):
+        feature = self.load("testing")
+        self.wait(feature.set_schedule(1000, 2000, 0, 100))
+        self.assertEqual(Feature("testing").schedule.to_dict(),
+                         {'start_time': 1000, 'end_time': 2000, 'start_percentage': 0, 'end_percentage': 100})
+        self.assertEqual(feature.percentage, 100)
+
+        self.wait(feature.set_percentage(5))
+        self.assertIsNone(Feature("testing").schedule)
+        self.assertEqual(Feature("testing").percentage, 5)
+
+    def test_whitelist_and_blacklist(self):
+        feature = self.load("testing")
+        self.wait(feature.add_many_to_whitelist([3, 4]))
+        self.wait(feature.add_to_blacklist(5))
+        self.wait(feature.remove_from_whitelist(4))
+
+        self.assertEqual(Feature("testing").whitelist, [3])
+        self.assertEqual(Feature("testing").blacklist, [5])
+        with self.assertRaises(ValueError):
+            self.wait(feature.remove_from_blacklist(6))
+
+    def test_is_visible_matches_sync(self):
+        """ Tests that async evaluation gives the same answers as Feature. """
+
+        Feature("testing").set_percentage(30)
+        Feature("testing").add_to_whitelist(3)
+        Feature("testing").add_to_blacklist(4)
+
+        feature = self.load("testing")
+        sync_feature = Feature("testing")
+        for identifier in list(range(1, 501)) + ['example@example.com']:
+            self.assertEqual(self.wait(feature.is_visible(identifier)), sync_feature.is_visible(identifier))
+
+    def test_redis_sets(self):
+        feature = self.load("testing")
+        self.wait(feature.add_to_whitelist(3))
+        self.wait(feature.use_redis_sets())
+        self.wait(feature.add_to_blacklist(4))
+
+        feature = self.load("testing")
+        self.assertTrue(self.wait(feature.is_visible(3)))
+        self.assertFalse(self.wait(feature.is_visible(4)))
+        with self.assertRaises(RuntimeError):
+            feature.whitelist
+
+    def test_blacklist_bloom_filter(self):
+        feature = self.load("testing")
+        self.wait(feature.add_to_blacklist(3))
+        self.wait(feature.use_blacklist_bloom_filter(1000))
+        self.wait(feature.add_to_blacklist(4))
+        self.wait(feature.activate())
+
+        feature = self.load("testing")
+        self.assertFalse(self.wait(feature.is_visible(3)))
+        self.assertFalse(self.wait(feature.is_visible(4)))
+        self.assertTrue(self.wait(feature.is_visible(5)))
+        self.assertTrue(Feature("testing").is_blacklisted(4))
+
+        self.wait(feature.fetch_lists())
+        self.assertEqual(feature.filter_visible([3, 4, 5]), [5])
+
+    def test_all_features(self):
+        Feature("looktest1").set_percentage(5)
+        Feature("looktest2").add_to_whitelist(3)
+
+        self.assertEqual(sorted(self.wait(self.AsyncFeature.all_features())), ['looktest1', 'looktest2'])
+        self.assertEqual(self.wait(self.AsyncFeature.all_features(include_data=True)),
+                         Feature.all_features(include_data=True))
+
+    def test_iter_features(self):
+        Feature("looktest1").set_percentage(5)
+        Feature("looktest2").add_to_whitelist(3)
+
+        items = self.collect(self.AsyncFeature.iter_features(include_data=True))
+        self.assertEqual(dict(items), Feature.all_features(include_data=True))
+
+    def test_evaluate_all(self):
+        Feature("looktest1").activate()
+        Feature("looktest2").add_to_whitelist(3)
+
+        self.assertEqual(self.wait(self.AsyncFeature.evaluate_all(3)), Feature.evaluate_all(3))
+
+    def test_delete(self):
+        feature = self.load("testing")
+        self.wait(feature.set_percentage(5))
+        self.wait(feature.delete())
+
+        self.assertEqual(Feature.all_features(), [])
+
+    def test_change_log(self):
+        version = self.wait(self.AsyncFeature.change_version())
+        feature = self.load("testing")
+        self.wait(feature.set_percentage(5))
+        self.wait(feature.delete())
+
+        self.assertEqual(self.wait(self.AsyncFeature.changes_since(version)), (version + 2, ['testing']))
+        self.assertEqual(Feature.changes_since(version), (version + 2, ['testing']))
+
+    def test_list_changes_are_logged(self):
+        feature = self.load("testing")
+        self.wait(feature.use_blacklist_bloom_filter(1000))
+        self.wait(feature.use_redis_sets())
+        version = self.wait(self.AsyncFeature.change_version())
+
+        self.wait(feature.add_to_whitelist(42))
+        self.assertEqual(Feature.changes_since(version), (version + 1, ['testing']))
+        self.wait(feature.add_to_blacklist(4))
+        self.assertEqual(Feature.changes_since(version), (version + 2, ['testing']))
+
+    def test_feature_context(self):
+        """ Tests that tasks started within a FeatureContext share it. """
+
+        import asyncio
+        from feature_ramp.FeatureContext import FeatureContext
+
+        Feature("testing").set_percentage(100)
+
+        with FeatureContext():
+            feature = self.load("testing")
+            self.assertTrue(self.wait(feature.is_visible(3)))
+
+            redis.set(Feature._get_redis_key_for_feature("testing"), '{"percentage": 0}')
+            tasks = [self.loop.create_task(self.AsyncFeature.load("testing")) for _ in range(2)]
+            features = self.wait(asyncio.gather(*tasks))
+            self.assertEqual([feature.percentage for feature in features], [100, 100])
+            self.assertTrue(self.wait(features[0].is_visible(3)))
+
+        self.assertFalse(self.wait(self.load("testing").is_visible(3)))
+
+    def test_circuit_breaker(self):
+        from feature_ramp.Backend import AsyncRedisBackend
+        from feature_ramp.CircuitBreaker import OPEN, CircuitBreaker
+
+        Feature("testing").set_percentage(100)
+        Feature.circuit_breaker = CircuitBreaker(failure_threshold=1)
+        try:
+            self.load("testing")
+            self.assertEqual(self.wait(self.async_feature.AsyncFeature.all_features()), ["testing"])
+            self.wait(self.async_feature.backend.aclose())
+            self.async_feature.set_backend(AsyncRedisBackend(host='localhost', port=1))
+
+            self.assertTrue(self.load("testing").is_active)
+            self.assertFalse(self.load("unknown").is_active)
+            self.assertEqual(Feature.circuit_breaker.state, OPEN)
+            self.assertEqual(self.wait(self.async_feature.AsyncFeature.evaluate_all(3)), {"testing": True})
+        finally:
+            Feature.circuit_breaker = None
+
+    def collect(self, async_iterator):
+        items = []
+        while True:
+            try:
+                items.append(self.wait(async_iterator.__anext__()))
+            except StopAsyncIteration:
+                return items
@@ -0,0 +1,210 @@
+import socket
+
+from unittest2 import TestCase
+
+import feature_ramp
+from feature_ramp.Backend import ConnectionError, InMemoryBackend, RedisBackend, WatchError
+from feature_ramp.Feature import Feature
+
+
+class RedisBackendTest(TestCase):
+    """ Tests that the Redis backend connects lazily. """
+
+    def test_no_client_until_first_command(self):
+        backend = RedisBackend(host='localhost', port=6379)
+        self.assertTrue(backend._client is None)
+
+        backend.ping()
+        self.assertFalse(backend._client is None)
+
+    def test_construction_does_no_network_io(self):
+        """ Tests that an unreachable server only fails on the first command. """
+
+        backend = RedisBackend(host='localhost', port=self._unused_port(), socket_connect_timeout=1)
+        backend.register_script("return 1")
+
+        with self.assertRaises(ConnectionError):
+            backend.get('feature.1.testing')
+
+    def test_pool_configuration(self):
+        backend = RedisBackend(url='redis://localhost:6379/0', max_connections=3, socket_timeout=2)
+        pool = backend.client.connection_pool
+
+        self.assertEqual(pool.max_connections, 3)
+        self.assertEqual(pool.connection_kwargs['socket_timeout'], 2)
+
+    def test_register_script_is_memoized(self):
+        backend = RedisBackend()
+        self.assertTrue(backend.register_script("return 1") is backend.register_script("return 1"))
+
+    def _unused_port(self):
+        sock = socket.socket()
+        sock.bind(('localhost', 0))
+        port = sock.getsockname()[1]
+        sock.close()
+        return port
+
+
+class InMemoryBackendTest(TestCase):
+    """ Tests the Redis commands emulated by the in-memory backend. """
+
+    def setUp(self):
+        self.backend = InMemoryBackend()
+
+    def test_strings(self):
+        self.backend.set('a', '{"percentage": 5}')
+        self.backend.set('b', 3)
+
+        self.assertEqual(self.backend.get('a'), b'{"percentage": 5}')
+        self.assertEqual(self.backend.mget(['a', 'b', 'c']), [b'{"percentage": 5}', b'3', None])
+        self.assertEqual(self.backend.delete('a', 'c'), 1)
+        self.assertTrue(self.backend.get('a') is None)
+
+    def test_sets(self):
+        self.assertEqual(self.backend.sadd('s', 3, 'x', 3), 2)
+        self.assertTrue(self.backend.sismember('s', '3'))
+        self.assertEqual(self.backend.smembers('s'), set([b'3', b'x']))
+        self.assertEqual(sorted(self.backend.sscan_iter('s')), [b'3', b'x'])
+
+        self.assertEqual(self.backend.srem('s', 3, 4), 1)
+        self.assertEqual(self.backend.smembers('s'), set([b'x']))
+
+    def test_bits(self):
+        self.assertEqual(self.backend.setbit('b', 9, 1), 0)
+        self.assertEqual(self.backend.setbit('b', 9, 1), 1)
+
+        self.assertEqual(self.backend.get('b'), b'\x00\x40')
+        self.assertEqual([self.backend.getbit('b', offset) for offset in [8, 9, 100]], [0, 1, 0])
+
+    def test_sorted_sets(self):
+        self.assertEqual(self.backend.zadd('z', {'a': 1, 'b': 2}), 2)
+        self.assertEqual(self.backend.zadd('z', {'a': 3, 'c': 4}), 1)
+
+        self.assertEqual(self.backend.zrangebyscore('z', 2, '+inf'), [b'b', b'a', b'c'])
+        self.assertEqual(self.backend.zrangebyscore('z', 3, 3, withscores=True), [(b'a', 3.0)])
+        self.assertEqual(self.backend.zremrangebyscore('z', '-inf', 3), 2)
+        self.assertEqual(self.backend.zrangebyscore('z', '-inf', '+inf'), [b'c'])
+
+    def test_transaction(self):
+        pipe = self.backend.pipeline()
+        pipe.set('a', 1).sadd('s', 'a')
+
+        self.assertEqual(pipe.execute(), [True, 1])
+        self.assertEqual(self.backend.get('a'), b'1')
+
+    def test_watched_key_changed(self):
+        """ Tests that a transaction fails if a watched key changes before it runs. """
+
+        with self.backend.pipeline() as pipe:
+            pipe.watch('a')
+            self.assertTrue(pipe.get('a') is None)  # runs immediately while watching
+            self.backend.set('a', 2)
+
+            pipe.multi()
+            pipe.set('a', 1)
+            with self.assertRaises(WatchError):
+                pipe.execute()
+
+        self.assertEqual(self.backend.get('a'), b'2')
+
+    def test_pubsub(self):
+        pubsub = self.backend.pubsub(ignore_subscribe_messages=True)
+        pubsub.subscribe('feature.changes')
+
+        self.assertEqual(self.backend.publish('feature.changes', 'feature.1.testing'), 1)
+        self.assertEqual(pubsub.get_message(timeout=1)['data'], b'feature.1.testing')
+        self.assertTrue(pubsub.get_message() is None)
+
+        pubsub.close()
+        self.assertEqual(self.backend.publish('feature.changes', 'feature.1.testing'), 0)
+
+    def test_scripts_decline(self):
+        self.assertEqual(self.backend.register_script("return 1")(keys=['a'], args=[]), -1)
+
+
+class InMemoryFeatureTest(TestCase):
+    """ Tests the feature ramping system against the in-memory backend. """
+
+    def setUp(self):
+        self.default_backend = feature_ramp.backend
+        feature_ramp.set_backend(InMemoryBackend())
+        self.feature_test = Feature("testing")
+
+    def tearDown(self):
+        feature_ramp.set_backend(self.default_backend)
+
+    def test_set_percentage(self):
+        self.feature_test.set_percentage(5)
+        self.assertEqual(Feature("testing").percentage, 5)
+        self.assertEqual(self.default_backend.get(self.feature_test._get_redis_key()), None)
+
+    def test_redis_alias_follows_backend(self):
+        self.assertTrue(feature_ramp.redis is feature_ramp.backend)
+        feature_ramp.set_backend(self.default_backend)
+        self.assertTrue(feature_ramp.redis is self.default_backend)
+
+    def test_whitelist_and_blacklist(self):
+        self.feature_test.add_many_to_whitelist([3, 4])
+        self.feature_test.add_to_blacklist(3)
+        self.feature_test.remove_from_whitelist(4)
+
+        generated = Feature("testing")
+        self.assertEqual(generated.whitelist, [3])
+        self.assertEqual(generated.blacklist, [3])
+        self.assertTrue(generated.is_visible(3))
+
+    def test_concurrent_changes_are_kept(self):
+        first = Feature("testing")
+        second = Feature("testing")
+
+        first.add_to_whitelist(3)
+        second.add_to_whitelist(4)
+        first.set_percentage(20)
+
+        generated = Feature("testing")
+        self.assertEqual(generated.whitelist, [3, 4])
+        self.assertEqual(generated.percentage, 20)
+
+    def test_all_features(self):
+        Feature("looktest1").set_percentage(5)
+        Feature("looktest2").add_to_whitelist(3)
+
+        self.assertEqual(sorted(Feature.all_features()), ['looktest1', 'looktest2'])
+        self.assertEqual(dict(Feature.iter_features(include_data=True)), {
+            'looktest1': {'percentage': 5},
+            'looktest2': {'percentage': 0, 'whitelist': [3]},
+        })
+        self.assertEqual(Feature.evaluate_all(3), {'looktest1': Feature("looktest1").is_visible(3),
+                                                   'looktest2': True})
+
+    def test_redis_sets(self):
+        self.feature_test.add_to_whitelist(3)
+        self.feature_test.use_redis_sets()
+        self.feature_test.add_to_blacklist(4)
+
+        generated = Feature("testing")
+        self.assertTrue(generated.is_visible(3))
+        self.assertFalse(generated.is_visible(4))
+
+    def test_blacklist_bloom_filter(self):
+        self.feature_test.use_blacklist_bloom_filter(1000)
+        self.feature_test.add_many_to_blacklist([3, 4])
+        self.feature_test.activate()
+
+        generated = Feature("testing")
+        self.assertFalse(generated.is_visible(3))
+        self.assertEqual(generated.filter_visible([3, 4, 5]), [5])
+
+    def test_delete(self):
+        self.feature_test.set_percentage(5)
+        self.feature_test.delete()
+
+        self.assertEqual(Feature.all_features(), [])
+        self.assertEqual(Feature("testing").percentage, 0)
+
+    def test_change_log(self):
+        version = Feature.change_version()
+        self.feature_test.set_percentage(5)
+        Feature("other").delete()
+
+        self.assertEqual(Feature.changes_since(version), (version + 2, ['testing', 'other']))
@@ -0,0 +1,60 @@
+from unittest2 import TestCase
+
+from feature_ramp import redis
+from feature_ramp.BloomFilter import BloomFilter
+
+
+class BloomFilterTest(TestCase):
+    """ Tests the Bloom filter used for very large blacklists. """
+
+    def tearDown(self):
+        redis.delete('bloom_filter_test')
+
+    def test_sizing(self):
+        bloom_filter = BloomFilter.for_capacity(1000000, error_rate=0.001)
+
+        self.assertEqual(bloom_filter.num_bits, 14377588)
+        self.assertEqual(bloom_filter.num_hashes, 10)
+        self.assertEqual(len(bloom_filter.to_bytes()), 1797199)
+
+    def test_invalid_sizes(self):
+        with self.assertRaises(ValueError):
+            BloomFilter.for_capacity(0)
+        with self.assertRaises(ValueError):
+            BloomFilter.for_capacity(100, error_rate=1)
+
+    def test_no_false_negatives(self):
+        bloom_filter = BloomFilter.for_capacity(1000, error_rate=0.01)
+        self.assertTrue(bloom_filter.update(range(1000)) > 990)  # some may look like duplicates
+
+        self.assertTrue(all(identifier in bloom_filter for identifier in range(1000)))
+        self.assertTrue('999' in bloom_filter)  # identifiers are hashed by their str()
+        self.assertFalse(bloom_filter.add(3))
+
+    def test_false_positive_rate(self):
+        bloom_filter = BloomFilter.for_capacity(1000, error_rate=0.01)
+        bloom_filter.update(range(1000))
+
+        false_positives = len([identifier for identifier in range(1000, 101000) if identifier in bloom_filter])
+        self.assertTrue(false_positives < 1500, false_positives)
+
+    def test_stable_positions(self):
+        """ Tests that positions do not depend on the process, so filters can be shared. """
+
+        self.assertEqual(BloomFilter.positions_for('example@example.com', 1000, 3), [2, 963, 924])
+        self.assertEqual(BloomFilter.positions_for(u'\u2665', 1000, 3), BloomFilter.positions_for(u'\u2665'.encode('utf-8'), 1000, 3))
+
+    def test_redis_bitmap_layout(self):
+        """ Tests that bits set with SETBIT are found in the bitmap, and vice versa. """
+
+        bloom_filter = BloomFilter(100, 3)
+        for position in bloom_filter.positions(3):
+            redis.setbit('bloom_filter_test', position, 1)
+
+        loaded = BloomFilter(100, 3, redis.get('bloom_filter_test'))
+        self.assertTrue(3 in loaded)
+        self.assertEqual(len(loaded.to_bytes()), 13)
+
+        bloom_filter.add(4)
+        redis.set('bloom_filter_test', bloom_filter.to_bytes())
+        self.assertTrue(all(redis.getbit('bloom_filter_test', position) for position in bloom_filter.positions(4)))
@@ -0,0 +1,129 @@
+import os
+import subprocess
+import sys
+
+from unittest2 import TestCase
+
+from feature_ramp.Bucketer import Crc32Bucketer, LegacyHashBucketer
+
+
+RANKINGS_SCRIPT = """
+from feature_ramp.Bucketer import Crc32Bucketer
+bucketer = Crc32Bucketer()
+offset = bucketer.offset('testing')
+print(bucketer.rankings(offset, range(1, 1001)))
+"""
+
+
+class BucketerTest(TestCase):
+    """ Tests the assignment of identifiers to ramp buckets. """
+
+    def setUp(self):
+        self.bucketer = Crc32Bucketer()
+        self.offset = self.bucketer.offset('testing')
+
+    def test_pinned_rankings(self):
+        """ Tests that bucket assignments never change between releases. """
+
+        identifiers = [1, 2, 3, 'example@example.com', u'\u2665@example.com']
+        self.assertEqual(self.offset, 6)
+        self.assertEqual([self.bucketer.ranking(self.offset, identifier) for identifier in identifiers],
+                         [89, 43, 17, 8, 14])
+
+    def test_pinned_fine_rankings(self):
+        bucketer = Crc32Bucketer(buckets=10000)
+        offset = bucketer.offset('testing')
+
+        self.assertEqual(offset, 2406)
+        self.assertEqual(bucketer.rankings(offset, [1, 2, 3]), [6989, 7843, 8017])
+
+    def test_rankings_are_stable_across_processes(self):
+        """ Tests that processes with different hash seeds agree on every bucket. """
+
+        outputs = set()
+        for seed in ['1', '2', 'random']:
+            env = dict(os.environ, PYTHONHASHSEED=seed)
+            outputs.add(subprocess.check_output([sys.executable, '-c', RANKINGS_SCRIPT], env=env))
+
+        self.assertEqual(len(outputs), 1)
+        self.assertEqual(outputs.pop().strip().decode('utf-8'),
+                         str(self.bucketer.rankings(self.offset, range(1, 1001))))
+
+    def test_rankings_match_ranking(self):
+        identifiers = list(range(100)) + ['example@example.com']
+        self.assertEqual(self.bucketer.rankings(self.offset, identifiers),
+                         [self.bucketer.ranking(self.offset, identifier) for identifier in identifiers])
+
+    def test_rankings_array_matches_rankings(self):
+        try:
+            import numpy
+        except ImportError:
+            self.skipTest("numpy is not installed")
+
+        bucketer = Crc32Bucketer(buckets=10000)
+        identifiers = list(range(-1000, 20000)) + [10 ** 18, -2 ** 63, 2 ** 63 - 1]
+        for dtype in [numpy.int64, numpy.uint64, numpy.int32]:
+            array = numpy.array([identifier for identifier in identifiers
+                                 if numpy.iinfo(dtype).min <= identifier <= numpy.iinfo(dtype).max], dtype=dtype)
+            self.assertEqual(bucketer.rankings_array(self.offset, array).tolist(),
+                             bucketer.rankings(self.offset, array.tolist()))
+        self.assertEqual(LegacyHashBucketer().rankings_array(self.offset, numpy.arange(100)).tolist(),
+                         LegacyHashBucketer().rankings(self.offset, range(100)))
+
+    def test_int_and_string_identifiers_share_buckets(self):
+        self.assertEqual(self.bucketer.ranking(self.offset, 5), self.bucketer.ranking(self.offset, '5'))
+
+    def test_group_offset_is_within_buckets(self):
+        offset = self.bucketer.offset('feature_one', 'test_group')
+
+        self.assertEqual(offset, self.bucketer.offset('feature_two', 'test_group'))
+        self.assertTrue(0 <= offset < 100)
+
+    def test_threshold(self):
+        self.assertEqual(self.bucketer.threshold(0), 0)
+        self.assertEqual(self.bucketer.threshold(7), 7)
+        self.assertEqual(self.bucketer.threshold(100), 100)
+        self.assertEqual(Crc32Bucketer(buckets=10000).threshold(0.07), 7)
+
+    def test_normalize_percentage(self):
+        self.assertEqual(self.bucketer.normalize_percentage("50.5"), 50)
+        self.assertTrue(isinstance(self.bucketer.normalize_percentage(50.5), int))
+
+        bucketer = Crc32Bucketer(buckets=10000)
+        self.assertEqual(bucketer.normalize_percentage(0.015), 0.01)
+        self.assertEqual(bucketer.normalize_percentage(5), 5)
+
+    def test_normalize_percentage_keeps_every_step(self):
+        for buckets in [100, 1000, 10000]:
+            bucketer = Crc32Bucketer(buckets=buckets)
+            for ramped in range(buckets + 1):
+                percentage = ramped * 100.0 / buckets
+                self.assertEqual(bucketer.normalize_percentage(percentage), percentage)
+                self.assertEqual(bucketer.threshold(bucketer.normalize_percentage(percentage)), ramped)
+
+    def test_fine_ramp(self):
+        """ Tests that 10000 buckets ramp in steps of 0.01%. """
+
+        bucketer = Crc32Bucketer(buckets=10000)
+        offset = bucketer.offset('testing')
+        threshold = bucketer.threshold(0.5)
+
+        rankings = bucketer.rankings(offset, range(1, 100001))
+        ramped = len([ranking for ranking in rankings if ranking < threshold])
+        self.assertAlmostEqual(ramped / 100000.0, 0.005, delta=.001)
+
+    def test_invalid_buckets(self):
+        with self.assertRaises(ValueError):
+            Crc32Bucketer(buckets=150)
+
+    def test_legacy_matches_builtin_hash(self):
+        """ Tests that the compatibility bucketer reproduces the original bucketing. """
+
+        bucketer = LegacyHashBucketer()
+        self.assertEqual(bucketer.offset('testing'), hash('testing') % 100)
+        self.assertEqual(bucketer.offset('feature_one', 'test_group'), hash('test_group'))
+
+        offset = bucketer.offset('testing')
+        for identifier in [1, 'example@example.com']:
+            self.assertEqual(bucketer.ranking(offset, identifier),
+                             (offset + hash(str(identifier))) % 100)
@@ -0,0 +1,317 @@
+import os
+import shutil
+import tempfile
+
+from unittest2 import TestCase
+
+import feature_ramp
+from fake_clock import FakeClock
+from feature_ramp.Backend import ConnectionError, InMemoryBackend, TimeoutError
+from feature_ramp.CircuitBreaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitOpenError
+from feature_ramp.Feature import Feature
+from feature_ramp.FeatureCache import FeatureCache
+from feature_ramp.FeatureContext import FeatureContext
+from feature_ramp.FeatureSnapshot import FeatureSnapshot
+
+
+class OutageBackend(object):
+    """ Wraps a backend, failing every command while ``down`` is set. """
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.down = False
+        self.calls = 0
+
+    def pipeline(self, *args, **kwargs):
+        return OutagePipeline(self, self.backend.pipeline(*args, **kwargs))
+
+    def __getattr__(self, name):
+        command = getattr(self.backend, name)
+
+        def outage_command(*args, **kwargs):
+            self.calls += 1
+            if self.down:
+                raise ConnectionError("Connection refused")
+            return command(*args, **kwargs)
+        return outage_command
+
+
+class OutagePipeline(object):
+    def __init__(self, outage_backend, pipeline):
+        self._outage_backend = outage_backend
+        self._pipeline = pipeline
+
+    def execute(self):
+        self._outage_backend.calls += 1
+        if self._outage_backend.down:
+            raise TimeoutError("Timeout reading from socket")
+        return self._pipeline.execute()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self._pipeline.__exit__(exc_type, exc_value, traceback)
+
+    def __getattr__(self, name):
+        return getattr(self._pipeline, name)
+
+
+def fail():
+    raise ConnectionError("Connection refused")
+
+
+class CircuitBreakerTest(TestCase):
+    """ Tests the breaker's states on its own. """
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.breaker = CircuitBreaker(failure_threshold=2, reset_timeout=10, clock=self.clock)
+
+    def test_opens_after_consecutive_failures(self):
+        with self.assertRaises(ConnectionError):
+            self.breaker.call(fail)
+        self.assertEqual(self.breaker.call(lambda: 'pong'), 'pong')
+        self.assertEqual(self.breaker.state, CLOSED)
+
+        for _ in range(2):
+            with self.assertRaises(ConnectionError):
+                self.breaker.call(fail)
+        self.assertEqual(self.breaker.state, OPEN)
+
+        with self.assertRaises(CircuitOpenError):
+            self.breaker.call(lambda: 'pong')
+        self.assertEqual(self.breaker.rejected_calls, 1)
+
+    def test_trial_call_after_reset_timeout(self):
+        self.breaker.record_failure()
+        self.breaker.record_failure()
+
+        self.clock.now += 10
+        self.assertTrue(self.breaker.allow())
+        self.assertEqual(self.breaker.state, HALF_OPEN)
+        self.assertFalse(self.breaker.allow())  # one trial at a time
+
+        self.breaker.record_failure()
+        self.assertEqual((self.breaker.state, self.breaker.times_opened), (OPEN, 2))
+
+        self.clock.now += 10
+        self.assertEqual(self.breaker.call(lambda: 'pong'), 'pong')
+        self.assertEqual(self.breaker.state, CLOSED)
+
+    def test_other_errors_do_not_count(self):
+        def bad_command():
+            raise ValueError("WRONGTYPE")
+
+        for _ in range(3):
+            with self.assertRaises(ValueError):
+                self.breaker.call(bad_command)
+        self.assertEqual(self.breaker.state, CLOSED)
+
+    def test_slow_calls_count_as_failures(self):
+        breaker = CircuitBreaker(failure_threshold=1, call_timeout=0.05, clock=self.clock)
+
+        def slow_command():
+            self.clock.now += 0.1
+            return 'pong'
+
+        self.assertEqual(breaker.call(slow_command), 'pong')
+        self.assertEqual((breaker.state, breaker.slow_calls), (OPEN, 1))
+
+    def test_stats(self):
+        self.breaker.record_failure()
+        self.breaker.record_failure()
+        self.breaker.allow()
+
+        stats = self.breaker.stats()
+        self.assertEqual((stats['state'], stats['failed_calls'], stats['rejected_calls'], stats['times_opened']),
+                         (OPEN, 2, 1, 1))
+
+        self.breaker.reset()
+        self.assertEqual((self.breaker.state, self.breaker.stats()['failed_calls']), (CLOSED, 0))
+
+    def test_invalid_failure_threshold(self):
+        with self.assertRaises(ValueError):
+            CircuitBreaker(failure_threshold=0)
+
+
+class FeatureCircuitBreakerTest(TestCase):
+    """ Tests that features fall back to their last known settings while Redis fails. """
+
+    def setUp(self):
+        self.default_backend = feature_ramp.backend
+        self.backend = OutageBackend(InMemoryBackend())
+        feature_ramp.set_backend(self.backend)
+
+        self.clock = FakeClock()
+        Feature.circuit_breaker = CircuitBreaker(failure_threshold=2, reset_timeout=10, clock=self.clock)
+
+        feature = Feature("testing")
+        feature.set_percentage(100)
+        feature.add_to_blacklist(4)
+
+    def tearDown(self):
+        Feature.circuit_breaker = None
+        Feature.cache = None
+        feature_ramp.set_backend(self.default_backend)
+
+    def test_errors_propagate_without_a_breaker(self):
+        Feature.circuit_breaker = None
+        self.backend.down = True
+
+        with self.assertRaises(ConnectionError):
+            Feature("testing")
+
+    def test_last_known_settings(self):
+        Feature("testing")
+        self.backend.down = True
+
+        feature = Feature("testing")
+        self.assertTrue(feature.is_visible(3))
+        self.assertFalse(feature.is_visible(4))
+        self.assertEqual(Feature.circuit_breaker.fallbacks, 1)
+
+    def test_default_percentage_for_unknown_features(self):
+        self.backend.down = True
+
+        self.assertTrue(Feature("never_loaded", default_percentage=100).is_active)
+        self.assertFalse(Feature("never_loaded").is_active)
+
+    def test_open_breaker_does_not_call_redis(self):
+        self.backend.down = True
+        self.backend.calls = 0
+        for _ in range(5):
+            Feature("testing")
+
+        self.assertEqual(Feature.circuit_breaker.state, OPEN)
+        self.assertEqual(self.backend.calls, 2)
+
+        self.backend.down = False
+        self.clock.now += 10
+        Feature("testing")
+        self.assertEqual(Feature.circuit_breaker.state, CLOSED)
+
+    def test_fallback_settings_are_not_cached(self):
+        Feature("other").activate()
+        Feature.cache = FeatureCache()
+        Feature.circuit_breaker = CircuitBreaker(reset_timeout=10, clock=self.clock)  # knows no settings
+        self.backend.down = True
+        self.assertFalse(Feature("other").is_active)
+
+        self.backend.down = False
+        self.assertTrue(Feature("other").is_active)
+
+    def test_evaluate_all(self):
+        Feature("other").activate()
+        Feature.evaluate_all(3, names=["testing", "other"])
+        self.backend.down = True
+
+        self.assertEqual(Feature.evaluate_all(4, names=["testing", "other", "unknown"]),
+                         {"testing": False, "other": True, "unknown": False})
+
+    def test_evaluate_all_features(self):
+        Feature("other").activate()
+        self.assertEqual(Feature.evaluate_all(3), {"testing": True, "other": True})
+        self.backend.down = True
+
+        self.assertEqual(sorted(Feature.all_features()), ["other", "testing"])
+        self.assertEqual(Feature.evaluate_all(4), {"testing": False, "other": True})
+        self.assertEqual(Feature.circuit_breaker.state, OPEN)
+
+    def test_evaluate_all_features_from_snapshot(self):
+        directory = tempfile.mkdtemp()
+        try:
+            path = os.path.join(directory, 'features.snapshot')
+            FeatureSnapshot.write(path, {'snapshotted': {'percentage': 100, 'blacklist': [4]}})
+            Feature.circuit_breaker.snapshot = FeatureSnapshot(path)
+            self.backend.down = True
+
+            self.assertEqual(Feature.evaluate_all(4), {"snapshotted": False})
+            self.assertEqual(Feature.evaluate_all(3), {"snapshotted": True})
+        finally:
+            shutil.rmtree(directory)
+
+        Feature.circuit_breaker.snapshot = None
+        self.assertEqual(Feature.all_features(), [])
+
+    def test_context_keeps_fallback_settings(self):
+        Feature("testing")
+        self.backend.down = True
+
+        with FeatureContext():
+            self.assertTrue(Feature("testing").is_visible(3))
+            self.assertTrue(Feature("testing").is_visible(3))
+        self.assertEqual(Feature.circuit_breaker.fallbacks, 1)
+
+    def test_redis_sets_without_known_members(self):
+        feature = Feature("testing")
+        feature.set_percentage(0)
+        feature.use_redis_sets()
+        feature.add_to_whitelist(5)
+        feature = Feature("testing")
+        self.backend.down = True
+
+        self.assertFalse(feature.is_visible(5))
+        self.assertFalse(feature.is_blacklisted(4))
+        self.assertEqual(feature.visible_mask([3, 5]), [False, False])
+
+    def test_redis_sets_use_last_known_blacklist(self):
+        feature = Feature("testing")
+        feature.use_redis_sets()
+        Feature("testing").blacklist
+        self.backend.down = True
+
+        feature = Feature("testing")
+        self.assertFalse(feature.is_visible(4))
+        self.assertTrue(feature.is_visible(3))
+        self.assertEqual(feature.visible_mask([3, 4]), [True, False])
+
+    def test_redis_sets_use_last_known_whitelist(self):
+        feature = Feature("testing")
+        feature.set_percentage(0)
+        feature.use_redis_sets()
+        feature.add_to_whitelist(5)
+        Feature("testing").whitelist
+        self.backend.down = True
+
+        feature = Feature("testing")
+        self.assertTrue(feature.is_visible(5))
+        self.assertFalse(feature.is_visible(3))
+        self.assertEqual(feature.visible_mask([3, 5]), [False, True])
+
+    def test_bloom_filter_fails_closed(self):
+        Feature("testing").use_blacklist_bloom_filter(capacity=100)
+        feature = Feature("testing")
+        self.backend.down = True
+
+        self.assertFalse(feature.is_visible(3))
+
+    def test_bloom_filter_snapshot_fallback(self):
+        feature = Feature("testing")
+        feature.use_blacklist_bloom_filter(capacity=100)
+        feature.add_to_blacklist(5)
+        directory = tempfile.mkdtemp()
+        try:
+            path = os.path.join(directory, 'features.snapshot')
+            FeatureSnapshot.write(path)
+            Feature.circuit_breaker = CircuitBreaker(reset_timeout=10, clock=self.clock,
+                                                     snapshot=FeatureSnapshot(path))
+            self.backend.down = True
+
+            self.assertEqual(Feature("testing").visible_mask([3, 4, 5]), [True, False, False])
+        finally:
+            shutil.rmtree(directory)
+
+    def test_snapshot_fallback(self):
+        directory = tempfile.mkdtemp()
+        try:
+            path = os.path.join(directory, 'features.snapshot')
+            FeatureSnapshot.write(path, {'snapshotted': {'percentage': 100, 'blacklist': [4]}})
+            Feature.circuit_breaker.snapshot = FeatureSnapshot(path)
+            self.backend.down = True
+
+            feature = Feature("snapshotted")
+            self.assertEqual((feature.is_visible(3), feature.is_visible(4)), (True, False))
+            self.assertFalse(Feature("unknown").is_active)
+        finally:
+            shutil.rmtree(directory)
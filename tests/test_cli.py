@@ -0,0 +1,136 @@
+import io
+import json
+import os
+import shutil
+import tempfile
+
+from unittest2 import TestCase
+
+from feature_ramp import Cli
+from feature_ramp.Feature import Feature
+
+
+class CliTest(TestCase):
+    """ Tests bulk importing and exporting lists from the command line. """
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+        for feature in Feature.all_features():
+            Feature(feature).delete()
+
+    def write_file(self, name, text):
+        path = os.path.join(self.directory, name)
+        with open(path, 'w') as input_file:
+            input_file.write(text)
+        return path
+
+    def read_file(self, path):
+        with io.open(path, encoding='utf-8') as output_file:
+            return output_file.read()
+
+    def test_import(self):
+        path = self.write_file('cohort.txt', '3\n4\n\n3\nexample@example.com\n007\n')
+        Cli.main(['import', 'testing', 'whitelist', path, '--use-redis-sets', '--batch-size', '2', '--quiet'])
+
+        self.assertEqual(sorted(Feature("testing").whitelist), ['007', '3', '4', 'example@example.com'])
+
+    def test_import_csv(self):
+        Feature("testing").use_redis_sets()
+        path = self.write_file('users.csv', 'name,id\nann,3\nbob,"4"\ncat\n')
+        Cli.main(['import', 'testing', 'blacklist', path, '--csv', '--column', '1', '--header', '--quiet'])
+
+        self.assertEqual(sorted(Feature("testing").blacklist), ['3', '4'])
+
+    def test_import_remove(self):
+        Feature("testing").use_redis_sets()
+        Feature("testing").add_many_to_whitelist([3, 4, 5])
+        path = self.write_file('cohort.txt', '3\n5\n')
+        Cli.main(['import', 'testing', 'whitelist', path, '--remove', '--quiet'])
+
+        self.assertEqual(Feature("testing").whitelist, ['4'])
+
+    def test_import_requires_redis_sets(self):
+        Feature("testing").add_to_whitelist(3)
+        path = self.write_file('cohort.txt', '4\n')
+        with self.assertRaises(SystemExit):
+            Cli.main(['import', 'testing', 'whitelist', path, '--quiet'])
+
+        self.assertEqual(Feature("testing").whitelist, [3])
+
+    def test_import_into_blacklist_bloom_filter(self):
+        Feature("testing").use_blacklist_bloom_filter(1000)
+        version = Feature.change_version()
+        Cli.import_identifiers("testing", "blacklist", iter([3, 4, 3]))
+
+        self.assertTrue(Feature("testing").is_blacklisted(4))
+        self.assertEqual(Feature.changes_since(version), (version + 1, ['testing']))
+
+    def test_import_into_redis_sets(self):
+        path = self.write_file('cohort.txt', '\n'.join(str(identifier) for identifier in range(100)))
+        Cli.main(['import', 'testing', 'whitelist', path, '--use-redis-sets', '--batch-size', '30', '--quiet'])
+
+        feature = Feature("testing")
+        self.assertTrue(feature.uses_redis_sets)
+        self.assertEqual(len(feature.whitelist), 100)
+
+    def test_import_identifiers(self):
+        Feature("testing").use_redis_sets()
+        version = Feature.change_version()
+        counts = []
+        result = Cli.import_identifiers("testing", "whitelist", iter([1, 2, 2, 3, 1]), batch_size=3,
+                                        progress=lambda read, changed: counts.append((read, changed)))
+
+        self.assertEqual(result, (5, 3))
+        self.assertEqual(counts, [(3, 2), (5, 3)])
+        self.assertEqual(Feature.changes_since(version), (version + 1, ['testing']))
+
+    def test_export(self):
+        Feature("testing").add_many_to_whitelist([3, u'\u2665'])
+        path = os.path.join(self.directory, 'whitelist.txt')
+        Cli.main(['export', 'testing', 'whitelist', '--output', path, '--quiet'])
+
+        self.assertEqual(self.read_file(path), u'3\n\u2665\n')
+
+    def test_export_redis_sets(self):
+        Feature("testing").use_redis_sets()
+        Feature("testing").add_many_to_blacklist(range(50))
+        path = os.path.join(self.directory, 'blacklist.txt')
+        Cli.main(['export', 'testing', 'blacklist', '--output', path, '--quiet'])
+
+        self.assertEqual(sorted(int(line) for line in self.read_file(path).split()), list(range(50)))
+
+    def test_export_all(self):
+        Feature("a").set_percentage(5)
+        Feature("b").add_to_whitelist(3)
+        path = os.path.join(self.directory, 'features.jsonl')
+        Cli.main(['export-all', '--output', path, '--quiet'])
+
+        lines = [json.loads(line) for line in self.read_file(path).splitlines()]
+        self.assertEqual(sorted(lines, key=lambda line: line['feature']), [
+            {'feature': 'a', 'percentage': 5},
+            {'feature': 'b', 'percentage': 0, 'whitelist': [3]},
+        ])
+
+    def test_progress(self):
+        output = ListStream()
+        clock = iter([0.0, 2.0, 2.0, 2.5, 4.0])
+        progress = Cli.ProgressReporter('Imported', stream=output, clock=lambda: next(clock))
+        progress(100, 10)  # reported, a second has passed
+        progress(200, 20)  # not reported
+        progress.report(300, 30)
+
+        self.assertEqual(output.lines, ['Imported 100 (10 changed) in 2.0s, 50/s\n',
+                                        'Imported 300 (30 changed) in 4.0s, 75/s\n'])
+
+
+class ListStream(object):
+    """ Collects what is written to it. """
+
+    def __init__(self):
+        self.lines = []
+
+    def write(self, text):
+        self.lines.append(text)
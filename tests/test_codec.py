@@ -0,0 +1,46 @@
+from unittest2 import TestCase
+
+from feature_ramp import Codec
+from feature_ramp.Codec import BinaryCodec, JsonCodec
+
+
+class CodecTest(TestCase):
+    """ Tests the formats feature settings are stored in. """
+
+    SETTINGS = [
+        {},
+        {'percentage': 5},
+        {'percentage': 12.5, 'whitelist': [3, 1, 2 ** 40, -5], 'blacklist': ['a', u'\u2665', 'a', '']},
+        {'whitelist': [], 'blacklist': [2 ** 63 - 1, -2 ** 63]},
+        {'whitelist': [1, 'a'], 'blacklist': [1.5, True], 'redis_sets': True,
+         'blacklist_bloom': {'bits': 9586, 'hashes': 7}},
+        {'whitelist': [2 ** 64]},
+    ]
+
+    def test_binary_round_trip(self):
+        for settings in self.SETTINGS:
+            self.assertEqual(BinaryCodec().decode(BinaryCodec().encode(settings)), settings)
+
+    def test_formats_are_detected(self):
+        for settings in self.SETTINGS:
+            self.assertEqual(Codec.decode(BinaryCodec().encode(settings)), settings)
+            self.assertEqual(Codec.decode(JsonCodec().encode(settings)), settings)
+            self.assertEqual(Codec.decode(JsonCodec().encode(settings).encode('utf-8')), settings)
+
+    def test_binary_is_compact(self):
+        settings = {'percentage': 5, 'whitelist': list(range(10 ** 9, 10 ** 9 + 60000, 3))}
+
+        encoded = BinaryCodec().encode(settings)
+        self.assertEqual(len(encoded), 13 + 14 + 2 * 20000 + 1 + 4)  # 2 bytes per id
+        self.assertTrue(len(encoded) * 5 < len(JsonCodec().encode(settings)))
+
+    def test_unknown_binary_version(self):
+        encoded = bytearray(BinaryCodec().encode({'percentage': 5}))
+        encoded[3] = 99
+
+        with self.assertRaises(ValueError):
+            Codec.decode(bytes(encoded))
+
+    def test_strings_containing_nul(self):
+        settings = {'whitelist': ['a\x00b', 'c'], 'blacklist': ['', u'\u2665']}
+        self.assertEqual(Codec.decode(BinaryCodec().encode(settings)), settings)
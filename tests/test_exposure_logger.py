@@ -0,0 +1,162 @@
+import json
+import os
+import shutil
+import tempfile
+
+from unittest2 import TestCase
+
+from feature_ramp import redis
+from feature_ramp.ExposureLogger import ExposureLogger, FileSink, RedisStreamSink
+from feature_ramp.Feature import Feature
+
+
+class ListSink(object):
+    """ Collects the batches written to it. """
+
+    def __init__(self):
+        self.batches = []
+
+    def write(self, exposures):
+        self.batches.append(exposures)
+
+
+class BrokenSink(object):
+    def write(self, exposures):
+        raise IOError("sink is down")
+
+
+class ExposureLoggerTest(TestCase):
+    """ Tests buffering, deduping and sampling exposures. """
+
+    def setUp(self):
+        self.sink = ListSink()
+        self.logger = ExposureLogger(self.sink, batch_size=2, clock=lambda: 1000.0)
+
+    def test_log_and_flush(self):
+        self.assertTrue(self.logger.log("testing", 3, True))
+        self.assertTrue(self.logger.log("testing", 4, False, "group"))
+        self.assertTrue(self.logger.log("other", 3, True))
+
+        self.assertEqual(self.logger.flush(), 3)
+        self.assertEqual([len(batch) for batch in self.sink.batches], [2, 1])
+        self.assertEqual(self.sink.batches[0][1], {'feature': 'testing', 'feature_group': 'group',
+                                                   'identifier': 4, 'visible': False, 'timestamp': 1000.0})
+        self.assertEqual((self.logger.queued, self.logger.written, len(self.logger)), (3, 3, 0))
+
+    def test_repeated_exposures_are_deduped(self):
+        self.logger.log("testing", 3, True)
+        self.assertFalse(self.logger.log("testing", 3, True))
+        self.assertEqual(self.logger.deduped, 1)
+
+    def test_changed_visibility_is_logged_again(self):
+        self.logger.log("testing", 3, False)
+        self.assertTrue(self.logger.log("testing", 3, True))
+        self.assertFalse(self.logger.log("testing", 3, True))
+        self.assertEqual((self.logger.queued, self.logger.deduped), (2, 1))
+
+    def test_dedupe_memory_is_bounded(self):
+        logger = ExposureLogger(self.sink, dedupe_size=2)
+        for identifier in [1, 2, 3, 1]:
+            logger.log("testing", identifier, True)
+
+        self.assertEqual(logger.queued, 4)
+        self.assertTrue(len(logger._seen) <= 2)
+
+    def test_sampling(self):
+        logger = ExposureLogger(self.sink, sample_rate=0)
+        self.assertFalse(logger.log("testing", 3, True))
+        self.assertEqual(logger.sampled_out, 1)
+
+        logger = ExposureLogger(self.sink, sample_rate=0.5)
+        for identifier in range(1000):
+            logger.log("testing", identifier, True)
+        self.assertTrue(350 < logger.queued < 650)
+
+    def test_invalid_sample_rate(self):
+        with self.assertRaises(ValueError):
+            ExposureLogger(self.sink, sample_rate=2)
+
+    def test_full_queue_drops_exposures(self):
+        """ Tests that a backed up sink never makes logging wait. """
+
+        logger = ExposureLogger(self.sink, max_queue_size=2)
+        for identifier in range(5):
+            logger.log("testing", identifier, True)
+
+        self.assertEqual((logger.queued, logger.dropped, len(logger)), (2, 3, 2))
+
+    def test_failed_writes_are_counted(self):
+        logger = ExposureLogger(BrokenSink())
+        logger.log("testing", 3, True)
+
+        self.assertEqual(logger.flush(), 0)
+        self.assertEqual((logger.failed, len(logger)), (1, 0))
+
+    def test_background_flush(self):
+        logger = ExposureLogger(self.sink, flush_interval=0.01)
+        logger.start()
+        logger.log("testing", 3, True)
+        logger.stop(timeout=5)
+
+        self.assertFalse(logger.is_alive())
+        self.assertEqual(logger.written, 1)
+
+
+class ExposureSinkTest(TestCase):
+    """ Tests writing exposures to Redis streams and files. """
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.exposures = [
+            {'feature': 'testing', 'feature_group': None, 'identifier': 3, 'visible': True, 'timestamp': 1000.5},
+            {'feature': 'testing', 'feature_group': 'group', 'identifier': u'\u2665', 'visible': False,
+             'timestamp': 1001.0},
+        ]
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+        redis.delete('feature.exposures')
+
+    def test_redis_stream_sink(self):
+        RedisStreamSink().write(self.exposures)
+
+        entries = [fields for _, fields in redis.xrange('feature.exposures')]
+        self.assertEqual(entries, [
+            {b'feature': b'testing', b'feature_group': b'', b'identifier': b'3', b'visible': b'1',
+             b'timestamp': b'1000.5'},
+            {b'feature': b'testing', b'feature_group': b'group', b'identifier': u'\u2665'.encode('utf-8'),
+             b'visible': b'0', b'timestamp': b'1001.0'},
+        ])
+
+    def test_file_sink(self):
+        path = os.path.join(self.directory, 'exposures.log')
+        FileSink(path).write(self.exposures[:1])
+        FileSink(path).write(self.exposures[1:])
+
+        with open(path) as exposure_file:
+            self.assertEqual([json.loads(line) for line in exposure_file], self.exposures)
+
+
+class FeatureExposureTest(TestCase):
+    """ Tests that is_visible() reports its decisions to Feature.exposure_logger. """
+
+    def setUp(self):
+        self.sink = ListSink()
+        Feature.exposure_logger = ExposureLogger(self.sink)
+
+    def tearDown(self):
+        Feature.exposure_logger = None
+        for feature in Feature.all_features():
+            Feature(feature).delete()
+
+    def test_is_visible_logs_exposures(self):
+        feature = Feature("testing", "group")
+        feature.add_to_whitelist(3)
+        feature.is_visible(3)
+        feature.is_visible(4)
+        feature.is_visible(3)
+
+        Feature.exposure_logger.flush()
+        self.assertEqual([(exposure['feature'], exposure['feature_group'], exposure['identifier'],
+                           exposure['visible']) for exposure in self.sink.batches[0]],
+                         [('testing', 'group', 3, True), ('testing', 'group', 4, False)])
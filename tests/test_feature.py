@@ -1,10 +1,14 @@
 import itertools
 import string
+import time
 
 from unittest2 import TestCase
 
+import feature_ramp
 from feature_ramp import redis
-from feature_ramp.Feature import Feature
+from feature_ramp.Backend import WatchError
+from feature_ramp.Feature import Feature, _UPDATE_SCRIPT
+from feature_ramp.Instrumentation import MetricsAggregator
 
 
 class FeatureTest(TestCase):
@@ -14,6 +18,7 @@ class FeatureTest(TestCase):
         self.feature_test = Feature("testing")
 
     def tearDown(self):
+        Feature.instrumentation = None
         for feature in Feature.all_features():
             Feature(feature).delete()
 
@@ -104,6 +109,39 @@ class FeatureTest(TestCase):
         self.assertTrue('blacklist' in all_features['looktest4'])
         self.assertEqual(all_features['looktest4']['blacklist'], [4])
 
+    def test_all_features_with_data_is_chunked(self):
+        """ Tests that all_features loads data with one MGET per chunk instead of a GET per feature. """
+        for i in range(7):
+            Feature('looktest{0}'.format(i)).set_percentage(i)
+
+        chunk_size, Feature.LOAD_CHUNK_SIZE = Feature.LOAD_CHUNK_SIZE, 3
+        redis.config_resetstat()
+        try:
+            all_features = Feature.all_features(include_data=True)
+        finally:
+            Feature.LOAD_CHUNK_SIZE = chunk_size
+        stats = redis.info('commandstats')
+
+        self.assertEqual(stats['cmdstat_mget']['calls'], 3)
+        self.assertFalse('cmdstat_get' in stats)
+        for i in range(7):
+            self.assertEqual(all_features['looktest{0}'.format(i)], {'percentage': i})
+
+    def test_iter_features(self):
+        """ Tests that iter_features yields the same features as all_features. """
+        Feature('looktest1').set_percentage(5)
+        Feature('looktest2').add_to_whitelist(3)
+
+        chunk_size, Feature.LOAD_CHUNK_SIZE = Feature.LOAD_CHUNK_SIZE, 1
+        try:
+            names = sorted(Feature.iter_features())
+            with_data = dict(Feature.iter_features(include_data=True))
+        finally:
+            Feature.LOAD_CHUNK_SIZE = chunk_size
+
+        self.assertEqual(names, ['looktest1', 'looktest2'])
+        self.assertEqual(with_data, Feature.all_features(include_data=True))
+
     def test_set_add(self):
         """ Tests that creating a feature stores its key in a Redis set. """
 
@@ -198,6 +236,424 @@ class FeatureTest(TestCase):
         self.feature_test.remove_from_blacklist(email)
         self.assertFalse(email in Feature("testing").blacklist)
 
+    def test_whitelist_assignment_updates_membership(self):
+        """ Tests that assigning a new whitelist or blacklist is reflected by membership checks. """
+        self.feature_test.whitelist = [3, 4]
+        self.feature_test.blacklist = [5]
+
+        self.assertTrue(self.feature_test.is_whitelisted(4))
+        self.assertTrue(self.feature_test.is_blacklisted(5))
+        self.assertFalse(self.feature_test.is_blacklisted(3))
+
+    def test_add_duplicate_to_whitelist(self):
+        """ Tests that whitelisting an identifier twice stores it once. """
+        self.feature_test.add_to_whitelist(3)
+        self.feature_test.add_to_whitelist(3)
+
+        self.assertEqual(self.feature_test.whitelist, [3])
+        self.assertEqual(Feature("testing").whitelist, [3])
+
+    def test_remove_missing_from_whitelist(self):
+        with self.assertRaises(ValueError):
+            self.feature_test.remove_from_whitelist(3)
+
+    def test_concurrent_whitelist_changes_are_kept(self):
+        """ Tests that updates through stale objects do not overwrite each other. """
+        first = Feature("testing")
+        second = Feature("testing")
+
+        first.add_to_whitelist(3)
+        second.add_to_whitelist(4)
+        second.add_to_blacklist(5)
+        first.set_percentage(20)
+
+        generated = Feature("testing")
+        self.assertEqual(generated.whitelist, [3, 4])
+        self.assertEqual(generated.blacklist, [5])
+        self.assertEqual(generated.percentage, 20)
+
+    def test_list_changes_are_not_scripted(self):
+        """ Tests that list changes are made outside Redis, and that large settings
+        are updated correctly when the update script declines them.
+        """
+        scripts = []
+        register_script = feature_ramp.backend.register_script
+        feature_ramp.backend.register_script = lambda script: scripts.append(script) or register_script(script)
+        try:
+            self.feature_test.add_many_to_whitelist(range(5000))
+            self.feature_test.remove_from_whitelist(3)
+            self.feature_test.add_to_blacklist(5001)
+            self.assertFalse(_UPDATE_SCRIPT in scripts)
+
+            self.feature_test.set_percentage(5)
+            self.assertTrue(_UPDATE_SCRIPT in scripts)
+        finally:
+            del feature_ramp.backend.register_script
+
+        generated = Feature("testing")
+        self.assertEqual(len(generated.whitelist), 4999)
+        self.assertEqual(generated.blacklist, [5001])
+        self.assertEqual(generated.percentage, 5)
+
+    def test_first_change_keeps_default_percentage(self):
+        """ Tests that the first change to a feature never saved stores its whole settings. """
+        now = time.time()
+        changes = [
+            lambda feature: feature.add_to_whitelist(1),
+            lambda feature: feature.set_rules([{'attribute': 'region', 'operator': 'in', 'values': ['CA']}]),
+            lambda feature: feature.set_schedule(now + 1000, now + 2000, 10, 20),
+        ]
+        for index, change in enumerate(changes):
+            name = "unsaved{0}".format(index)
+            change(Feature(name, default_percentage=100))
+            stored = Feature._deserialize(redis.get(Feature._get_redis_key_for_feature(name)))
+            self.assertEqual(stored['percentage'], 100)
+
+        self.assertEqual(Feature("unsaved0").percentage, 100)
+        self.assertEqual(Feature("unsaved1").percentage, 100)
+
+        self.assertEqual(Feature("unsaved0").whitelist, [1])
+        self.assertTrue(Feature("unsaved1").rules)
+        self.assertTrue(Feature("unsaved2").schedule is not None)
+
+    def test_transaction_attempts_are_bounded(self):
+        """ Tests that a change gives up once the settings keep changing under it. """
+        self.feature_test.add_to_whitelist(3)
+        key = self.feature_test._get_redis_key()
+        attempts = []
+
+        def change_concurrently(feature, redis_raw):
+            attempts.append(redis_raw)
+            redis.set(key, redis_raw)  # touches the watched key
+            return get_settings_to_update(feature, redis_raw)
+
+        get_settings_to_update = Feature.__dict__['_get_settings_to_update']
+        Feature._get_settings_to_update = change_concurrently
+        max_attempts, Feature.TRANSACTION_MAX_ATTEMPTS = Feature.TRANSACTION_MAX_ATTEMPTS, 3
+        try:
+            with self.assertRaises(WatchError):
+                self.feature_test.add_to_whitelist(4)
+        finally:
+            Feature._get_settings_to_update = get_settings_to_update
+            Feature.TRANSACTION_MAX_ATTEMPTS = max_attempts
+
+        self.assertEqual(len(attempts), 3)
+        self.assertEqual(Feature("testing").whitelist, [3])
+
+    def test_add_many_to_whitelist(self):
+        self.feature_test.add_to_whitelist(3)
+
+        added = self.feature_test.add_many_to_whitelist([3, 4, 'example@example.com', 4])
+        self.assertEqual(added, 2)
+        self.assertEqual(self.feature_test.whitelist, [3, 4, 'example@example.com'])
+        self.assertEqual(Feature("testing").whitelist, [3, 4, 'example@example.com'])
+
+    def test_remove_many_from_blacklist(self):
+        self.feature_test.add_many_to_blacklist([3, 4, 5])
+
+        removed = self.feature_test.remove_many_from_blacklist([3, 5, 6])
+        self.assertEqual(removed, 2)
+        self.assertEqual(self.feature_test.blacklist, [4])
+        self.assertEqual(Feature("testing").blacklist, [4])
+
+    def test_emptied_list_is_stored_as_empty(self):
+        """ Tests that removing the last identifier leaves an empty list, not an object. """
+        self.feature_test.add_to_whitelist(3)
+        self.feature_test.remove_from_whitelist(3)
+
+        self.assertEqual(Feature("testing").whitelist, [])
+        self.assertEqual(Feature.all_features(include_data=True)['testing'], {'percentage': 0})
+
+    def test_large_identifiers_keep_their_precision(self):
+        """ Tests that identifiers too large for the Lua update script are still stored exactly. """
+        large = 2 ** 60 + 1
+        self.feature_test.add_to_whitelist(3)
+        self.feature_test.add_to_whitelist(large)
+        self.feature_test.add_to_whitelist(4)
+        self.feature_test.set_percentage(5)
+
+        generated = Feature("testing")
+        self.assertEqual(generated.whitelist, [3, large, 4])
+        self.assertEqual(generated.percentage, 5)
+
+    def test_redis_sets_add_many(self):
+        self.feature_test.use_redis_sets()
+
+        self.assertEqual(self.feature_test.add_many_to_whitelist([3, 4, 4]), 2)
+        self.assertEqual(self.feature_test.remove_many_from_whitelist([3, 5]), 1)
+        self.assertEqual(Feature("testing").whitelist, ['4'])
+
+    def test_use_redis_sets(self):
+        """ Tests that use_redis_sets moves the lists into native Redis sets. """
+        self.feature_test.set_percentage(5)
+        self.feature_test.add_to_whitelist(3)
+        self.feature_test.add_to_blacklist('example@example.com')
+        self.feature_test.use_redis_sets()
+
+        key = self.feature_test._get_redis_key()
+        self.assertEqual(Feature._deserialize(redis.get(key)), {'redis_sets': True, 'percentage': 5})
+        self.assertTrue(redis.sismember(key + '.whitelist', 3))
+        self.assertTrue(redis.sismember(key + '.blacklist', 'example@example.com'))
+
+        generated = Feature("testing")
+        self.assertTrue(generated.uses_redis_sets)
+        self.assertEqual(generated.percentage, 5)
+        self.assertTrue(generated.is_whitelisted(3))
+        self.assertTrue(generated.is_blacklisted('example@example.com'))
+        self.assertFalse(generated.is_visible('example@example.com'))
+        self.assertEqual(generated.whitelist, ['3'])
+
+    def test_redis_sets_are_not_downloaded_on_construction(self):
+        self.feature_test.add_to_whitelist(3)
+        self.feature_test.use_redis_sets()
+
+        redis.config_resetstat()
+        self.assertTrue(Feature("testing").is_visible(3))
+        stats = redis.info('commandstats')
+
+        self.assertFalse('cmdstat_smembers' in stats)
+        self.assertEqual(stats['cmdstat_sismember']['calls'], 1)
+
+    def test_redis_sets_add_and_remove(self):
+        self.feature_test.use_redis_sets()
+        self.feature_test.add_to_whitelist(3)
+        self.feature_test.add_to_blacklist(4)
+        self.assertTrue(Feature("testing").is_whitelisted(3))
+        self.assertTrue(Feature("testing").is_blacklisted(4))
+
+        self.feature_test.remove_from_whitelist(3)
+        self.feature_test.remove_from_blacklist(4)
+        self.assertFalse(Feature("testing").is_whitelisted(3))
+        self.assertFalse(Feature("testing").is_blacklisted(4))
+
+    def test_redis_sets_visible_mask(self):
+        self.feature_test.set_percentage(30)
+        self.feature_test.use_redis_sets()
+        self.feature_test.add_to_whitelist(3)
+        self.feature_test.add_to_blacklist(4)
+        identifiers = range(1, 2001)
+
+        expected = [self.feature_test.is_visible(identifier) for identifier in identifiers]
+        self.assertEqual(self.feature_test.visible_mask(identifiers), expected)
+
+    def test_redis_sets_reset_and_delete(self):
+        self.feature_test.use_redis_sets()
+        self.feature_test.add_to_whitelist(3)
+        key = self.feature_test._get_redis_key()
+
+        self.feature_test.reset_settings()
+        self.assertFalse(redis.exists(key + '.whitelist'))
+        self.assertFalse(Feature("testing").is_whitelisted(3))
+
+        self.feature_test.add_to_whitelist(3)
+        self.feature_test.delete()
+        self.assertFalse(redis.exists(key + '.whitelist'))
+
+    def test_import_many(self):
+        """ Tests that bulk imports stream identifiers into Redis sets in batches. """
+
+        with self.assertRaises(ValueError):
+            self.feature_test.import_many('whitelist', [3])
+
+        self.feature_test.use_redis_sets()
+        counts = []
+        result = self.feature_test.import_many('whitelist', iter([1, 2, 2, '3', 1]), batch_size=3,
+                                               progress=lambda read, changed: counts.append((read, changed)))
+        self.assertEqual((result, counts), ((5, 3), [(3, 2), (5, 3)]))
+        self.assertEqual(self.feature_test.import_many('whitelist', ['1', 4], remove=True), (2, 1))
+        self.assertEqual(sorted(Feature("testing").iter_list('whitelist', batch_size=1)), ['2', '3'])
+
+    def test_iter_list(self):
+        self.feature_test.add_many_to_blacklist([4, 'example@example.com'])
+
+        self.assertEqual(list(self.feature_test.iter_list('blacklist')), [4, 'example@example.com'])
+        self.assertEqual(list(self.feature_test.iter_list('whitelist')), [])
+
+    def test_use_blacklist_bloom_filter(self):
+        """ Tests that use_blacklist_bloom_filter moves the blacklist into a bitmap. """
+
+        self.feature_test.add_many_to_blacklist([3, 'example@example.com'])
+        self.feature_test.use_blacklist_bloom_filter(1000, error_rate=0.01)
+        key = self.feature_test._get_redis_key()
+
+        self.assertEqual(Feature._deserialize(redis.get(key)), {
+            'whitelist': [], 'blacklist': [], 'percentage': 0,
+            'blacklist_bloom': {'bits': 9586, 'hashes': 7},
+        })
+        self.assertEqual(len(redis.get(key + '.blacklist_bloom')), 1199)
+
+        generated = Feature("testing")
+        self.assertTrue(generated.is_blacklisted(3))
+        self.assertTrue(generated.is_blacklisted('example@example.com'))
+        self.assertTrue(generated._blacklist_bloom_filter is None)  # checked with GETBIT
+
+    def test_blacklist_bloom_filter_add(self):
+        self.feature_test.use_blacklist_bloom_filter(1000, error_rate=0.01)
+        self.assertEqual(self.feature_test.add_many_to_blacklist(range(100)), 100)
+        self.assertEqual(self.feature_test.add_many_to_blacklist([5, 100]), 1)
+        self.feature_test.set_percentage(100)
+
+        generated = Feature("testing")
+        self.assertEqual(generated.blacklist, [])
+        self.assertFalse(any(generated.is_visible(identifier) for identifier in range(101)))
+        self.assertTrue(99 in generated.blacklist_bloom_filter)
+
+        false_positives = [identifier for identifier in range(1000, 11000) if generated.is_blacklisted(identifier)]
+        self.assertTrue(len(false_positives) < 50, false_positives)
+
+    def test_blacklist_bloom_filter_never_wrongly_includes(self):
+        """ Tests that whitelisting still overrides, and that ids cannot be removed. """
+
+        self.feature_test.use_blacklist_bloom_filter(10, error_rate=0.5)
+        self.feature_test.add_many_to_blacklist(range(100))
+        self.feature_test.add_to_whitelist(3)
+        self.feature_test.activate()
+
+        with self.assertRaises(ValueError):
+            self.feature_test.remove_from_blacklist(4)
+
+        generated = Feature("testing")
+        self.assertTrue(generated.is_visible(3))
+        self.assertFalse(generated.is_visible(4))
+
+    def test_blacklist_bloom_filter_visible_mask(self):
+        self.feature_test.set_percentage(30)
+        self.feature_test.use_blacklist_bloom_filter(100, error_rate=0.01)
+        self.feature_test.add_many_to_blacklist(range(0, 2000, 20))
+        self.feature_test.add_to_whitelist(20)
+        identifiers = range(1, 2001)
+
+        generated = Feature("testing")
+        expected = [generated.is_visible(identifier) for identifier in identifiers]
+        self.assertEqual(generated.visible_mask(identifiers), expected)
+
+    def test_blacklist_bloom_filter_with_redis_sets(self):
+        self.feature_test.add_to_blacklist(3)
+        self.feature_test.use_redis_sets()
+        self.feature_test.use_blacklist_bloom_filter(1000)
+        self.feature_test.add_to_blacklist(4)
+        key = self.feature_test._get_redis_key()
+
+        self.assertFalse(redis.exists(key + '.blacklist'))
+        generated = Feature("testing")
+        self.assertTrue(generated.is_blacklisted(3))
+        self.assertTrue(generated.is_blacklisted('4'))
+
+    def test_blacklist_bloom_filter_reset_and_delete(self):
+        self.feature_test.use_blacklist_bloom_filter(1000)
+        self.feature_test.add_to_blacklist(3)
+        key = self.feature_test._get_redis_key()
+
+        self.feature_test.reset_settings()
+        self.assertFalse(redis.exists(key + '.blacklist_bloom'))
+        self.assertFalse(Feature("testing").is_blacklisted(3))
+
+        self.feature_test.use_blacklist_bloom_filter(1000)
+        self.feature_test.delete()
+        self.assertFalse(redis.exists(key + '.blacklist_bloom'))
+
+    def test_set_rules(self):
+        rules = [{'attribute': 'platform', 'operator': 'eq', 'value': 'ios'},
+                 {'attribute': 'region', 'operator': 'in', 'values': ['CA', 'NY']}]
+        self.feature_test.set_percentage(100)
+        self.feature_test.set_rules(rules)
+
+        generated = Feature("testing")
+        self.assertEqual(generated.rules, rules)
+        self.assertTrue(generated.is_visible(3, attributes={'platform': 'ios', 'region': 'CA'}))
+        self.assertFalse(generated.is_visible(3, attributes={'platform': 'ios', 'region': 'TX'}))
+        self.assertFalse(generated.is_visible(3))
+        self.assertEqual(Feature.all_features(include_data=True)['testing'], {'percentage': 100, 'rules': rules})
+
+    def test_set_rules_keeps_ramp_and_lists(self):
+        """ Tests that targeted identifiers are still ramped, and whitelisted and
+        blacklisted identifiers are not subject to the rules.
+        """
+
+        self.feature_test.set_percentage(0)
+        self.feature_test.add_to_whitelist(3)
+        self.feature_test.set_rules([{'attribute': 'age', 'operator': 'range', 'min': 18}])
+
+        generated = Feature("testing")
+        self.assertTrue(generated.is_visible(3))
+        self.assertFalse(generated.is_visible(4, attributes={'age': 30}))
+
+        self.feature_test.set_percentage(100)
+        self.feature_test.add_to_blacklist(5)
+        generated = Feature("testing")
+        self.assertTrue(generated.is_visible(4, attributes={'age': 30}))
+        self.assertFalse(generated.is_visible(5, attributes={'age': 30}))
+
+    def test_remove_rules(self):
+        self.feature_test.activate()
+        self.feature_test.set_rules([{'attribute': 'platform', 'operator': 'eq', 'value': 'ios'}])
+        self.feature_test.set_rules([])
+
+        self.assertTrue(Feature("testing").is_visible(3))
+        self.assertEqual(Feature("testing").rules, [])
+
+    def test_set_schedule(self):
+        now = time.time()
+        self.feature_test.set_percentage(5)
+        self.feature_test.set_schedule(now - 1000, now + 1000, 0, 100, step=10)
+
+        generated = Feature("testing")
+        self.assertEqual(generated.percentage, 50)
+        self.assertTrue(generated.is_active)
+        visible = [generated.is_visible(identifier) for identifier in range(100)]
+        self.assertEqual(visible, [Feature.bucketer.ranking(generated._ramp_offset, identifier) < 50
+                                   for identifier in range(100)])
+        self.assertEqual(generated.visible_mask(range(100)), visible)
+        self.assertEqual(Feature.all_features(include_data=True)['testing'],
+                         {'percentage': 5, 'schedule': generated.schedule.to_dict()})
+
+    def test_schedule_before_start_and_after_end(self):
+        now = time.time()
+        self.feature_test.set_schedule(now + 1000, now + 2000, 10, 100)
+        self.assertEqual(Feature("testing").percentage, 10)
+
+        self.feature_test.set_schedule(now - 2000, now - 1000, 10, 30)
+        self.assertEqual(Feature("testing").percentage, 30)
+
+    def test_set_percentage_removes_schedule(self):
+        now = time.time()
+        self.feature_test.set_schedule(now - 1000, now + 1000, 0, 100)
+        Feature("testing").deactivate()
+
+        generated = Feature("testing")
+        self.assertTrue(generated.schedule is None)
+        self.assertEqual(generated.percentage, 0)
+        self.assertEqual(Feature.all_features(include_data=True)['testing'], {'percentage': 0})
+
+    def test_reset_settings_removes_schedule(self):
+        now = time.time()
+        self.feature_test.set_schedule(now - 1000, now + 1000, 0, 100)
+        self.feature_test.reset_settings()
+        self.assertTrue(Feature("testing").schedule is None)
+
+    def test_invalid_schedule_is_not_saved(self):
+        with self.assertRaises(ValueError):
+            self.feature_test.set_schedule(2000, 1000, 0, 100)
+        self.assertTrue(Feature("testing").schedule is None)
+
+    def test_invalid_rules_are_not_saved(self):
+        with self.assertRaises(ValueError):
+            self.feature_test.set_rules([{'attribute': 'platform', 'operator': 'like', 'value': 'ios'}])
+        self.assertEqual(Feature("testing").rules, [])
+
+    def test_rules_visible_mask(self):
+        self.feature_test.set_percentage(50)
+        self.feature_test.add_to_whitelist(0)
+        self.feature_test.set_rules([{'attribute': 'platform', 'operator': 'eq', 'value': 'ios'}])
+
+        identifiers = list(range(200))
+        attributes = [{'platform': 'ios' if identifier % 2 else 'android'} for identifier in identifiers]
+        generated = Feature("testing")
+        self.assertEqual(generated.visible_mask(identifiers, attributes),
+                         [generated.is_visible(identifier, identifier_attributes)
+                          for identifier, identifier_attributes in zip(identifiers, attributes)])
+        self.assertEqual(generated.filter_visible(identifiers), [0])
+
     def test_active_off(self):
         """ Tests calling is_active is correct when off. """
 
@@ -291,6 +747,140 @@ class FeatureTest(TestCase):
         actual_percentage = visibility_count / float(total_number)
         self.assertAlmostEqual(actual_percentage, expected_percentage, delta=.012)
 
+    def test_visible_mask_matches_is_visible(self):
+        """ Tests that visible_mask gives the same results as is_visible. """
+        self.feature_test.add_to_whitelist(3)
+        self.feature_test.add_to_whitelist('example@example.com')
+        self.feature_test.add_to_blacklist(3)
+        self.feature_test.add_to_blacklist(4)
+        identifiers = list(range(1, 5001)) + ['example@example.com', u'\u2665@example.com']
+
+        for percentage in [0, 37, 100]:
+            self.feature_test.set_percentage(percentage)
+            expected = [self.feature_test.is_visible(identifier) for identifier in identifiers]
+            self.assertEqual(self.feature_test.visible_mask(identifiers), expected)
+
+    def test_visible_mask_with_group(self):
+        """ Tests that visible_mask respects the feature group offset. """
+        feature = Feature('feature_one', feature_group_name='test_group')
+        feature.set_percentage(10)
+        identifiers = range(1, 5001)
+
+        expected = [feature.is_visible(identifier) for identifier in identifiers]
+        self.assertEqual(feature.visible_mask(identifiers), expected)
+
+    def test_visible_mask_with_generator(self):
+        self.feature_test.set_percentage(50)
+        expected = [self.feature_test.is_visible(identifier) for identifier in range(100)]
+        self.assertEqual(self.feature_test.visible_mask(i for i in range(100)), expected)
+
+    def test_filter_visible(self):
+        self.feature_test.set_percentage(20)
+        self.feature_test.add_to_whitelist(7)
+        identifiers = range(1, 1001)
+
+        expected = [identifier for identifier in identifiers
+                    if self.feature_test.is_visible(identifier)]
+        self.assertEqual(self.feature_test.filter_visible(identifiers), expected)
+        self.assertTrue(7 in self.feature_test.filter_visible(identifiers))
+
+    def test_filter_visible_with_numpy_array(self):
+        numpy = self._import_numpy()
+        self.feature_test.set_percentage(20)
+        identifiers = numpy.arange(1, 1001)
+
+        expected = [identifier for identifier in range(1, 1001)
+                    if self.feature_test.is_visible(identifier)]
+        mask = self.feature_test.visible_mask(identifiers)
+        self.assertEqual(mask.dtype, numpy.bool_)
+        self.assertEqual(self.feature_test.filter_visible(identifiers).tolist(), expected)
+
+    def test_visible_mask_with_integer_array(self):
+        """ Tests that the vectorized evaluation of integer arrays matches is_visible. """
+        numpy = self._import_numpy()
+        self.feature_test.add_many_to_whitelist([3, 2 ** 40, 'example@example.com'])
+        self.feature_test.add_many_to_blacklist([3, 4, -7, '5'])
+        identifiers = list(range(-500, 3000)) + [2 ** 40, -2 ** 63, 2 ** 63 - 1]
+
+        for percentage in [0, 37, 100]:
+            self.feature_test.set_percentage(percentage)
+            expected = [self.feature_test.is_visible(identifier) for identifier in identifiers]
+            self.assertEqual(self.feature_test.visible_mask(numpy.array(identifiers)).tolist(), expected)
+            self.assertEqual(self.feature_test.visible_mask(numpy.array(identifiers[:600], dtype=numpy.int16)).tolist(),
+                             expected[:600])
+
+        # decision paths are reported as is_visible() reports them
+        Feature.instrumentation = MetricsAggregator()
+        self.feature_test.visible_mask(numpy.array(identifiers))
+        evaluations = Feature.instrumentation.evaluations
+        Feature.instrumentation = MetricsAggregator()
+        for identifier in identifiers:
+            self.feature_test.is_visible(identifier)
+        self.assertEqual(evaluations, Feature.instrumentation.evaluations)
+
+    def test_visible_mask_with_integer_array_and_rules(self):
+        numpy = self._import_numpy()
+        self.feature_test.set_rules([{'attribute': 'platform', 'operator': 'eq', 'value': 'ios'}])
+        self.feature_test.set_percentage(50)
+        self.feature_test.add_to_whitelist(1)
+        identifiers = list(range(200))
+        attributes = [{'platform': 'ios' if identifier % 3 else 'android'} for identifier in identifiers]
+
+        expected = [self.feature_test.is_visible(identifier, attributes=identifier_attributes)
+                    for identifier, identifier_attributes in zip(identifiers, attributes)]
+        self.assertEqual(self.feature_test.visible_mask(numpy.array(identifiers), attributes).tolist(), expected)
+
+    def _import_numpy(self):
+        try:
+            import numpy
+        except ImportError:
+            self.skipTest("numpy is not installed")
+        return numpy
+
+    def test_evaluate_all(self):
+        """ Tests that evaluate_all matches is_visible for every active feature. """
+        Feature('looktest1').set_percentage(50)
+        Feature('looktest2').activate()
+        Feature('looktest2').add_to_blacklist(3)
+        Feature('looktest3').add_to_whitelist(3)
+
+        for identifier in range(1, 101):
+            expected = dict((name, Feature(name).is_visible(identifier))
+                            for name in ['looktest1', 'looktest2', 'looktest3'])
+            self.assertEqual(Feature.evaluate_all(identifier), expected)
+
+    def test_evaluate_all_with_names(self):
+        """ Tests that evaluate_all only evaluates the given names, including unknown ones. """
+        Feature('looktest1').activate()
+        Feature('looktest2').activate()
+
+        visibility = Feature.evaluate_all(3, names=['looktest1', 'missing'],
+                                          default_percentage=0)
+        self.assertEqual(visibility, {'looktest1': True, 'missing': False})
+
+    def test_evaluate_all_with_groups(self):
+        Feature('feature_one', feature_group_name='test_group').set_percentage(10)
+        groups = {'feature_one': 'test_group'}
+
+        for identifier in range(1, 1001):
+            expected = Feature('feature_one', feature_group_name='test_group').is_visible(identifier)
+            visibility = Feature.evaluate_all(identifier, names=['feature_one'],
+                                              feature_group_names=groups)
+            self.assertEqual(visibility['feature_one'], expected)
+
+    def test_evaluate_all_uses_one_round_trip(self):
+        """ Tests that evaluate_all fetches every feature with a single MGET. """
+        names = ['looktest{0}'.format(i) for i in range(30)]
+        for name in names:
+            Feature(name).activate()
+
+        redis.config_resetstat()
+        Feature.evaluate_all(3, names=names)
+        stats = redis.info('commandstats')
+
+        self.assertEqual(stats['cmdstat_mget']['calls'], 1)
+        self.assertFalse('cmdstat_get' in stats)
+
     def test_is_ramped_using_int(self):
         """Tests that _is_ramped accepts integers as identifer."""
         self.feature_test.set_percentage(100)
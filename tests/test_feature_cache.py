@@ -0,0 +1,169 @@
+from unittest2 import TestCase
+
+import feature_ramp
+from fake_clock import FakeClock
+from feature_ramp import redis
+from feature_ramp.Feature import Feature
+from feature_ramp.FeatureCache import FeatureCache
+
+
+class FeatureCacheTest(TestCase):
+    """ Tests the in-process LRU/TTL cache of feature settings. """
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.cache = FeatureCache(max_size=2, ttl=10, clock=self.clock)
+
+    def test_get_missing(self):
+        self.assertTrue(self.cache.get('feature.1.testing') is None)
+
+    def test_set_and_get(self):
+        self.cache.set('feature.1.testing', {'percentage': 5})
+        self.assertEqual(self.cache.get('feature.1.testing'), {'percentage': 5})
+
+    def test_entries_expire(self):
+        """ Tests that entries are not returned after the ttl has passed. """
+
+        self.cache.set('feature.1.testing', {'percentage': 5})
+        self.clock.now += 10
+        self.assertTrue(self.cache.get('feature.1.testing') is None)
+
+    def test_least_recently_used_is_evicted(self):
+        self.cache.set('feature.1.a', {})
+        self.cache.set('feature.1.b', {})
+        self.cache.get('feature.1.a')
+        self.cache.set('feature.1.c', {})
+
+        self.assertEqual(len(self.cache), 2)
+        self.assertTrue('feature.1.a' in self.cache)
+        self.assertFalse('feature.1.b' in self.cache)
+        self.assertTrue('feature.1.c' in self.cache)
+
+    def test_invalidate(self):
+        self.cache.set('feature.1.a', {})
+        self.cache.set('feature.1.b', {})
+
+        self.cache.invalidate('feature.1.a')
+        self.assertFalse('feature.1.a' in self.cache)
+        self.assertTrue('feature.1.b' in self.cache)
+
+        self.cache.invalidate()
+        self.assertEqual(len(self.cache), 0)
+
+    def test_set_after_invalidation_is_dropped(self):
+        """ Tests that settings read before the key was invalidated are not cached. """
+
+        generation = self.cache.generation()
+        self.cache.invalidate('feature.1.testing')
+        self.assertFalse(self.cache.set('feature.1.testing', {'percentage': 5}, generation))
+        self.assertFalse('feature.1.testing' in self.cache)
+
+        self.assertTrue(self.cache.set('feature.1.other', {'percentage': 5}, generation))
+        self.assertTrue(self.cache.set('feature.1.testing', {'percentage': 10}, self.cache.generation()))
+        self.assertEqual(self.cache.get('feature.1.testing'), {'percentage': 10})
+
+    def test_forgotten_invalidations_drop_older_reads(self):
+        generation = self.cache.generation()
+        for name in ['a', 'b', 'c']:
+            self.cache.invalidate('feature.1.' + name)
+
+        self.assertFalse(self.cache.set('feature.1.a', {}, generation))
+        self.assertFalse(self.cache.set('feature.1.d', {}, generation))
+        self.assertTrue(self.cache.set('feature.1.d', {}, self.cache.generation()))
+
+    def test_returns_frozen_settings(self):
+        """ Tests that hits share read-only settings that the caller's lists cannot change. """
+
+        whitelist = [3]
+        self.cache.set('feature.1.testing', {'whitelist': whitelist})
+        whitelist.append(4)
+
+        settings = self.cache.get('feature.1.testing')
+        self.assertIs(self.cache.get('feature.1.testing'), settings)
+        self.assertEqual(settings, {'whitelist': (3,)})
+        self.assertEqual(settings.member_sets['whitelist'], frozenset([3]))
+        with self.assertRaises(TypeError):
+            settings['whitelist'] = [5]
+
+    def test_invalid_max_size(self):
+        with self.assertRaises(ValueError):
+            FeatureCache(max_size=0)
+
+
+class FeatureWithCacheTest(TestCase):
+    """ Tests that Feature reads through and writes through the cache. """
+
+    def setUp(self):
+        Feature.cache = FeatureCache(max_size=100, ttl=60)
+
+    def tearDown(self):
+        Feature.cache = None
+        for feature in Feature.all_features():
+            Feature(feature).delete()
+
+    def test_features_share_cached_member_sets(self):
+        """ Tests that features loaded from the cache share its member sets, and that
+        changing one feature's whitelist does not change the cache or other features.
+        """
+
+        Feature("testing").add_many_to_whitelist([3, 4])
+        first = Feature("testing")
+        second = Feature("testing")
+        self.assertIs(first._whitelist_set, second._whitelist_set)
+
+        first._add_locally('whitelist', [5])
+        self.assertEqual(first.whitelist, [3, 4, 5])
+        self.assertEqual(second.whitelist, [3, 4])
+        self.assertEqual(Feature("testing").whitelist, [3, 4])
+        self.assertTrue(first.is_visible(5))
+        self.assertFalse(second.is_visible(5))
+
+    def test_construction_uses_cache(self):
+        """ Tests that a cached feature is not read from Redis again. """
+
+        Feature("testing").set_percentage(5)
+        redis.set(Feature("testing")._get_redis_key(), '{"percentage": 50}')
+
+        self.assertEqual(Feature("testing").percentage, 5)
+
+    def test_save_updates_cache(self):
+        Feature("testing").percentage  # populates the cache
+        Feature("testing").add_to_whitelist(3)
+
+        self.assertEqual(Feature("testing").whitelist, [3])
+
+    def test_delete_updates_cache(self):
+        Feature("testing").set_percentage(5)
+        Feature("testing").delete()
+
+        self.assertEqual(Feature("testing").percentage, 0)
+
+    def test_stale_read_is_not_cached(self):
+        """ Tests that settings read before a change was published are not cached
+        once the change has been invalidated.
+        """
+
+        Feature("testing").set_percentage(5)
+        Feature.cache.invalidate(Feature("testing")._get_redis_key())
+        get = feature_ramp.backend.get
+
+        def get_then_change(key):
+            redis_raw = get(key)
+            redis.set(key, '{"percentage": 50}')
+            Feature.cache.invalidate(key)  # as a FeatureSubscriber would
+            return redis_raw
+
+        feature_ramp.backend.get = get_then_change
+        try:
+            self.assertEqual(Feature("testing").percentage, 5)
+        finally:
+            del feature_ramp.backend.get
+
+        self.assertEqual(Feature("testing").percentage, 50)
+
+    def test_missing_feature_is_cached(self):
+        """ Tests that features absent from Redis are cached too. """
+
+        feature = Feature("testing", default_percentage=10)
+        self.assertEqual(feature.percentage, 10)
+        self.assertTrue(feature._get_redis_key() in Feature.cache)
@@ -0,0 +1,158 @@
+import threading
+
+from unittest2 import TestCase
+
+from feature_ramp import redis
+from feature_ramp.Feature import Feature
+from feature_ramp.FeatureCache import FeatureCache
+from feature_ramp.FeatureContext import FeatureContext
+
+
+class FeatureContextTest(TestCase):
+    """ Tests that features read inside a FeatureContext see one snapshot of their settings. """
+
+    def tearDown(self):
+        Feature.cache = None
+        for feature in Feature.all_features():
+            Feature(feature).delete()
+
+    def test_no_current_context(self):
+        self.assertTrue(FeatureContext.current() is None)
+
+    def test_current_context(self):
+        with FeatureContext() as context:
+            self.assertTrue(FeatureContext.current() is context)
+            with FeatureContext() as inner:
+                self.assertTrue(FeatureContext.current() is inner)
+            self.assertTrue(FeatureContext.current() is context)
+
+        self.assertTrue(FeatureContext.current() is None)
+        self.assertEqual(FeatureContext.active, 0)
+
+    def test_feature_is_loaded_once(self):
+        """ Tests that changes made by other processes are not seen within the context. """
+
+        Feature("testing").set_percentage(5)
+
+        with FeatureContext() as context:
+            self.assertEqual(Feature("testing").percentage, 5)
+            redis.set(Feature("testing")._get_redis_key(), '{"percentage": 50}')
+            self.assertEqual(Feature("testing").percentage, 5)
+            self.assertTrue(Feature("testing")._get_redis_key() in context)
+
+        self.assertEqual(Feature("testing").percentage, 50)
+
+    def test_missing_feature_is_held(self):
+        with FeatureContext():
+            self.assertEqual(Feature("testing", default_percentage=10).percentage, 10)
+            Feature("other").set_percentage(5)  # unrelated changes do not drop it
+            redis.set(Feature._get_redis_key_for_feature("testing"), '{"percentage": 50}')
+            self.assertEqual(Feature("testing").percentage, 0)
+
+        Feature("testing").delete()  # not in the set of features tearDown deletes
+
+    def test_is_visible_is_memoized(self):
+        Feature("testing").set_percentage(100)
+
+        with FeatureContext() as context:
+            feature = Feature("testing")
+            self.assertTrue(feature.is_visible(3))
+
+            feature.blacklist = [3]  # changed locally, without saving
+            self.assertTrue(feature.is_visible(3))
+            self.assertTrue(Feature("testing").is_visible(3))
+
+            self.assertEqual(context.get_decision(Feature("testing"), 3), True)
+            self.assertTrue(context.get_decision(Feature("testing"), 4) is None)
+
+    def test_decisions_depend_on_group_and_default_percentage(self):
+        with FeatureContext():
+            self.assertFalse(Feature("testing").is_visible(3))
+            self.assertTrue(Feature("testing", default_percentage=100).is_visible(3))
+            self.assertTrue(Feature("testing", "group", default_percentage=100).is_visible(3))
+
+    def test_decisions_depend_on_attributes(self):
+        Feature("testing").activate()
+        Feature("testing").set_rules([{'attribute': 'platform', 'operator': 'eq', 'value': 'ios'}])
+
+        with FeatureContext():
+            self.assertTrue(Feature("testing").is_visible(3, {'platform': 'ios'}))
+            self.assertFalse(Feature("testing").is_visible(3, {'platform': 'android'}))
+            self.assertFalse(Feature("testing").is_visible(3))
+
+    def test_changes_are_seen_within_the_context(self):
+        """ Tests that a request sees the changes it makes itself. """
+
+        with FeatureContext():
+            self.assertFalse(Feature("testing").is_visible(3))
+
+            Feature("testing").add_to_whitelist(3)
+            self.assertTrue(Feature("testing").is_visible(3))
+
+            Feature("testing").remove_from_whitelist(3)
+            Feature("testing").set_percentage(100)
+            self.assertEqual(Feature("testing").percentage, 100)
+
+            Feature("testing").delete()
+            self.assertEqual(Feature("testing").percentage, 0)
+
+    def test_redis_set_changes_are_seen_within_the_context(self):
+        Feature("testing").use_redis_sets()
+
+        with FeatureContext():
+            self.assertFalse(Feature("testing").is_visible(3))
+            Feature("testing").add_to_whitelist(3)
+            self.assertTrue(Feature("testing").is_visible(3))
+
+    def test_returns_copies(self):
+        """ Tests that mutating a feature does not change what the context holds. """
+
+        Feature("testing").add_to_whitelist(3)
+
+        with FeatureContext():
+            Feature("testing").whitelist.append(4)
+            self.assertEqual(Feature("testing").whitelist, [3])
+
+    def test_evaluate_all(self):
+        Feature("a").set_percentage(100)
+
+        with FeatureContext() as context:
+            self.assertEqual(Feature.evaluate_all(3, names=["a", "b"]), {"a": True, "b": False})
+            self.assertEqual(len(context), 2)
+
+            redis.set(Feature._get_redis_key_for_feature("a"), '{"percentage": 0}')
+            self.assertEqual(Feature.evaluate_all(3, names=["a", "b"]), {"a": True, "b": False})
+            self.assertEqual(Feature("a").percentage, 100)
+
+    def test_with_cache(self):
+        Feature.cache = FeatureCache(max_size=100, ttl=60)
+        Feature("a").set_percentage(5)
+        Feature("a").percentage  # populates the cache
+
+        with FeatureContext() as context:
+            self.assertEqual(Feature.evaluate_all(3, names=["a", "b"]), {"a": False, "b": False})
+            self.assertTrue(Feature._get_redis_key_for_feature("a") in context)
+            self.assertTrue(Feature._get_redis_key_for_feature("b") in context)
+
+            Feature.cache.invalidate()
+            redis.set(Feature._get_redis_key_for_feature("a"), '{"percentage": 50}')
+            self.assertEqual(Feature("a").percentage, 5)
+
+    def test_threads_have_their_own_context(self):
+        Feature("testing").set_percentage(5)
+        seen = []
+
+        def read():
+            seen.append((FeatureContext.current(), Feature("testing").percentage))
+
+        with FeatureContext():
+            Feature("testing").percentage
+            redis.set(Feature._get_redis_key_for_feature("testing"), '{"percentage": 50}')
+
+            thread = threading.Thread(target=read)
+            thread.start()
+            thread.join()
+
+            self.assertEqual(Feature("testing").percentage, 5)
+
+        self.assertEqual(seen, [(None, 50)])
@@ -0,0 +1,108 @@
+from unittest2 import TestCase
+
+from feature_ramp.Feature import Feature
+from feature_ramp.FeatureCache import FeatureCache
+from feature_ramp.FeatureGroup import FeatureGroup
+from feature_ramp.Instrumentation import MetricsAggregator
+
+
+class FeatureGroupTest(TestCase):
+    """ Tests storing feature groups and evaluating their features together. """
+
+    def setUp(self):
+        Feature('feature_one').set_percentage(10)
+        Feature('feature_two').set_percentage(50)
+        self.group = FeatureGroup('test_group')
+        self.group.add_feature('feature_one')
+        self.group.add_feature('feature_two')
+
+    def tearDown(self):
+        Feature.cache = None
+        Feature.instrumentation = None
+        for group in FeatureGroup.all_groups():
+            FeatureGroup(group).delete()
+        for feature in Feature.all_features():
+            Feature(feature).delete()
+
+    def test_members_are_stored(self):
+        group = FeatureGroup('test_group')
+        self.assertEqual(group.members, ['feature_one', 'feature_two'])
+        self.assertEqual(group.offset, Feature.bucketer.offset('feature_one', 'test_group'))
+        self.assertEqual(FeatureGroup.all_groups(), ['test_group'])
+
+    def test_add_and_remove_feature(self):
+        self.assertFalse(self.group.add_feature('feature_one'))
+
+        self.group.remove_feature('feature_one')
+        self.assertEqual(FeatureGroup('test_group').members, ['feature_two'])
+
+        with self.assertRaises(ValueError):
+            self.group.remove_feature('feature_one')
+
+    def test_removing_from_missing_group_does_not_create_it(self):
+        with self.assertRaises(ValueError):
+            FeatureGroup('other_group').remove_feature('feature_one')
+        self.assertEqual(FeatureGroup.all_groups(), ['test_group'])
+
+    def test_explicit_offset(self):
+        group = FeatureGroup('other_group', offset=142)
+        group.add_feature('feature_one')
+        self.assertEqual(FeatureGroup('other_group').offset, 42)
+
+    def test_delete(self):
+        self.group.delete()
+        self.assertEqual(FeatureGroup.all_groups(), [])
+        self.assertEqual(FeatureGroup('test_group').members, [])
+        self.assertEqual(Feature('feature_one').percentage, 10)
+
+    def test_feature_group_names(self):
+        FeatureGroup('other_group').add_feature('feature_three')
+        self.assertEqual(FeatureGroup.feature_group_names(),
+                         {'feature_one': 'test_group', 'feature_two': 'test_group', 'feature_three': 'other_group'})
+
+    def test_evaluate_matches_is_visible(self):
+        Feature('feature_two').add_to_whitelist(7)
+        Feature('feature_two').add_to_blacklist(8)
+
+        for identifier in range(200):
+            expected = dict((name, Feature(name, feature_group_name='test_group').is_visible(identifier))
+                            for name in ['feature_one', 'feature_two'])
+            self.assertEqual(self.group.evaluate(identifier), expected)
+
+    def test_grouped_features_ramp_the_same_identifiers(self):
+        visibility = [self.group.evaluate(identifier) for identifier in range(1000)]
+        self.assertTrue(any(visible['feature_two'] for visible in visibility))
+        for visible in visibility:
+            self.assertTrue(visible['feature_two'] or not visible['feature_one'])
+
+    def test_evaluate_many(self):
+        identifiers = list(range(500))
+        Feature('feature_one').add_to_whitelist(3)
+
+        masks = self.group.evaluate_many(identifiers)
+        self.assertEqual(masks, dict((name, [self.group.evaluate(identifier)[name] for identifier in identifiers])
+                                     for name in ['feature_one', 'feature_two']))
+
+    def test_evaluate_with_attributes(self):
+        Feature('feature_one').set_rules([{'attribute': 'platform', 'operator': 'eq', 'value': 'ios'}])
+        Feature('feature_one').activate()
+
+        self.assertTrue(self.group.evaluate(3, attributes={'platform': 'ios'})['feature_one'])
+        self.assertFalse(self.group.evaluate(3, attributes={'platform': 'android'})['feature_one'])
+        self.assertEqual(self.group.evaluate_many([3, 4], attributes=[{'platform': 'ios'}, {}])['feature_one'],
+                         [True, False])
+
+    def test_settings_are_loaded_once(self):
+        Feature.instrumentation = MetricsAggregator()
+        Feature.cache = FeatureCache()
+        self.group.evaluate(3)
+        self.group.evaluate(4)
+
+        self.assertEqual(Feature.instrumentation.cache_misses, 2)
+        self.assertEqual(Feature.instrumentation.cache_hits, 2)
+
+    def test_cached_group_is_invalidated(self):
+        Feature.cache = FeatureCache()
+        FeatureGroup('test_group')
+        self.group.remove_feature('feature_one')
+        self.assertEqual(FeatureGroup('test_group').members, ['feature_two'])
@@ -0,0 +1,145 @@
+import os
+import shutil
+import tempfile
+import time
+
+from unittest2 import TestCase
+
+from feature_ramp.Feature import Feature
+from feature_ramp.FeatureSnapshot import FeatureSnapshot
+
+
+class FeatureSnapshotTest(TestCase):
+    """ Tests compiling feature settings into a memory-mapped snapshot file. """
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'features.snapshot')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+        for feature in Feature.all_features():
+            Feature(feature).delete()
+
+    def test_is_visible_matches_feature(self):
+        """ Tests that the snapshot gives the same answers as Feature. """
+
+        feature = Feature("testing")
+        feature.set_percentage(30)
+        feature.add_many_to_whitelist([3, 'example@example.com', u'\u2665'])
+        feature.add_many_to_blacklist([4, -2 ** 40, 'blocked'])
+        Feature("other").set_percentage(12)
+        FeatureSnapshot.write(self.path)
+
+        snapshot = FeatureSnapshot(self.path)
+        identifiers = list(range(-10, 500)) + [-2 ** 40, 'example@example.com', u'\u2665', 'blocked', 'missing']
+        for name in ["testing", "other", "unknown"]:
+            generated = Feature(name)
+            for identifier in identifiers:
+                self.assertEqual(snapshot.is_visible(name, identifier), generated.is_visible(identifier))
+
+    def test_redis_sets_match_feature(self):
+        """ Tests that identifiers of features using Redis sets are looked up as Redis does. """
+
+        feature = Feature("snaptest")
+        feature.set_percentage(30)
+        feature.use_redis_sets()
+        feature.add_many_to_whitelist([3, 'example@example.com'])
+        feature.add_many_to_blacklist([4, '5'])
+        FeatureSnapshot.write(self.path)
+
+        snapshot = FeatureSnapshot(self.path)
+        generated = Feature("snaptest")
+        for identifier in list(range(-10, 100)) + ['3', '4', 'example@example.com', 'missing']:
+            self.assertEqual(snapshot.is_visible("snaptest", identifier), generated.is_visible(identifier))
+        self.assertTrue(snapshot.is_visible("snaptest", 3))
+        self.assertFalse(snapshot.is_visible("snaptest", 5))
+
+    def test_blacklist_bloom_filter(self):
+        feature = Feature("testing")
+        feature.activate()
+        feature.use_blacklist_bloom_filter(100, error_rate=0.01)
+        feature.add_many_to_blacklist(range(0, 1000, 10))
+        FeatureSnapshot.write(self.path)
+
+        snapshot = FeatureSnapshot(self.path)
+        generated = Feature("testing")
+        for identifier in range(1000):
+            self.assertEqual(snapshot.is_visible("testing", identifier), generated.is_visible(identifier))
+        self.assertEqual(snapshot.get("testing").blacklist_bloom_filter.to_bytes(),
+                         generated.blacklist_bloom_filter.to_bytes())
+
+    def test_targeting_rules(self):
+        rules = [{'attribute': 'region', 'operator': 'in', 'values': ['CA']}]
+        feature = Feature("testing")
+        feature.set_percentage(50)
+        feature.add_to_whitelist(3)
+        feature.set_rules(rules)
+        FeatureSnapshot.write(self.path)
+
+        snapshot = FeatureSnapshot(self.path)
+        generated = Feature("testing")
+        for identifier in range(100):
+            for attributes in [None, {'region': 'CA'}, {'region': 'NY'}]:
+                self.assertEqual(snapshot.is_visible("testing", identifier, attributes=attributes),
+                                 generated.is_visible(identifier, attributes))
+        self.assertEqual(snapshot.get("testing").rules, rules)
+
+    def test_ramp_schedule(self):
+        now = time.time()
+        feature = Feature("testing")
+        feature.set_percentage(5)
+        feature.set_schedule(now - 1000, now + 1000, 0, 100, step=10)
+        Feature("ended").set_schedule(now - 2000, now - 1000, 0, 30)
+        FeatureSnapshot.write(self.path)
+
+        snapshot = FeatureSnapshot(self.path)
+        self.assertEqual((snapshot.percentage("testing"), snapshot.percentage("ended")), (50, 30))
+        generated = Feature("testing")
+        for identifier in range(100):
+            self.assertEqual(snapshot.is_visible("testing", identifier), generated.is_visible(identifier))
+
+        from_snapshot = snapshot.get("testing")
+        self.assertEqual((from_snapshot.schedule, from_snapshot._percentage), (generated.schedule, 5))
+
+    def test_feature_settings(self):
+        FeatureSnapshot.write(self.path, {'testing': {'percentage': 12.5, 'whitelist': [5, 'b', 3, 'a', 3]}})
+
+        snapshot = FeatureSnapshot(self.path)
+        self.assertEqual(snapshot.feature_names(), ['testing'])
+        self.assertTrue("testing" in snapshot)
+        self.assertEqual(snapshot.percentage("testing"), 12.5)
+        self.assertEqual(snapshot.percentage("unknown", default_percentage=100), 100)
+
+        generated = snapshot.get("testing")
+        self.assertEqual(generated.percentage, 12.5)
+        self.assertEqual(generated.whitelist, [3, 5, 'a', 'b'])
+        self.assertEqual(generated.blacklist, [])
+
+    def test_default_percentage(self):
+        FeatureSnapshot.write(self.path, {})
+        snapshot = FeatureSnapshot(self.path)
+
+        self.assertEqual(snapshot.feature_count, 0)
+        self.assertTrue(snapshot.is_visible("testing", 3, default_percentage=100))
+        self.assertFalse(snapshot.is_visible("testing", 3))
+
+    def test_refresh(self):
+        """ Tests that readers pick up a snapshot written after they opened theirs. """
+
+        FeatureSnapshot.write(self.path, {'testing': {'percentage': 0}})
+        snapshot = FeatureSnapshot(self.path)
+        self.assertFalse(snapshot.refresh())
+
+        FeatureSnapshot.write(self.path, {'testing': {'percentage': 100}})
+        self.assertFalse(snapshot.is_visible("testing", 3))
+        self.assertTrue(snapshot.refresh())
+        self.assertTrue(snapshot.is_visible("testing", 3))
+        self.assertEqual(os.listdir(self.directory), ['features.snapshot'])
+
+    def test_not_a_snapshot(self):
+        with open(self.path, 'wb') as snapshot_file:
+            snapshot_file.write(b'{"percentage": 5}' * 2)
+
+        with self.assertRaises(ValueError):
+            FeatureSnapshot(self.path)
@@ -0,0 +1,93 @@
+import time
+
+from unittest2 import TestCase
+
+from feature_ramp import redis
+from feature_ramp.Feature import Feature
+from feature_ramp.FeatureCache import FeatureCache
+from feature_ramp.FeatureSubscriber import FeatureSubscriber
+
+
+def wait_until(condition, timeout=5.0):
+    """ Polls ``condition`` until it returns true or ``timeout`` seconds pass. """
+
+    deadline = time.time() + timeout
+    while not condition():
+        if time.time() > deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+
+class FeatureSubscriberTest(TestCase):
+    """ Tests cache invalidation through Redis pub/sub. """
+
+    def setUp(self):
+        # the subscriber's cache stands in for the cache of another process,
+        # so writes made in the test do not update it directly
+        self.cache = FeatureCache(max_size=100, ttl=3600)
+        self.key = Feature("testing")._get_redis_key()
+
+    def tearDown(self):
+        self.subscriber.stop()
+        for feature in Feature.all_features():
+            Feature(feature).delete()
+
+    def start_subscriber(self, **kwargs):
+        self.subscriber = FeatureSubscriber(self.cache, poll_timeout=0.05, reconnect_delay=0.05, **kwargs)
+        self.subscriber.start()
+        self.assertTrue(self.subscriber.subscribed.wait(5))
+
+    def test_save_publishes_change(self):
+        pubsub = redis.pubsub(ignore_subscribe_messages=True)
+        pubsub.subscribe(Feature._get_redis_channel_key())
+        self.subscriber = FeatureSubscriber(self.cache)
+
+        Feature("testing").set_percentage(5)
+
+        messages = []
+        self.assertTrue(wait_until(lambda: messages.append(pubsub.get_message(timeout=0.05)) or any(messages)))
+        self.assertEqual([m['data'].decode('utf-8') for m in messages if m], [self.key])
+        pubsub.close()
+
+    def test_save_evicts_cached_feature(self):
+        self.start_subscriber()
+        self.cache.set(self.key, {'percentage': 0})
+        self.cache.set('feature.1.untouched', {'percentage': 0})
+
+        Feature("testing").set_percentage(5)
+
+        self.assertTrue(wait_until(lambda: self.key not in self.cache))
+        self.assertTrue('feature.1.untouched' in self.cache)
+
+    def test_delete_evicts_cached_feature(self):
+        Feature("testing").set_percentage(5)
+        self.start_subscriber()
+        self.cache.set(self.key, {'percentage': 5})
+
+        Feature("testing").delete()
+
+        self.assertTrue(wait_until(lambda: self.key not in self.cache))
+
+    def test_refresh_reloads_changed_feature(self):
+        self.start_subscriber(refresh=True)
+        self.cache.set(self.key, {'percentage': 0})
+
+        Feature("testing").set_percentage(5)
+
+        self.assertTrue(wait_until(
+            lambda: (self.cache.get(self.key) or {}).get('percentage') == 5))
+
+    def test_reconnect_resyncs(self):
+        """ Tests that a dropped connection clears the cache and reports the resync. """
+
+        resyncs = []
+        self.start_subscriber(on_resync=lambda: resyncs.append(True))
+        self.assertEqual(len(resyncs), 1)
+        self.cache.set(self.key, {'percentage': 0})
+
+        redis.client_kill_filter(_type='pubsub')
+
+        self.assertTrue(wait_until(lambda: len(resyncs) == 2))
+        self.assertFalse(self.key in self.cache)
+        self.assertEqual(self.subscriber.resync_count, 2)
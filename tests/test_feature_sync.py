@@ -0,0 +1,123 @@
+from unittest2 import TestCase
+
+from feature_ramp import redis
+from feature_ramp.Feature import Feature
+from feature_ramp.FeatureSync import FeatureSync
+
+
+class ChangeLogTest(TestCase):
+    """ Tests the change log that every save and delete is recorded in. """
+
+    def setUp(self):
+        self.version = Feature.change_version()
+
+    def tearDown(self):
+        Feature.CHANGE_LOG_SIZE = 10000
+        for feature in Feature.all_features():
+            Feature(feature).delete()
+
+    def test_changes_bump_the_version(self):
+        Feature("testing").set_percentage(5)  # _update
+        Feature("testing").reset_settings()  # _save
+        Feature("testing").delete()
+
+        self.assertEqual(Feature.change_version(), self.version + 3)
+
+    def test_changes_since(self):
+        Feature("a").set_percentage(5)
+        Feature("b").add_to_whitelist(3)
+        Feature("a").add_to_blacklist(4)
+
+        self.assertEqual(Feature.changes_since(self.version), (self.version + 3, ['b', 'a']))
+        self.assertEqual(Feature.changes_since(self.version + 2), (self.version + 3, ['a']))
+        self.assertEqual(Feature.changes_since(self.version + 3), (self.version + 3, []))
+
+    def test_log_is_bounded(self):
+        Feature.CHANGE_LOG_SIZE = 2
+        for name in ["a", "b", "c"]:
+            Feature(name).activate()
+
+        self.assertEqual(redis.zrangebyscore(Feature._get_redis_change_log_key(), '-inf', '+inf'),
+                         [b'feature.1.b', b'feature.1.c'])
+        self.assertEqual(Feature.changes_since(self.version + 1), (self.version + 3, ['b', 'c']))
+        self.assertEqual(Feature.changes_since(self.version), (self.version + 3, None))
+
+    def test_unknown_version(self):
+        """ Tests that a version newer than Redis knows of, e.g. after Redis lost its
+        data, needs a full reload.
+        """
+
+        self.assertEqual(Feature.changes_since(self.version + 1), (self.version, None))
+
+
+class FeatureSyncTest(TestCase):
+    """ Tests keeping a local copy of every feature up to date from the change log. """
+
+    def setUp(self):
+        self.sync = FeatureSync()
+
+    def tearDown(self):
+        Feature.CHANGE_LOG_SIZE = 10000
+        for feature in Feature.all_features():
+            Feature(feature).delete()
+
+    def test_first_refresh_loads_everything(self):
+        Feature("a").set_percentage(5)
+        Feature("b").add_to_whitelist(3)
+
+        self.assertTrue(self.sync.refresh() is None)
+        self.assertEqual(self.sync.features, Feature.all_features(include_data=True))
+        self.assertEqual(self.sync.version, Feature.change_version())
+        self.assertEqual(self.sync.full_refresh_count, 1)
+
+    def test_refresh_loads_only_changes(self):
+        Feature("a").set_percentage(5)
+        Feature("b").set_percentage(10)
+        self.sync.refresh()
+
+        redis.set(Feature._get_redis_key_for_feature("b"), '{"percentage": 50}')  # not logged
+        Feature("a").add_to_whitelist(3)
+        Feature("c").activate()
+
+        self.assertEqual(sorted(self.sync.refresh()), ['a', 'c'])
+        self.assertEqual(self.sync.features, {
+            'a': {'percentage': 5, 'whitelist': [3]},
+            'b': {'percentage': 10},
+            'c': {'percentage': 100},
+        })
+        self.assertEqual(self.sync.refresh(), [])
+        self.assertEqual(self.sync.full_refresh_count, 1)
+
+    def test_redis_set_and_bloom_filter_changes_are_logged(self):
+        Feature("a").use_redis_sets()
+        Feature("b").use_blacklist_bloom_filter(1000)
+        self.sync.refresh()
+
+        Feature("a").add_to_whitelist(42)
+        self.assertEqual(self.sync.refresh(), ['a'])
+        self.assertEqual(self.sync.features['a']['whitelist'], ['42'])
+
+        Feature("a").remove_from_whitelist(42)
+        self.assertEqual(self.sync.refresh(), ['a'])
+        self.assertFalse('whitelist' in self.sync.features['a'])
+
+        Feature("b").add_to_blacklist(4)
+        self.assertEqual(self.sync.refresh(), ['b'])
+
+    def test_deleted_features_are_dropped(self):
+        Feature("a").set_percentage(5)
+        self.sync.refresh()
+        Feature("a").delete()
+
+        self.assertEqual(self.sync.refresh(), ['a'])
+        self.assertEqual(self.sync.features, {})
+
+    def test_falls_back_to_full_refresh(self):
+        Feature.CHANGE_LOG_SIZE = 2
+        self.sync.refresh()
+        for name in ["a", "b", "c"]:
+            Feature(name).activate()
+
+        self.assertTrue(self.sync.refresh() is None)
+        self.assertEqual(self.sync.full_refresh_count, 2)
+        self.assertEqual(sorted(self.sync.features), ['a', 'b', 'c'])
@@ -0,0 +1,120 @@
+from unittest2 import TestCase
+
+import feature_ramp
+from feature_ramp.Backend import InMemoryBackend
+from feature_ramp.Feature import Feature
+from feature_ramp.FeatureCache import FeatureCache
+from feature_ramp.Instrumentation import (InstrumentedBackend, MetricsAggregator, StatsdInstrumentation,
+                                          payload_size)
+
+
+class FakeStatsClient(object):
+    """ Records the calls a statsd client would send. """
+
+    def __init__(self):
+        self.calls = []
+
+    def timing(self, stat, milliseconds):
+        self.calls.append(('timing', stat))
+
+    def incr(self, stat, count=1):
+        self.calls.append(('incr', stat, count))
+
+
+class InstrumentationTest(TestCase):
+    """ Tests the instrumentation hooks on the evaluation and storage paths. """
+
+    def setUp(self):
+        self.aggregator = MetricsAggregator()
+        self.default_backend = feature_ramp.backend
+        Feature.instrumentation = self.aggregator
+
+    def tearDown(self):
+        Feature.instrumentation = None
+        Feature.cache = None
+        feature_ramp.set_backend(self.default_backend)
+        for feature in Feature.all_features():
+            Feature(feature).delete()
+
+    def test_disabled_by_default(self):
+        Feature.instrumentation = None
+        Feature("testing").is_visible(3)
+
+        self.assertEqual(self.aggregator.evaluations, {})
+
+    def test_evaluations_per_decision_path(self):
+        feature = Feature("testing")
+        feature.add_to_whitelist(3)
+        feature.add_to_blacklist(4)
+
+        feature.is_visible(3)
+        feature.is_visible(4)
+        feature.is_visible(5)
+        feature.is_visible(6)
+
+        self.assertEqual(self.aggregator.evaluations, {('testing', 'whitelist'): 1,
+                                                       ('testing', 'blacklist'): 1,
+                                                       ('testing', 'ramp'): 2})
+
+    def test_bulk_evaluations(self):
+        feature = Feature("testing")
+        feature.add_to_whitelist(3)
+        feature.set_percentage(50)
+
+        feature.filter_visible(iter(range(10)))
+
+        self.assertEqual(self.aggregator.evaluations, {('testing', 'whitelist'): 1,
+                                                       ('testing', 'ramp'): 9})
+
+    def test_cache_lookups(self):
+        Feature("testing").set_percentage(5)
+        Feature.cache = FeatureCache()
+
+        Feature("testing")
+        Feature("testing")
+        Feature.evaluate_all(3, names=["testing", "other"])
+
+        self.assertEqual((self.aggregator.cache_hits, self.aggregator.cache_misses), (2, 2))
+        self.assertEqual(self.aggregator.cache_hit_rate, 0.5)
+
+    def test_storage_calls(self):
+        backend = InMemoryBackend()
+        feature_ramp.set_backend(InstrumentedBackend(backend, self.aggregator))
+
+        feature = Feature("testing")
+        feature.set_percentage(5)
+        Feature("testing")
+
+        calls = self.aggregator.storage_calls
+        self.assertEqual(calls['get']['count'], 2)
+        self.assertEqual(calls['evalsha']['count'], 2)  # the update and the change log
+        self.assertEqual(calls['pipeline']['count'], 2)  # the in-memory backend declines scripts
+        self.assertEqual(calls['get']['payload_bytes'],
+                         2 * len(feature._get_redis_key()) + len(backend.get(feature._get_redis_key())))
+        self.assertTrue(calls['get']['seconds'] >= calls['get']['max_seconds'] > 0)
+
+    def test_storage_calls_against_redis(self):
+        feature_ramp.set_backend(InstrumentedBackend(self.default_backend, self.aggregator))
+
+        feature = Feature("testing")
+        feature.add_to_whitelist(3)
+        feature.use_redis_sets()
+        feature.is_visible(4)
+
+        calls = self.aggregator.storage_calls
+        self.assertEqual(sorted(calls), ['evalsha', 'get', 'pipeline', 'publish', 'sismember'])
+        self.assertEqual(calls['sismember']['count'], 2)
+
+    def test_statsd(self):
+        client = FakeStatsClient()
+        Feature.instrumentation = StatsdInstrumentation(client, prefix='app.features')
+        feature_ramp.set_backend(InstrumentedBackend(InMemoryBackend(), Feature.instrumentation))
+
+        Feature("testing").is_visible(3)
+
+        self.assertEqual(client.calls, [('timing', 'app.features.storage.get'),
+                                        ('incr', 'app.features.storage.get.bytes', len('feature.1.testing')),
+                                        ('incr', 'app.features.evaluation.testing.ramp', 1)])
+
+    def test_payload_size(self):
+        self.assertEqual(payload_size([b'abc', u'de', None, 7, set([b'f'])]), 6)
@@ -0,0 +1,109 @@
+from unittest2 import TestCase
+
+from feature_ramp import redis
+from feature_ramp.Codec import BinaryCodec
+from feature_ramp.Feature import Feature
+from feature_ramp.FeatureSync import FeatureSync
+from feature_ramp.Migration import migrate
+
+
+class MigrationTest(TestCase):
+    """ Tests moving features to the binary format of REDIS_VERSION 2. """
+
+    def tearDown(self):
+        for version in [2, 1]:
+            Feature.REDIS_VERSION = version
+            for feature in Feature.all_features():
+                Feature(feature).delete()
+
+    def test_migrate(self):
+        Feature("testing").set_percentage(30)
+        Feature("testing").add_many_to_whitelist(range(100))
+        Feature("testing").add_many_to_blacklist(['a', 'b'])
+        Feature("sets").add_to_whitelist(3)
+        Feature("sets").use_redis_sets()
+        Feature("bloom").use_blacklist_bloom_filter(1000)
+        Feature("bloom").add_to_blacklist(4)
+        expected = Feature.all_features(include_data=True)
+
+        self.assertEqual(migrate(batch_size=2), 3)
+
+        Feature.REDIS_VERSION = 2
+        self.assertEqual(Feature.all_features(include_data=True), expected)
+        self.assertTrue(redis.get('feature.2.testing').startswith(BinaryCodec.MAGIC))
+        self.assertTrue(Feature("sets").is_whitelisted(3))
+        self.assertTrue(Feature("bloom").is_blacklisted(4))
+
+        Feature.REDIS_VERSION = 1
+        self.assertEqual(Feature.all_features(include_data=True), expected)
+
+    def test_binary_updates(self):
+        """ Tests that binary settings are changed without the JSON update script. """
+
+        Feature.REDIS_VERSION = 2
+        feature = Feature("testing")
+        feature.add_many_to_whitelist([3, 4])
+        feature.set_schedule(1000, 2000, 0, 100)
+        feature.set_percentage(20)
+        Feature("testing").add_to_whitelist(5)
+        feature.remove_from_whitelist(4)
+
+        generated = Feature("testing")
+        self.assertEqual(generated.whitelist, [3, 5])
+        self.assertEqual(generated.percentage, 20)
+        self.assertTrue(generated.schedule is None)
+        self.assertTrue(redis.get('feature.2.testing').startswith(BinaryCodec.MAGIC))
+
+    def test_migrate_and_delete_old(self):
+        Feature("testing").add_to_whitelist(3)
+        Feature("testing").use_redis_sets()
+        migrate()
+        migrate(delete_old=True)
+
+        self.assertEqual(Feature.all_features(), [])
+        self.assertFalse(redis.exists('feature.1.testing', 'feature.1.testing.whitelist'))
+
+        Feature.REDIS_VERSION = 2
+        self.assertEqual(Feature.all_features(), ['testing'])
+        self.assertTrue(Feature("testing").is_whitelisted(3))
+
+    def test_migration_is_logged(self):
+        """ Tests that syncs of both versions see features copied and deleted by the migration. """
+
+        Feature("testing").set_percentage(30)
+        old_sync = FeatureSync()
+        old_sync.refresh()
+        Feature.REDIS_VERSION = 2
+        new_sync = FeatureSync()
+        new_sync.refresh()
+        Feature.REDIS_VERSION = 1
+
+        migrate()
+        Feature.REDIS_VERSION = 2
+        self.assertEqual(new_sync.refresh(), ['testing'])
+        self.assertEqual(new_sync.features['testing']['percentage'], 30)
+
+        migrate(delete_old=True)
+        Feature.REDIS_VERSION = 1
+        self.assertEqual(old_sync.refresh(), ['testing'])
+        self.assertEqual(old_sync.features, {})
+
+    def test_delete_old_keeps_newer_changes(self):
+        """ Tests that running again does not overwrite features changed since they were copied. """
+
+        Feature("testing").set_percentage(10)
+        Feature("testing").add_to_whitelist(3)
+        Feature("testing").use_redis_sets()
+        self.assertEqual(migrate(), 1)
+
+        Feature.REDIS_VERSION = 2
+        Feature("testing").set_percentage(40)
+        Feature("testing").add_to_whitelist(5)
+
+        Feature.REDIS_VERSION = 1
+        self.assertEqual(migrate(delete_old=True), 0)
+        self.assertEqual(Feature.all_features(), [])
+
+        Feature.REDIS_VERSION = 2
+        self.assertEqual(Feature("testing").percentage, 40)
+        self.assertTrue(Feature("testing").is_whitelisted(5))
@@ -0,0 +1,53 @@
+import datetime
+
+from unittest2 import TestCase
+
+from feature_ramp.RampSchedule import RampSchedule
+
+
+class RampScheduleTest(TestCase):
+    """ Tests computing percentages from ramp schedules. """
+
+    def test_linear(self):
+        schedule = RampSchedule(1000, 2000, 10, 50)
+
+        self.assertEqual(schedule.percentage_at(0), 10)
+        self.assertEqual(schedule.percentage_at(1000), 10)
+        self.assertEqual(schedule.percentage_at(1250), 20)
+        self.assertEqual(schedule.percentage_at(2000), 50)
+        self.assertEqual(schedule.percentage_at(10 ** 10), 50)
+
+    def test_steps(self):
+        schedule = RampSchedule(0, 1000, 0, 100, step=25)
+
+        self.assertEqual([schedule.percentage_at(now) for now in [0, 249, 250, 499, 700, 999, 1000]],
+                         [0, 0, 25, 25, 50, 75, 100])
+
+    def test_step_not_dividing_the_ramp(self):
+        schedule = RampSchedule(0, 100, 0, 10, step=3)
+        self.assertEqual([schedule.percentage_at(now) for now in [50, 99, 100]], [3, 9, 10])
+
+    def test_ramp_down(self):
+        schedule = RampSchedule(0, 100, 100, 0, step=10)
+        self.assertEqual([schedule.percentage_at(now) for now in [0, 9, 15, 50, 100]], [100, 100, 90, 50, 0])
+
+    def test_datetimes(self):
+        schedule = RampSchedule(datetime.datetime(2026, 1, 1), datetime.datetime(2026, 1, 2), 0, 100)
+        self.assertEqual((schedule.start_time, schedule.end_time), (1767225600, 1767312000))
+
+    def test_dict_round_trip(self):
+        schedule = RampSchedule(1000, 2000.5, 0, 100, step=5)
+        self.assertEqual(RampSchedule.from_dict(schedule.to_dict()), schedule)
+        self.assertEqual(RampSchedule(1000, 2000, 0, 100).to_dict(),
+                         {'start_time': 1000, 'end_time': 2000, 'start_percentage': 0, 'end_percentage': 100})
+
+    def test_invalid_schedules(self):
+        for args, kwargs in [((2000, 1000, 0, 100), {}),
+                             ((1000, 1000, 0, 100), {}),
+                             ((1000, 2000, 0, 101), {}),
+                             ((1000, 2000, -1, 100), {}),
+                             ((1000, 2000, '5', 100), {}),
+                             (('tomorrow', 2000, 0, 100), {}),
+                             ((1000, 2000, 0, 100), {'step': 0})]:
+            with self.assertRaises(ValueError):
+                RampSchedule(*args, **kwargs)
@@ -0,0 +1,73 @@
+from unittest2 import TestCase
+
+from feature_ramp.Targeting import compile_rules
+
+
+class TargetingTest(TestCase):
+    """ Tests compiling targeting rules into predicates. """
+
+    def test_no_rules(self):
+        self.assertTrue(compile_rules([]) is None)
+        self.assertTrue(compile_rules(None) is None)
+
+    def test_eq(self):
+        matches = compile_rules([{'attribute': 'platform', 'operator': 'eq', 'value': 'ios'}])
+
+        self.assertTrue(matches({'platform': 'ios'}))
+        self.assertFalse(matches({'platform': 'android'}))
+        self.assertFalse(matches({}))
+
+    def test_eq_none(self):
+        matches = compile_rules([{'attribute': 'referrer', 'operator': 'eq', 'value': None}])
+
+        self.assertTrue(matches({'referrer': None}))
+        self.assertFalse(matches({}))
+
+    def test_in(self):
+        matches = compile_rules([{'attribute': 'region', 'operator': 'in', 'values': ['CA', 'NY']}])
+
+        self.assertTrue(matches({'region': 'NY'}))
+        self.assertFalse(matches({'region': 'TX'}))
+        self.assertFalse(matches({'region': ['CA']}))  # unhashable
+        self.assertFalse(matches({}))
+
+    def test_range(self):
+        matches = compile_rules([{'attribute': 'age', 'operator': 'range', 'min': 18, 'max': 65}])
+
+        self.assertTrue(matches({'age': 18}))
+        self.assertTrue(matches({'age': 64.5}))
+        self.assertFalse(matches({'age': 65}))
+        self.assertFalse(matches({'age': 17}))
+        self.assertFalse(matches({'age': '30'}))
+        self.assertFalse(matches({'age': True}))
+        self.assertFalse(matches({}))
+
+    def test_open_range(self):
+        matches = compile_rules([{'attribute': 'app_version', 'operator': 'range', 'min': 7}])
+
+        self.assertTrue(matches({'app_version': 10 ** 6}))
+        self.assertFalse(matches({'app_version': 6}))
+
+    def test_all_rules_must_match(self):
+        matches = compile_rules([
+            {'attribute': 'platform', 'operator': 'eq', 'value': 'ios'},
+            {'attribute': 'region', 'operator': 'in', 'values': ['CA']},
+        ])
+
+        self.assertTrue(matches({'platform': 'ios', 'region': 'CA', 'age': 30}))
+        self.assertFalse(matches({'platform': 'ios', 'region': 'NY'}))
+        self.assertFalse(matches({'platform': 'android', 'region': 'CA'}))
+
+    def test_malformed_rules(self):
+        for rule in [
+            'platform',
+            {'operator': 'eq', 'value': 'ios'},
+            {'attribute': 'platform', 'operator': 'eq'},
+            {'attribute': 'platform', 'operator': 'like', 'value': 'ios'},
+            {'attribute': 'region', 'operator': 'in', 'values': 5},
+            {'attribute': 'region', 'operator': 'in'},
+            {'attribute': 'age', 'operator': 'range'},
+            {'attribute': 'age', 'operator': 'range', 'min': 'a'},
+        ]:
+            with self.assertRaises(ValueError):
+                compile_rules([rule])